@@ -0,0 +1,193 @@
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from script_generator.object_detection.data_classes.detection_class import DetectionClass, get_class_mask
+from script_generator.object_detection.data_classes.detection_index import DetectionIndex
+
+# Classes of which the tracker follows the most confident box, in the order it handles them
+BEST_BOX_CLASSES = (DetectionClass.GLANS, DetectionClass.PENIS, DetectionClass.NAVEL)
+
+# Classes left out of the distance computation
+DISTANCE_IGNORED_MASK = get_class_mask(DetectionClass.GLANS, DetectionClass.NAVEL, DetectionClass.HIPS_CENTER, DetectionClass.ANUS)
+
+MIN_DETECTION_CONF = 0.3  # detections at or below this confidence are not used to find boxes or close ups
+
+# Frames of which the features are extracted at a time, bounds the memory of long videos
+TRACKING_FEATURE_CHUNK_FRAMES = 10000
+
+
+class FrameFeatures:
+    __slots__ = ("best_boxes", "close_up_butt_area", "candidates")
+
+    def __init__(self, best_boxes: List[Optional[Tuple[list, float]]], close_up_butt_area: Optional[int], candidates: List[tuple]):
+        """
+        Everything the tracker needs of the detections of a frame that doesn't depend on the tracking state.
+
+        :param best_boxes: Per class of BEST_BOX_CLASSES the most confident (box, conf), None when not detected.
+        :param close_up_butt_area: Area of the butt box that makes the frame a close up (a large butt box overlapping a
+            pussy box), None when it isn't one.
+        :param candidates: The (box, cls, track_id) of the boxes that may add to the distance, by class priority.
+        """
+        self.best_boxes = best_boxes
+        self.close_up_butt_area = close_up_butt_area
+        self.candidates = candidates
+
+
+def get_close_up_threshold(is_vr: bool, image_area: int) -> float:
+    """
+    :return: Butt box area above which a frame is a close up.
+    """
+    return (0.15 if is_vr else 0.4) * image_area
+
+
+def get_candidate_overlaps(candidates: List[tuple], box) -> List[bool]:
+    """
+    :return: Per candidate whether its box overlaps the box, touching edges count as overlapping.
+    """
+    x3, y3, x4, y4 = box
+    return [not (x2 < x3 or x4 < x1 or y2 < y3 or y4 < y1) for (x1, y1, x2, y2), _, _ in candidates]
+
+
+def get_frame_features(sorted_boxes: List[tuple], is_vr: bool, image_area: int) -> FrameFeatures:
+    """
+    Extracts the features of a single frame from its boxes as (box, conf, cls, class_name, track_id) sorted by class
+    priority. TrackingFeatures extracts the same features for many frames at once.
+    """
+    detections = {cls: [] for cls in (*BEST_BOX_CLASSES, DetectionClass.PUSSY, DetectionClass.BUTT)}
+    candidates = []
+    for box, conf, cls, class_name, track_id in sorted_boxes:
+        if conf > MIN_DETECTION_CONF and cls in detections:
+            detections[cls].append((box, conf))
+        if not (1 << cls) & DISTANCE_IGNORED_MASK:
+            candidates.append((box, cls, track_id))
+
+    # the first of the most confident boxes
+    best_boxes = []
+    for cls in BEST_BOX_CLASSES:
+        best, prev_conf = None, 0
+        for box, conf in detections[cls]:
+            if conf > prev_conf:
+                best, prev_conf = (box, conf), conf
+        best_boxes.append(best)
+
+    close_up_butt_area = None
+    threshold = get_close_up_threshold(is_vr, image_area)
+    for p_box, _ in detections[DetectionClass.PUSSY]:
+        for b_box, _ in detections[DetectionClass.BUTT]:
+            x1, y1, x2, y2 = p_box
+            x3, y3, x4, y4 = b_box
+            if not (x2 < x3 or x4 < x1 or y2 < y3 or y4 < y1):
+                butt_box_area = (x4 - x3) * (y4 - y3)
+                if butt_box_area > threshold:
+                    close_up_butt_area = butt_box_area
+                    break
+        if close_up_butt_area is not None:
+            break
+
+    return FrameFeatures(best_boxes, close_up_butt_area, candidates)
+
+
+def _first_per_frame(frames: np.ndarray, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    :return: The frames and the first of the rows of every frame, frames must be sorted.
+    """
+    unique_frames, first = np.unique(frames, return_index=True)
+    return unique_frames, rows[first]
+
+
+class TrackingFeatures:
+    def __init__(self, index: DetectionIndex, is_vr: bool, image_area: int, chunk_frames=TRACKING_FEATURE_CHUNK_FRAMES):
+        """
+        The per frame features of the tracker extracted with numpy for a chunk of frames at a time, the tracker only
+        runs the state that depends on previous frames. Frames have to be requested in increasing order.
+        """
+        self.index = index
+        self.close_up_threshold = get_close_up_threshold(is_vr, image_area)
+        self.chunk_frames = chunk_frames
+        self.chunk_start = self.chunk_end = None
+        self.ignored_classes = np.array([bool((1 << cls) & DISTANCE_IGNORED_MASK) for cls in range(len(index.class_names))])
+
+    def get(self, frame_pos: int) -> Optional[FrameFeatures]:
+        """
+        :return: The features of a frame, None when it has no detections.
+        """
+        if self.chunk_start is None or not self.chunk_start <= frame_pos < self.chunk_end:
+            self._extract_chunk(frame_pos, frame_pos + self.chunk_frames)
+
+        i = frame_pos - self.chunk_start
+        start, end = self.row_ranges[i], self.row_ranges[i + 1]
+        if start == end:
+            return None
+
+        area = self.close_up_areas[i]
+        return FrameFeatures(
+            self.best_boxes[i], area if area >= 0 else None,
+            self.candidates[self.candidate_ranges[i]:self.candidate_ranges[i + 1]]
+        )
+
+    def _extract_chunk(self, chunk_start: int, chunk_end: int):
+        index = self.index
+        self.chunk_start, self.chunk_end = chunk_start, chunk_end
+        frame_count = chunk_end - chunk_start
+
+        # rows of the chunk, relative to the first row of the chunk
+        frame_ids = np.arange(chunk_start, chunk_end + 1) - index.first_frame
+        offsets = index.frame_offsets[np.clip(frame_ids, 0, len(index.frame_offsets) - 1)]
+        row_start = int(offsets[0])
+        row_ranges = offsets - row_start
+        rows = slice(row_start, int(offsets[-1]))
+
+        frames = index.frame[rows] - chunk_start
+        classes = index.cls[rows]
+        confs = index.conf[rows]
+        boxes = index.boxes[rows]
+        confident = confs > MIN_DETECTION_CONF
+
+        # boxes as tuples of ints, which unlike lists aren't followed by the garbage collector once they're kept
+        boxes_list = list(zip(*(boxes[:, i].tolist() for i in range(4))))
+        confs_list = confs.tolist()
+
+        # the first of the most confident boxes per frame
+        best_per_class = []
+        for cls in BEST_BOX_CLASSES:
+            best_rows = np.full(frame_count, -1, dtype=np.int64)
+            selected = np.flatnonzero((classes == cls) & confident)
+            if len(selected):
+                selected_frames = frames[selected]
+                group_starts = np.flatnonzero(np.concatenate(([True], selected_frames[1:] != selected_frames[:-1])))
+                group_max = np.maximum.reduceat(confs[selected], group_starts)
+                is_max = confs[selected] == np.repeat(group_max, np.diff(np.append(group_starts, len(selected))))
+                best_frames, best = _first_per_frame(selected_frames[is_max], selected[is_max])
+                best_rows[best_frames] = best
+            best_per_class.append([(boxes_list[row], confs_list[row]) if row >= 0 else None for row in best_rows.tolist()])
+        self.best_boxes = [list(best) for best in zip(*best_per_class)]
+
+        # close ups: the first pussy box (then butt box) of a frame that overlaps a butt box larger than the threshold
+        close_up_areas = np.full(frame_count, -1, dtype=np.int64)
+        pussy = np.flatnonzero((classes == DetectionClass.PUSSY) & confident)
+        butt_areas = (boxes[:, 2] - boxes[:, 0]).astype(np.int64) * (boxes[:, 3] - boxes[:, 1])
+        butt = np.flatnonzero((classes == DetectionClass.BUTT) & confident & (butt_areas > self.close_up_threshold))
+        if len(pussy) and len(butt):
+            butt_frames = frames[butt]
+            first_butt = np.searchsorted(butt_frames, frames[pussy], side="left")
+            pair_counts = np.searchsorted(butt_frames, frames[pussy], side="right") - first_butt
+            pair_pussy = np.repeat(pussy, pair_counts)
+            pair_starts = np.repeat(first_butt - np.cumsum(pair_counts) + pair_counts, pair_counts)
+            pair_butt = butt[pair_starts + np.arange(len(pair_pussy))]
+            p, b = boxes[pair_pussy], boxes[pair_butt]
+            overlaps = ~((p[:, 2] < b[:, 0]) | (b[:, 2] < p[:, 0]) | (p[:, 3] < b[:, 1]) | (b[:, 3] < p[:, 1]))
+            close_up_frames, close_up_butt = _first_per_frame(frames[pair_pussy[overlaps]], pair_butt[overlaps])
+            close_up_areas[close_up_frames] = butt_areas[close_up_butt]
+
+        # boxes that may add to the distance
+        candidate_rows = np.flatnonzero(~self.ignored_classes[classes])
+        self.candidate_ranges = np.searchsorted(frames[candidate_rows], np.arange(frame_count + 1)).tolist()
+        self.candidates = list(zip(
+            [boxes_list[row] for row in candidate_rows.tolist()],
+            classes[candidate_rows].tolist(),
+            index.track_id[rows][candidate_rows].tolist()
+        ))
+
+        self.row_ranges = row_ranges.tolist()
+        self.close_up_areas = close_up_areas.tolist()
@@ -3,14 +3,18 @@ import time
 from datetime import timedelta
 
 import cv2
+import numpy as np
 from tqdm import tqdm
 
+from script_generator.analysis.tracking_features import TrackingFeatures
 from script_generator.constants import UPDATE_PROGRESS_INTERVAL
-from script_generator.constants import CLASS_COLORS
+from script_generator.constants import CLASS_COLORS, CLASS_REVERSE_MATCH
 from script_generator.debug.video_player.overlay_widgets import OverlayWidgets
 from script_generator.gui.messages.messages import ProgressMessage, UpdateGUIState
 from script_generator.object_detection.util.data import load_yolo_data
-from script_generator.object_detection.util.object_detection import make_data_boxes, parse_yolo_data_looking_for_penis
+from script_generator.object_detection.data_classes.detection_class import DetectionClass
+from script_generator.object_detection.data_classes.detection_index import DetectionIndex
+from script_generator.object_detection.util.object_detection import parse_yolo_data_looking_for_penis
 from script_generator.state.app_state import AppState
 from script_generator.utils.file import get_output_file_path
 from script_generator.debug.logger import log, log_tr
@@ -20,13 +24,15 @@ from utils.lib_ObjectTracker import ObjectTracker
 
 
 def analyze_tracking_results(state: AppState):
-    exists, yolo_data, raw_yolo_path, _ = load_yolo_data(state)
-    results = make_data_boxes(yolo_data)
+    exists, yolo_data, raw_yolo_path, _ = load_yolo_data(state, convert=True)
+    if not exists:
+        log_tr.error(f"No up to date raw YOLO detections found: {raw_yolo_path}. Further tracking is not possible.")
+        return
+    results = DetectionIndex(yolo_data)
     width, height = get_cropped_dimensions(state.video_info)
-    list_of_frames = results.get_all_frame_ids()  # Get all frame IDs with detections
 
     # Looking for the first instance of penis within the YOLO results
-    first_penis_frame = parse_yolo_data_looking_for_penis(yolo_data, 0)
+    first_penis_frame = parse_yolo_data_looking_for_penis(results, 0)
     if first_penis_frame is None:
         log_tr.error(f"No penis instance found in video. Further tracking is not possible.")
         return
@@ -74,18 +80,29 @@ def analyze_tracking_results(state: AppState):
             json.dump(cuts, f)
     """
 
-    state.funscript_frames = []  # List to store Funscript frames
-    state.funscript_distances = []
+    # Dense per frame index of the tracked range, the boxes of a frame are looked up with the offsets of the index
+    has_detections = results.get_frame_presence(state.frame_start_track, state.frame_end)
+
+    # A point is added at most once per frame with detections, so the arrays never have to grow
+    point_capacity = int(has_detections.sum())
+    state.funscript_frames = np.empty(point_capacity, dtype=np.int32)
+    state.funscript_distances = np.empty(point_capacity, dtype=np.int32)
     state.funscript_data = []
+    point_count = 0
+    has_detections = has_detections.tolist()  # python bools index faster than numpy ones in the per frame loop
+
+    # The features of the frames that don't depend on the tracking state are extracted with numpy, chunk by chunk
+    features = TrackingFeatures(results, video_info.is_vr, state.frame_area)
 
     # tracker = ObjectTracker(fps, state.frame_start, image_area, video_info.is_vr)  # Initialize the object tracker
     tracker = ObjectTracker(state)
 
     # Start time for ETA calculation
-    start_time = time.time()
+    start_time = state.tracking_start_time = time.time()
 
     last_ui_update_time = time.time()
     live_preview_mode_prev = state.live_preview_mode
+    memory_monitor = state.memory_monitor
 
     for frame_pos in tqdm(
             # range(state.frame_start, state.frame_end), unit="f", desc="Analyzing tracking data", position=0,
@@ -96,6 +113,9 @@ def analyze_tracking_results(state: AppState):
             unit_divisor=1
     ):
         state.current_frame_id = frame_pos
+        if memory_monitor:
+            memory_monitor.check_ceiling()
+
         if frame_pos in cuts:
             # Reinitialize the tracker at scene cuts
             log_tr.info(f"Reaching cut at frame {frame_pos}")
@@ -105,18 +125,18 @@ def analyze_tracking_results(state: AppState):
             tracker = ObjectTracker(state)
             tracker.previous_distances = previous_distances
 
-        if frame_pos in list_of_frames:
-            # Get sorted boxes for the current frame
-            sorted_boxes = results.get_boxes(frame_pos)
-            tracker.tracking_logic(state, sorted_boxes)  # Apply tracking logic
+        if has_detections[frame_pos - state.frame_start_track]:
+            tracker.track_frame(state, features.get(frame_pos))  # Apply tracking logic
 
             if tracker.distance:
                 # Append Funscript data if distance is available
-                state.funscript_frames.append(frame_pos)
-                state.funscript_distances.append(int(tracker.distance))
+                state.funscript_frames[point_count] = frame_pos
+                state.funscript_distances[point_count] = int(tracker.distance)
+                point_count += 1
 
             if state.save_debug_file:
                 # Log debugging information
+                sorted_boxes = results.get_boxes(frame_pos)
                 bounding_boxes = []
                 for box in sorted_boxes:
                     if box[4] in tracker.normalized_absolute_tracked_positions:
@@ -157,10 +177,10 @@ def analyze_tracking_results(state: AppState):
                         'tracked_body_part': tracker.tracked_body_part,
                         'locked_penis_box': tracker.locked_penis_box.to_dict(),
                         'glans_detected': tracker.glans_detected,
-                        'cons._glans_detections': tracker.consecutive_detections['glans'],
-                        'cons._glans_non_detections': tracker.consecutive_non_detections['glans'],
-                        'cons._penis_detections': tracker.consecutive_detections['penis'],
-                        'cons._penis_non_detections': tracker.consecutive_non_detections['penis'],
+                        'cons._glans_detections': tracker.consecutive_detections[DetectionClass.GLANS],
+                        'cons._glans_non_detections': tracker.consecutive_non_detections[DetectionClass.GLANS],
+                        'cons._penis_detections': tracker.consecutive_detections[DetectionClass.PENIS],
+                        'cons._penis_non_detections': tracker.consecutive_non_detections[DetectionClass.PENIS],
                         'breast_tracking': tracker.breast_tracking,
                     }
                 )
@@ -185,12 +205,13 @@ def analyze_tracking_results(state: AppState):
             ret, frame = reader.read()
             frame = frame.copy()
 
-            for box in tracker.tracked_boxes:
+            for box, cls, track_id in tracker.tracked_boxes:
+                class_name = CLASS_REVERSE_MATCH[cls]
                 frame = OverlayWidgets.draw_bounding_box(
                     frame,
-                    box[0],
-                    str(box[2]) + ": " + box[1],
-                    CLASS_COLORS[str(box[1])],
+                    box,
+                    str(track_id) + ": " + class_name,
+                    CLASS_COLORS[class_name],
                     state.offset_x
                 )
 
@@ -208,13 +229,13 @@ def analyze_tracking_results(state: AppState):
             if tracker.glans_detected:
                 frame = OverlayWidgets.draw_bounding_box(
                     frame,
-                    tracker.boxes['glans'],
+                    tracker.boxes[DetectionClass.GLANS],
                     "Glans",
                     CLASS_COLORS['glans'],
                     state.offset_x
                 )
-            if state.funscript_distances:
-                frame = OverlayWidgets.draw_gauge(frame, state.funscript_distances[-1])
+            if point_count:
+                frame = OverlayWidgets.draw_gauge(frame, int(state.funscript_distances[point_count - 1]))
 
             # Reinitialize the window if needed
             if cv2.getWindowProperty(window_name, cv2.WND_PROP_VISIBLE) < 1 and state.live_preview_mode:
@@ -245,6 +266,9 @@ def analyze_tracking_results(state: AppState):
                     eta=time.strftime("%H:%M:%S", time.gmtime(eta)) if eta != float('inf') else "Calculating..."
                 ))
 
+    state.funscript_frames = state.funscript_frames[:point_count]
+    state.funscript_distances = state.funscript_distances[:point_count]
+
     # stop processing when the task is force closed
     if state.analyze_task and state.analyze_task.is_stopped:
         return
@@ -259,7 +283,7 @@ def analyze_tracking_results(state: AppState):
         ))
 
     # Prepare Funscript data
-    state.funscript_data = list(zip(state.funscript_frames, state.funscript_distances))
+    state.funscript_data = list(zip(state.funscript_frames.tolist(), state.funscript_distances.tolist()))
 
     # Save the raw funscript data to JSON
     raw_funscript_path, _ = get_output_file_path(state.video_path, ".json", "rawfunscript")
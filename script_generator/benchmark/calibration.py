@@ -0,0 +1,194 @@
+import os
+import platform
+import time
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from typing import Dict, List, Optional, TYPE_CHECKING
+
+from script_generator.constants import OUTPUT_PATH, VERSION, VALID_VIDEO_READERS
+from script_generator.debug.logger import log
+from script_generator.scripts.analyze_video import analyze_video
+from script_generator.utils.file import ensure_path_exists
+from script_generator.utils.thread_budget import allocate_thread_budget, get_cpu_topology
+from script_generator.video.ffmpeg.hwaccel import get_working_hwaccels
+from script_generator.video.ffmpeg.synthetic import extract_test_clip, generate_test_video, get_test_video_filename
+
+if TYPE_CHECKING:
+    from script_generator.state.app_state import AppState
+
+CALIBRATION_PATH = os.path.join(OUTPUT_PATH, "calibration")
+
+CALIBRATION_BATCH_SIZES = [1] if platform.system() == "Darwin" else [1, 8, 16, 30, 60]  # Mac doesn't support batching
+CALIBRATION_QUEUE_SIZES = [25, 100, 200]
+
+# Relative speedup a setting needs over the best so far to be picked, smaller differences are run to run noise
+CALIBRATION_MIN_GAIN = 0.02
+
+# Settings the calibration tunes, they are stored as the pipeline profile in the config
+PROFILE_SETTINGS = ["video_reader", "ffmpeg_hwaccel", "yolo_batch_size", "queue_maxsize", "decoder_threads", "inference_threads"]
+
+
+@dataclass
+class CalibrationTrial:
+    settings: Dict
+    frames: int = 0
+    seconds: float = 0.0
+    fps: float = 0.0
+    error: Optional[str] = None
+
+
+def get_calibration_clip(state: "AppState", duration: float, video_path: Optional[str] = None, start: float = 0.0,
+                         width=3840, height=1920, is_vr=True) -> str:
+    """
+    Returns a clip to calibrate on: a part of the given video (copied, so it decodes like the original) or a synthetic
+    video of the given size.
+    """
+    ensure_path_exists(CALIBRATION_PATH)
+    if video_path:
+        base, ext = os.path.splitext(os.path.basename(video_path))
+        path = os.path.join(CALIBRATION_PATH, f"{base}_clip_{start:g}s_{duration:g}s{ext}")
+        if not os.path.exists(path):
+            extract_test_clip(state.ffmpeg_path, video_path, path, start, duration)
+        return path
+
+    filename = get_test_video_filename(width, height, 30, is_vr)
+    path = os.path.join(CALIBRATION_PATH, f"{os.path.splitext(filename)[0]}_{duration:g}s.mp4")
+    if not os.path.exists(path):
+        generate_test_video(state.ffmpeg_path, path, duration, width, height, 30, is_vr)
+    return path
+
+
+def get_current_settings(state: "AppState") -> Dict:
+    return {setting: getattr(state, setting) for setting in PROFILE_SETTINGS}
+
+
+def get_reader_candidates(state: "AppState") -> List[Dict]:
+    """
+    Video reader and hardware acceleration combinations that can work for the clip on this machine.
+    """
+    video = state.video_info
+    readers = [reader for reader in VALID_VIDEO_READERS if reader == "FFmpeg" or (video.is_vr and not video.is_fisheye)]
+    hwaccels = [None] + get_working_hwaccels(state.ffmpeg_path)
+    return [{"video_reader": reader, "ffmpeg_hwaccel": hwaccel} for reader in readers for hwaccel in hwaccels]
+
+
+def get_thread_candidates() -> List[Dict]:
+    """
+    The split of the thread budget and variations that give the decoder or inference more of the cores.
+    """
+    logical_cores, physical_cores = get_cpu_topology()
+    budget = allocate_thread_budget(1, logical_cores=logical_cores, physical_cores=physical_cores)
+    total = budget.decoder_threads + budget.inference_threads
+    candidates = [{"decoder_threads": None, "inference_threads": None}]
+    for inference_threads in sorted({1, 2, budget.inference_threads // 2, budget.inference_threads * 2}):
+        if 1 <= inference_threads < total and inference_threads != budget.inference_threads:
+            candidates.append({"decoder_threads": total - inference_threads, "inference_threads": inference_threads})
+    return candidates
+
+
+def run_trial(state: "AppState", settings: Dict) -> CalibrationTrial:
+    """
+    Runs object detection on the whole clip with the given settings and measures the end-to-end frames per second.
+    """
+    state.apply_pipeline_profile(settings)
+    state.resume_object_detection = False
+    trial = CalibrationTrial(settings=dict(settings))
+    log.info(f"[CALIBRATION] Trying {settings}")
+    start_time = time.perf_counter()
+    try:
+        result_sink = analyze_video(state)
+    except Exception as e:
+        log.warning(f"[CALIBRATION] Failed with {settings}: {e}")
+        trial.error = str(e)
+        return trial
+
+    trial.seconds = time.perf_counter() - start_time
+    trial.frames = result_sink.frames_processed if result_sink else 0
+    trial.fps = trial.frames / trial.seconds if trial.seconds > 0 else 0.0
+    return trial
+
+
+def calibrate(state: "AppState", clip_path: str) -> dict:
+    """
+    Finds the fastest pipeline settings for this machine. Every setting is swept in turn (video reader with hardware
+    acceleration, YOLO batch size, queue size and the thread split) while the others stay at the best value found so
+    far, which needs far fewer runs than trying every combination.
+
+    :return: The best profile and all trials.
+    """
+    state.video_path = clip_path
+    state.frame_start = 0
+    state.frame_end = None
+    state.reload_video_info()
+    if state.video_info is None:
+        raise RuntimeError(f"Could not probe the calibration clip {clip_path}")
+
+    trials: List[CalibrationTrial] = []
+    tried = {}
+
+    def try_settings(settings):
+        key = tuple(settings[setting] for setting in PROFILE_SETTINGS)
+        if key not in tried:
+            tried[key] = run_trial(state, settings)
+            trials.append(tried[key])
+        return tried[key]
+
+    # the first run includes loading the model and warming up the caches, it's not compared
+    log.info("[CALIBRATION] Warming up")
+    run_trial(state, get_current_settings(state))
+
+    best_settings = get_current_settings(state)
+    best = try_settings(best_settings)
+
+    sweeps = [
+        get_reader_candidates(state),
+        [{"yolo_batch_size": batch_size} for batch_size in CALIBRATION_BATCH_SIZES],
+        [{"queue_maxsize": queue_maxsize} for queue_maxsize in CALIBRATION_QUEUE_SIZES],
+        get_thread_candidates()
+    ]
+    for candidates in sweeps:
+        for candidate in candidates:
+            trial = try_settings({**best_settings, **candidate})
+            if trial.error is None and (best.error is not None or trial.fps > best.fps * (1 + CALIBRATION_MIN_GAIN)):
+                best, best_settings = trial, trial.settings
+
+    if best.error is not None:
+        raise RuntimeError("Every calibration run failed, see the log for details")
+
+    profile = {
+        **best_settings,
+        "fps": best.fps,
+        "calibrated": datetime.now().isoformat(timespec="seconds"),
+        "version": VERSION,
+        "clip": os.path.basename(clip_path)
+    }
+    return {"profile": profile, "trials": [asdict(trial) for trial in trials]}
+
+
+def save_pipeline_profile(state: "AppState", profile: dict):
+    """
+    Stores the profile in config.json, the detection pipeline applies it on start.
+    """
+    state.pipeline_profile = profile
+    state.apply_pipeline_profile(profile)
+    state.config_manager.save()
+
+
+def log_calibration_results(results: dict):
+    profile = results["profile"]
+    log_message = f"\n{'-' * 60}\n CALIBRATION\n\n"
+    for trial in sorted(results["trials"], key=lambda t: t["fps"], reverse=True):
+        settings = ", ".join(f"{k}: {v}" for k, v in trial["settings"].items())
+        outcome = f"failed ({trial['error']})" if trial["error"] else f"{trial['fps']:>7.1f} fps"
+        log_message += f"  - {outcome} | {settings}\n"
+    log_message += "\n Best profile\n"
+    for setting in PROFILE_SETTINGS:
+        value = profile[setting]
+        if value is None:
+            value = "none" if setting == "ffmpeg_hwaccel" else "auto"
+        log_message += f"  - {setting:<18}: {value}\n"
+    log_message += f"  - {'fps':<18}: {profile['fps']:.1f}\n"
+    log_message += f"{'-' * 60}\n"
+
+    for line in log_message.splitlines():
+        log.info(line)
@@ -0,0 +1,243 @@
+import json
+import os
+import platform
+import time
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, TYPE_CHECKING
+
+import numpy as np
+
+from script_generator.analysis.workers.analyze_tracking_results import analyze_tracking_results
+from script_generator.benchmark.stages import run_decode_stage
+from script_generator.constants import OUTPUT_PATH, VERSION
+from script_generator.debug.logger import log
+from script_generator.funscript.create_funscript import create_funscript
+from script_generator.funscript.debug.heatmap import generate_heatmap
+from script_generator.funscript.debug.report import create_funscript_report
+from script_generator.object_detection.util.fake_model import create_fake_model
+from script_generator.scripts.analyze_video import analyze_video
+from script_generator.tasks.data_classes.analyze_video_task import AnalyzeVideoTask
+from script_generator.utils.file import ensure_path_exists
+from script_generator.video.ffmpeg.synthetic import generate_test_video, get_test_video_filename
+
+if TYPE_CHECKING:
+    from script_generator.state.app_state import AppState
+
+REGRESSION_PATH = os.path.join(OUTPUT_PATH, "benchmark")
+REGRESSION_VIDEOS_PATH = os.path.join(REGRESSION_PATH, "videos")
+REGRESSION_HISTORY_PATH = os.path.join(REGRESSION_PATH, "regression_history.json")
+REGRESSION_BASELINE_PATH = os.path.join(REGRESSION_PATH, "regression_baseline.json")
+
+PHASES = ["probe", "decode", "detection", "tracking", "funscript", "report"]
+
+# Phases faster than this in both runs are not compared as their timing is mostly noise
+MIN_COMPARE_SECONDS = 0.1
+
+
+@dataclass
+class RegressionCase:
+    name: str
+    width: int
+    height: int
+    fps: int
+    is_vr: bool
+
+
+REGRESSION_CASES = [
+    RegressionCase(name="2d", width=1920, height=1080, fps=30, is_vr=False),
+    RegressionCase(name="vr_sbs", width=3840, height=1920, fps=30, is_vr=True),
+]
+
+
+def get_case_video(state: "AppState", case: RegressionCase, duration: float, video_dir: str = REGRESSION_VIDEOS_PATH):
+    """
+    Returns the synthetic video of a case, it's only generated once as ffmpeg's test source is deterministic.
+    """
+    ensure_path_exists(video_dir)
+    filename = get_test_video_filename(case.width, case.height, case.fps, case.is_vr)
+    path = os.path.join(video_dir, f"{os.path.splitext(filename)[0]}_{duration:g}s.mp4")
+    if not os.path.exists(path):
+        generate_test_video(state.ffmpeg_path, path, duration, case.width, case.height, case.fps, case.is_vr)
+    return path
+
+
+def time_phase(phases: Dict[str, dict], name: str, frames: Optional[int], fn: Callable):
+    """
+    Runs a phase and records its duration and throughput in video frames per second (None for phases that don't
+    depend on the number of frames). A failing phase is recorded with its error so the remaining phases still run.
+    """
+    log.info(f"[REGRESSION] Running phase: {name}")
+    start_time = time.perf_counter()
+    try:
+        result = fn()
+    except Exception as e:
+        log.error(f"[REGRESSION] Phase {name} failed: {e}")
+        phases[name] = {"error": str(e)}
+        return None
+
+    seconds = time.perf_counter() - start_time
+    phases[name] = {"seconds": seconds, "frames": frames, "fps": frames / seconds if frames and seconds > 0 else None}
+    return result
+
+
+def run_case(state: "AppState", case: RegressionCase, video_path: str, model_type: str, latency_ms: float) -> dict:
+    state.video_path = video_path
+    state.frame_start = 0
+    state.frame_end = None
+    state.resume_object_detection = False
+    state.copy_funscript_to_movie_dir = False
+    phases = {}
+
+    time_phase(phases, "probe", None, state.reload_video_info)
+    if state.video_info is None:
+        raise RuntimeError(f"Could not probe the test video {video_path}")
+    total_frames = state.video_info.total_frames
+
+    # the decoder reads the start frame from the analyze task
+    AnalyzeVideoTask(state, use_open_gl=False)
+    time_phase(phases, "decode", total_frames, lambda: run_decode_stage(state))
+
+    if model_type != "yolo":
+        state.yolo_model = create_fake_model(state, model_type, latency_ms)
+    time_phase(phases, "detection", total_frames, lambda: analyze_video(state))
+
+    state.funscript_data = time_phase(phases, "tracking", total_frames, lambda: analyze_tracking_results(state))
+    if state.funscript_data:
+        time_phase(phases, "funscript", total_frames, lambda: create_funscript(state))
+
+        def create_reports():
+            np.random.seed(0)  # the report picks random sections
+            generate_heatmap(state)
+            create_funscript_report(state)
+
+        time_phase(phases, "report", total_frames, create_reports)
+
+    return {"video": os.path.basename(video_path), "total_frames": total_frames, "phases": phases}
+
+
+def run_regression_benchmark(state: "AppState", cases: List[RegressionCase], duration: float, model_type: str, latency_ms: float = 0.0) -> dict:
+    """
+    Runs every phase of the app (probe, decode, detection, tracking, funscript and report) on synthetic videos.
+    """
+    if model_type == "yolo" and not state.yolo_model:
+        raise RuntimeError("The yolo model type needs a YOLO model in the models directory")
+
+    results = {}
+    for case in cases:
+        video_path = get_case_video(state, case, duration)
+        log.info(f"[REGRESSION] Running case {case.name}: {video_path}")
+        results[case.name] = run_case(state, case, video_path, model_type, latency_ms)
+
+    return {
+        "version": VERSION,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "machine": platform.node(),
+        "platform": platform.platform(),
+        "settings": {
+            "model": model_type,
+            "fake_latency_ms": latency_ms,
+            "video_reader": state.video_reader,
+            "ffmpeg_hwaccel": state.ffmpeg_hwaccel,
+            "duration": duration,
+            "cases": [asdict(case) for case in cases]
+        },
+        "cases": results
+    }
+
+
+def compare_with_baseline(run: dict, baseline: dict, threshold: float) -> List[dict]:
+    """
+    Compares the throughput of every phase with the baseline.
+
+    :param threshold: Allowed relative slowdown, e.g. 0.1 flags phases that are more than 10% slower.
+    :return: The phases that regressed or failed.
+    """
+    regressions = []
+    for case_name, case in run["cases"].items():
+        baseline_case = baseline.get("cases", {}).get(case_name)
+        if not baseline_case:
+            continue
+
+        for phase, result in case["phases"].items():
+            baseline_result = baseline_case["phases"].get(phase)
+            if not baseline_result or "error" in baseline_result:
+                continue
+
+            if "error" in result:
+                regressions.append({"case": case_name, "phase": phase, "error": result["error"]})
+                continue
+
+            if result["seconds"] < MIN_COMPARE_SECONDS and baseline_result["seconds"] < MIN_COMPARE_SECONDS:
+                continue
+
+            # compare fps where the phase scales with the video, the duration otherwise
+            if result["fps"] is not None and baseline_result["fps"]:
+                change = result["fps"] / baseline_result["fps"] - 1
+            else:
+                change = baseline_result["seconds"] / result["seconds"] - 1 if result["seconds"] > 0 else 0.0
+
+            if change < -threshold:
+                regressions.append({
+                    "case": case_name,
+                    "phase": phase,
+                    "baseline_seconds": baseline_result["seconds"],
+                    "seconds": result["seconds"],
+                    "change": change
+                })
+
+    return regressions
+
+
+def load_json_file(path: str, default=None):
+    if not os.path.exists(path):
+        return default
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_json_file(path: str, data):
+    ensure_path_exists(os.path.dirname(path))
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+
+
+def append_to_history(run: dict, path: str = REGRESSION_HISTORY_PATH):
+    history = load_json_file(path, [])
+    history.append(run)
+    save_json_file(path, history)
+
+
+def log_regression_results(run: dict, baseline: Optional[dict], regressions: List[dict]):
+    log_message = f"\n{'-' * 60}\n REGRESSION BENCHMARK ({run['settings']['model']} model)\n"
+    for case_name, case in run["cases"].items():
+        baseline_phases = (baseline or {}).get("cases", {}).get(case_name, {}).get("phases", {})
+        log_message += f"\n {case_name} ({case['total_frames']} frames)\n"
+        for phase in PHASES:
+            result = case["phases"].get(phase)
+            if result is None:
+                continue
+            if "error" in result:
+                log_message += f"  - {phase:<10}: failed ({result['error']})\n"
+                continue
+            baseline_seconds = baseline_phases.get(phase, {}).get("seconds")
+            compared = f" | baseline {baseline_seconds:.2f} s" if baseline_seconds else ""
+            fps = f" | {result['fps']:>8.1f} fps" if result["fps"] is not None else ""
+            log_message += f"  - {phase:<10}: {result['seconds']:>7.2f} s{fps}{compared}\n"
+
+    if baseline is None:
+        log_message += "\n No baseline to compare with, save one with --save-baseline\n"
+    elif regressions:
+        log_message += f"\n {len(regressions)} regression(s) compared to the baseline of {baseline['created']}\n"
+        for r in regressions:
+            detail = r["error"] if "error" in r else f"{-r['change'] * 100:.1f}% slower"
+            log_message += f"  - {r['case']} {r['phase']}: {detail}\n"
+    else:
+        log_message += f"\n No regressions compared to the baseline of {baseline['created']}\n"
+    log_message += f"{'-' * 60}\n"
+
+    for line in log_message.splitlines():
+        if regressions:
+            log.warning(line)
+        else:
+            log.info(line)
@@ -0,0 +1,258 @@
+import json
+import os
+import queue
+import shutil
+import tempfile
+import time
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from typing import Callable, List, Optional, TYPE_CHECKING
+
+import numpy as np
+
+from script_generator.constants import BENCHMARK_RSS_SAMPLE_INTERVAL, VERSION, OBJECT_DETECTION_VERSION
+from script_generator.debug.logger import log
+from script_generator.object_detection.util.raw_yolo_writer import get_yolo_model_name
+from script_generator.object_detection.workers.post_process_worker import PostProcessWorker
+from script_generator.object_detection.workers.yolo_worker import YoloWorker
+from script_generator.tasks.data_classes.analyze_video_task import AnalyzeVideoTask
+from script_generator.tasks.workers.abstract_task_processor import AbstractTaskProcessor
+from script_generator.utils.memory import PeakRssSampler
+from script_generator.video.analyse_frame_task import AnalyzeFrameTask
+from script_generator.video.workers.ffmpeg_worker import VideoWorker
+from script_generator.video.workers.vr_to_2d_worker import VrTo2DWorker
+
+if TYPE_CHECKING:
+    from script_generator.state.app_state import AppState
+
+
+@dataclass
+class StageResult:
+    stage: str
+    frames: int = 0
+    seconds: float = 0.0
+    fps: float = 0.0
+    p50_ms: float = 0.0
+    p99_ms: float = 0.0
+    peak_rss_mb: Optional[float] = None
+    skipped: Optional[str] = None  # reason why the stage did not run
+
+
+class FrameCache:
+    def __init__(self, directory: str, name: str, max_frames: int):
+        """
+        Frames recorded by one stage and replayed into the next one. The frames are kept in a memory mapped file so
+        the benchmark doesn't need to hold every frame in RAM.
+        """
+        self.path = os.path.join(directory, f"{name}.npy")
+        self.max_frames = max_frames
+        self.frames = None
+        self.frame_positions = []
+
+    def add(self, frame_pos: int, frame: np.ndarray):
+        if self.frames is None:
+            self.frames = np.lib.format.open_memmap(self.path, mode="w+", dtype=np.uint8, shape=(self.max_frames, *frame.shape))
+        self.frames[len(self.frame_positions)] = frame
+        self.frame_positions.append(frame_pos)
+
+    def __iter__(self):
+        for i, frame_pos in enumerate(self.frame_positions):
+            yield frame_pos, np.asarray(self.frames[i])
+
+    def __len__(self):
+        return len(self.frame_positions)
+
+    def close(self):
+        # release the mapping so the file can be removed (Windows keeps mapped files locked)
+        self.frames = None
+
+
+class StageRecorder:
+    def __init__(self, process_type, on_task: Optional[Callable[[AnalyzeFrameTask], None]] = None):
+        """
+        Output queue of a benchmarked worker. Records the latency of the stage for every task and hands the task
+        to a callback which records the input of the next stage.
+        """
+        self.process_type = process_type
+        self.on_task = on_task
+        self.durations = []
+
+    def put(self, task, block=True, timeout=None):
+        if task is None:
+            return
+        duration = task.get_duration(self.process_type)
+        if duration is not None:
+            self.durations.append(duration)
+        if self.on_task:
+            self.on_task(task)
+
+
+class DiscardingWriter:
+    """
+    Stands in for the RawYoloWriter so benchmarking the post-processing stage never touches the detections on disk.
+    """
+    def __init__(self):
+        self.record_count = 0
+
+    def add_record(self, record):
+        self.record_count += 1
+
+    def frame_done(self, frame_pos):
+        pass
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+    def finish(self):
+        pass
+
+
+class BenchmarkPostProcessWorker(PostProcessWorker):
+    def create_writer(self):
+        return DiscardingWriter()
+
+
+def run_stage(name: str, worker: AbstractTaskProcessor, recorder: StageRecorder, tasks: Optional[List[AnalyzeFrameTask]] = None) -> StageResult:
+    """
+    Runs a single pipeline worker to completion. The input tasks are queued up front so only the stage itself is
+    measured.
+    """
+    if tasks is not None:
+        for task in tasks:
+            worker.input_queue.put(task)
+        worker.input_queue.put(None)
+
+    log.info(f"[BENCHMARK] Running stage: {name}")
+    with PeakRssSampler(BENCHMARK_RSS_SAMPLE_INTERVAL) as rss:
+        start_time = time.perf_counter()
+        worker.start()
+        worker.join()
+        seconds = time.perf_counter() - start_time
+    worker.check_exception()
+
+    durations = np.array(recorder.durations) * 1000
+    frames = len(recorder.durations)
+    return StageResult(
+        stage=name,
+        frames=frames,
+        seconds=seconds,
+        fps=frames / seconds if seconds > 0 else 0.0,
+        p50_ms=float(np.percentile(durations, 50)) if frames else 0.0,
+        p99_ms=float(np.percentile(durations, 99)) if frames else 0.0,
+        peak_rss_mb=rss.peak / (1024 * 1024) if rss.peak is not None else None
+    )
+
+
+def run_decode_stage(state: "AppState", frame_end: Optional[int] = None, on_task: Optional[Callable[[AnalyzeFrameTask], None]] = None) -> StageResult:
+    """
+    Decodes the video from state.analyze_task.frame_start up to and including frame_end (None decodes until the end).
+    """
+    recorder = StageRecorder(VideoWorker.process_type, on_task)
+    worker = VideoWorker(state=state, output_queue=recorder)
+    worker.frame_end = frame_end
+    return run_stage("decode", worker, recorder)
+
+
+def benchmark_stages(state: "AppState", frame_count: int) -> dict:
+    """
+    Runs the object detection stages one after the other on the same frames: decode, VR to 2D projection, YOLO on the
+    recorded projected frames and post-processing on the recorded YOLO results.
+
+    :param state: App state with the video info set, state.frame_start selects the first frame.
+    :param frame_count: Number of frames to run through every stage.
+    :return: Machine-readable results of all stages.
+    """
+    use_open_gl = state.video_reader == "FFmpeg + OpenGL (Windows)" and state.video_info.is_vr and not state.video_info.is_fisheye
+    if state.video_reader == "FFmpeg + OpenGL (Windows)" and not use_open_gl:
+        state.video_reader = "FFmpeg"
+
+    # the analyze task holds the shared run state the workers read (start frame, stop/failure flags)
+    analyze_task = AnalyzeVideoTask(state, use_open_gl)
+    frame_start = analyze_task.frame_start
+    frame_end = frame_start + frame_count - 1
+
+    cache_dir = tempfile.mkdtemp(prefix="benchmark_")
+    decoded = FrameCache(cache_dir, "decoded", frame_count)
+    rendered = FrameCache(cache_dir, "rendered", frame_count) if use_open_gl else decoded
+    stages = []
+    try:
+        # Decode
+        def record_decoded(task):
+            frame = task.preprocessed_frame if task.preprocessed_frame is not None else task.rendered_frame
+            decoded.add(task.frame_pos, frame)
+
+        stages.append(run_decode_stage(state, frame_end, record_decoded))
+
+        # Projection
+        if use_open_gl:
+            opengl_recorder = StageRecorder(VrTo2DWorker.process_type, lambda t: rendered.add(t.frame_pos, t.rendered_frame))
+            opengl_worker = VrTo2DWorker(state=state, input_queue=queue.Queue(), output_queue=opengl_recorder)
+            tasks = [AnalyzeFrameTask(frame_pos=frame_pos, preprocessed_frame=frame) for frame_pos, frame in decoded]
+            stages.append(run_stage("projection", opengl_worker, opengl_recorder, tasks))
+        else:
+            reason = "VR projection is done by the FFmpeg filters in the decode stage" if state.video_info.is_vr else "2D video"
+            stages.append(StageResult(stage="projection", skipped=reason))
+
+        # YOLO
+        yolo_tasks = []
+        yolo_recorder = StageRecorder(YoloWorker.process_type, yolo_tasks.append)
+        yolo_worker = YoloWorker(state=state, input_queue=queue.Queue(), output_queue=yolo_recorder)
+        tasks = [AnalyzeFrameTask(frame_pos=frame_pos, rendered_frame=frame) for frame_pos, frame in rendered]
+        stages.append(run_stage("yolo", yolo_worker, yolo_recorder, tasks))
+
+        # Post-processing
+        post_process_recorder = StageRecorder(PostProcessWorker.process_type)
+        post_process_worker = BenchmarkPostProcessWorker(state=state, input_queue=queue.Queue(), output_queue=post_process_recorder)
+        stages.append(run_stage("post_process", post_process_worker, post_process_recorder, yolo_tasks))
+        yolo_tasks.clear()
+    finally:
+        decoded.close()
+        rendered.close()
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    return {
+        "version": VERSION,
+        "object_detection_version": OBJECT_DETECTION_VERSION,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "video": {
+            "path": state.video_path,
+            "width": state.video_info.width,
+            "height": state.video_info.height,
+            "fps": state.video_info.fps,
+            "is_vr": state.video_info.is_vr
+        },
+        "settings": {
+            "video_reader": state.video_reader,
+            "ffmpeg_hwaccel": state.ffmpeg_hwaccel,
+            "yolo_model": get_yolo_model_name(state),
+            "yolo_batch_size": state.yolo_batch_size,
+            "frame_start": frame_start,
+            "frame_count": frame_count
+        },
+        "stages": [asdict(stage) for stage in stages]
+    }
+
+
+def save_benchmark_results(results: dict, path: str):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+
+def log_benchmark_results(results: dict):
+    log_message = f"\n{'-' * 60}\n STAGE BENCHMARK ({results['settings']['video_reader']})\n\n"
+    for stage in results["stages"]:
+        if stage["skipped"]:
+            log_message += f"  - {stage['stage']:<13}: skipped ({stage['skipped']})\n"
+            continue
+        rss = f"{stage['peak_rss_mb']:.0f} MB" if stage["peak_rss_mb"] is not None else "n/a"
+        log_message += (
+            f"  - {stage['stage']:<13}: {stage['fps']:>7.1f} fps | p50 {stage['p50_ms']:>6.1f} ms | "
+            f"p99 {stage['p99_ms']:>6.1f} ms | peak RSS {rss}\n"
+        )
+    log_message += f"{'-' * 60}\n"
+
+    for line in log_message.splitlines():
+        log.info(line)
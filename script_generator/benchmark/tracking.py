@@ -0,0 +1,262 @@
+import json
+import os
+import platform
+import time
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from typing import Iterator, List, Optional, TYPE_CHECKING
+
+import numpy as np
+
+from script_generator.analysis.workers.analyze_tracking_results import analyze_tracking_results
+from script_generator.constants import BENCHMARK_RSS_SAMPLE_INTERVAL, OBJECT_DETECTION_VERSION, OUTPUT_PATH, VERSION
+from script_generator.debug.logger import log
+from script_generator.object_detection.util.data import check_yolo_data, get_raw_yolo_path
+from script_generator.object_detection.util.detection_columns import read_detection_file_header, write_detection_columns
+from script_generator.object_detection.util.fake_model import SyntheticYoloModel
+from script_generator.utils.file import check_create_output_folder, ensure_path_exists, get_output_file_path
+from script_generator.utils.memory import PeakRssSampler
+from script_generator.video.data_classes.video_info import VideoInfo
+
+if TYPE_CHECKING:
+    from script_generator.state.app_state import AppState
+
+TRACKING_BENCHMARK_PATH = os.path.join(OUTPUT_PATH, "benchmark", "tracking")
+
+# Video lengths in minutes, from a short clip to a full length movie
+TRACKING_BENCHMARK_DURATIONS = [10, 30, 60, 180]
+
+# Frames of synthetic detections generated and written at a time
+SYNTHETIC_CHUNK_FRAMES = 10000
+
+
+@dataclass
+class TrackingResult:
+    minutes: float
+    frames: int
+    detections: int = 0
+    funscript_points: int = 0
+    load_seconds: float = 0.0  # loading the detections and building the index
+    seconds: float = 0.0
+    fps: float = 0.0
+    peak_rss_mb: Optional[float] = None
+    error: Optional[str] = None
+
+
+@dataclass
+class ReplayResult:
+    video: str
+    frames: int = 0
+    points: int = 0
+    reference_points: int = 0
+    seconds: float = 0.0
+    fps: float = 0.0
+    matches: bool = False
+    first_mismatch: Optional[int] = None  # index of the first point that differs from the reference
+    error: Optional[str] = None
+
+
+def get_synthetic_video_path(minutes: float, fps: int, width: int, height: int) -> str:
+    """
+    Path of the (never created) video the synthetic detections belong to, the detections and the funscript of the
+    benchmark are stored in its output folder like for a real video.
+    """
+    return os.path.join(TRACKING_BENCHMARK_PATH, f"tracking_{minutes:g}min_{fps}fps_{width}x{height}.mp4")
+
+
+def generate_synthetic_chunks(frame_count: int, width: int, height: int, detections_per_frame: int) -> Iterator[List[list]]:
+    """
+    Yields the records the synthetic model would detect on every frame of a video of the given size.
+    """
+    tracks = SyntheticYoloModel(detections_per_frame=detections_per_frame).tracks
+    box_size = min(width, height) // 8
+    for chunk_start in range(0, frame_count, SYNTHETIC_CHUNK_FRAMES):
+        frames = np.arange(chunk_start, min(chunk_start + SYNTHETIC_CHUNK_FRAMES, frame_count))
+        columns = []
+        for i, (cls, conf, phase) in enumerate(tracks):
+            cx = int(width * (i + 0.5) / detections_per_frame)
+            cy = (height / 2 + height / 4 * np.sin(frames / 15 + phase)).astype(np.int64)
+            columns.append(np.stack([
+                frames, np.full(len(frames), cls), np.full(len(frames), conf),
+                np.full(len(frames), cx - box_size // 2), cy - box_size // 2,
+                np.full(len(frames), cx + box_size // 2), cy + box_size // 2,
+                np.full(len(frames), i + 1)
+            ], axis=1))
+        # records of a frame are kept together, in track order
+        yield np.stack(columns, axis=1).reshape(-1, 8).tolist()
+
+
+def prepare_synthetic_video(state: "AppState", minutes: float, fps: int, width: int, height: int, detections_per_frame: int):
+    """
+    Points the state at a synthetic video and writes its detections, they're only generated once as they're
+    deterministic.
+
+    :return: Number of detections of the video.
+    """
+    frame_count = int(minutes * 60 * fps)
+    state.video_path = get_synthetic_video_path(minutes, fps, width, height)
+    # set directly, there is no video file to probe
+    state.video_info = VideoInfo(state.video_path, codec_name="synthetic", width=width, height=height,
+                                 duration=minutes * 60, total_frames=frame_count, fps=fps, is_vr=False)
+    state.frame_start = 0
+    state.frame_end = None
+
+    exists, path, _ = check_yolo_data(state)
+    if exists:
+        return read_detection_file_header(path)["record_count"]
+
+    check_create_output_folder(state.video_path)
+    log.info(f"[TRACKING] Generating detections of {frame_count} frames: {get_raw_yolo_path(state)}")
+    chunks = generate_synthetic_chunks(frame_count, width, height, detections_per_frame)
+    write_detection_columns(get_raw_yolo_path(state), OBJECT_DETECTION_VERSION, frame_count * detections_per_frame, chunks)
+    return frame_count * detections_per_frame
+
+
+def run_tracking(state: "AppState", minutes: float, detections: int) -> TrackingResult:
+    frames = state.video_info.total_frames
+    result = TrackingResult(minutes=minutes, frames=frames, detections=detections)
+    log.info(f"[TRACKING] Tracking {minutes:g} minutes ({frames} frames)")
+
+    with PeakRssSampler(BENCHMARK_RSS_SAMPLE_INTERVAL) as rss:
+        # time.time() like the tracking itself, it sets its start time once the detections are loaded and indexed
+        start_time = state.tracking_start_time = time.time()
+        try:
+            funscript_data = analyze_tracking_results(state)
+        except Exception as e:
+            log.error(f"[TRACKING] Tracking {minutes:g} minutes failed: {e}")
+            result.error = str(e)
+            return result
+        result.seconds = time.time() - start_time
+    result.load_seconds = max(state.tracking_start_time - start_time, 0.0)
+    result.funscript_points = len(funscript_data or [])
+    result.fps = frames / result.seconds if result.seconds > 0 else 0.0
+    result.peak_rss_mb = rss.peak / (1024 * 1024) if rss.peak is not None else None
+    return result
+
+
+def benchmark_tracking(state: "AppState", durations: List[float], fps: int = 30, width: int = 640, height: int = 640,
+                       detections_per_frame: int = 6) -> dict:
+    """
+    Times the tracking analysis (loading the detections, the tracker and writing the raw funscript) on synthetic
+    detections of videos of different lengths. The throughput should stay the same for every length, a drop on the
+    longer videos points to work that grows with the length of the video.
+
+    :param durations: Video lengths in minutes.
+    """
+    state.save_debug_file = False
+    state.live_preview_mode = False
+    state.update_ui = None
+
+    results = []
+    for minutes in durations:
+        detections = prepare_synthetic_video(state, minutes, fps, width, height, detections_per_frame)
+        results.append(run_tracking(state, minutes, detections))
+
+    return {
+        "version": VERSION,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "machine": platform.node(),
+        "platform": platform.platform(),
+        "settings": {"fps": fps, "width": width, "height": height, "detections_per_frame": detections_per_frame},
+        "results": [asdict(result) for result in results]
+    }
+
+
+def replay_tracking(state: "AppState", video_path: str) -> ReplayResult:
+    """
+    Runs the tracking on the stored raw YOLO detections of a video and compares the points with its stored raw funscript,
+    made by an earlier version of the tracker. Changes that should only make the tracker faster must not change a
+    single point. The reference is written back afterwards, so a mismatch can be replayed again.
+    """
+    result = ReplayResult(video=os.path.basename(video_path))
+    state.video_path = video_path
+    state.frame_start = 0
+    state.frame_end = None
+    state.reload_video_info()
+    if state.video_info is None:
+        result.error = "could not probe the video"
+        return result
+
+    exists, raw_yolo_path, _ = check_yolo_data(state)
+    raw_funscript_path, _ = get_output_file_path(video_path, ".json", "rawfunscript")
+    if not exists or not os.path.exists(raw_funscript_path):
+        result.error = "no up to date raw YOLO detections and raw funscript to replay"
+        return result
+
+    with open(raw_funscript_path, "r") as f:
+        reference = json.load(f)
+
+    log.info(f"[TRACKING] Replaying {raw_yolo_path}")
+    start_time = state.tracking_start_time = time.time()
+    try:
+        funscript_data = analyze_tracking_results(state) or []
+    except Exception as e:
+        log.error(f"[TRACKING] Replaying {video_path} failed: {e}")
+        result.error = str(e)
+        return result
+    finally:
+        with open(raw_funscript_path, "w") as f:
+            json.dump(reference, f)
+    result.seconds = time.time() - start_time
+
+    points = [list(point) for point in funscript_data]
+    result.frames = state.video_info.total_frames
+    result.points = len(points)
+    result.reference_points = len(reference)
+    result.fps = result.frames / result.seconds if result.seconds > 0 else 0.0
+    result.matches = points == reference
+    if not result.matches:
+        result.first_mismatch = next((i for i, (a, b) in enumerate(zip(points, reference)) if a != b), min(len(points), len(reference)))
+    return result
+
+
+def replay_tracking_videos(state: "AppState", video_paths: List[str]) -> dict:
+    state.save_debug_file = False
+    state.live_preview_mode = False
+    state.update_ui = None
+
+    results = [replay_tracking(state, video_path) for video_path in video_paths]
+    return {
+        "version": VERSION,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "machine": platform.node(),
+        "platform": platform.platform(),
+        "replays": [asdict(result) for result in results]
+    }
+
+
+def log_tracking_results(results: dict):
+    log_message = f"\n{'-' * 60}\n TRACKING\n\n"
+    for result in results.get("replays", []):
+        if result["error"]:
+            outcome = f"failed ({result['error']})"
+        elif result["matches"]:
+            outcome = f"matches the reference ({result['points']} points)"
+        else:
+            outcome = f"DIFFERS from point {result['first_mismatch']} ({result['points']} points, reference {result['reference_points']})"
+        log_message += f"  - {result['video']}: {result['fps']:>8.0f} f/s | {outcome}\n"
+
+    for result in results.get("results", []):
+        name = f"{result['minutes']:g} min"
+        if result["error"]:
+            log_message += f"  - {name:<9}: failed ({result['error']})\n"
+            continue
+        peak_rss = f"{result['peak_rss_mb']:.0f} MB" if result["peak_rss_mb"] is not None else "n/a"
+        log_message += (
+            f"  - {name:<9}: {result['fps']:>8.0f} f/s | {result['seconds']:>7.1f} s for {result['frames']} frames "
+            f"(load {result['load_seconds']:.1f} s) | {result['funscript_points']} points | peak RSS {peak_rss}\n"
+        )
+
+    fps = [result["fps"] for result in results.get("results", []) if not result["error"] and result["fps"] > 0]
+    if len(fps) > 1:
+        log_message += f"\n Slowest / fastest throughput: {min(fps) / max(fps):.2f}\n"
+    log_message += f"{'-' * 60}\n"
+
+    for line in log_message.splitlines():
+        log.info(line)
+
+
+def save_tracking_results(results: dict, path: str):
+    ensure_path_exists(os.path.dirname(path) or ".")
+    with open(path, "w") as f:
+        json.dump(results, f, indent=4)
@@ -0,0 +1,100 @@
+import argparse
+import sys
+
+from script_generator.benchmark.regression import (
+    REGRESSION_BASELINE_PATH,
+    REGRESSION_CASES,
+    REGRESSION_HISTORY_PATH,
+    append_to_history,
+    compare_with_baseline,
+    load_json_file,
+    log_regression_results,
+    run_regression_benchmark,
+    save_json_file,
+)
+from script_generator.constants import BENCHMARK_REGRESSION_THRESHOLD
+from script_generator.debug.logger import log
+from script_generator.object_detection.util.fake_model import FAKE_MODEL_TYPES
+from script_generator.state.app_state import AppState
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time every phase of the app on synthetic 2D and VR videos and compare the results with a baseline."
+    )
+    parser.add_argument(
+        "--cases",
+        nargs="+",
+        choices=[case.name for case in REGRESSION_CASES],
+        default=[case.name for case in REGRESSION_CASES],
+        help="Test videos to run."
+    )
+    parser.add_argument(
+        "--duration",
+        type=float,
+        default=60,
+        help="Duration of the test videos in seconds, the report needs at least 60 seconds."
+    )
+    parser.add_argument(
+        "--model",
+        type=str,
+        choices=FAKE_MODEL_TYPES + ["yolo"],
+        default="synthetic",
+        help="Detection model, replay needs the raw YOLO files of a previous run and yolo the model in the models directory."
+    )
+    parser.add_argument(
+        "--fake-latency-ms",
+        type=float,
+        default=0.0,
+        help="Time in milliseconds the fake model takes per batch."
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=BENCHMARK_REGRESSION_THRESHOLD,
+        help=f"Relative slowdown of a phase that counts as a regression (default {BENCHMARK_REGRESSION_THRESHOLD})."
+    )
+    parser.add_argument(
+        "--baseline",
+        type=str,
+        default=REGRESSION_BASELINE_PATH,
+        help="Path of the baseline results."
+    )
+    parser.add_argument(
+        "--history",
+        type=str,
+        default=REGRESSION_HISTORY_PATH,
+        help="Path of the results history, every run is appended to it."
+    )
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="Store the results of this run as the new baseline."
+    )
+
+    args = parser.parse_args()
+
+    state = AppState()
+    configured, msg = state.is_configured() if args.model == "yolo" else (True, None)
+    if not configured:
+        log.warn(msg)
+        sys.exit(2)
+
+    cases = [case for case in REGRESSION_CASES if case.name in args.cases]
+    run = run_regression_benchmark(state, cases, args.duration, args.model, args.fake_latency_ms)
+    append_to_history(run, args.history)
+
+    baseline = load_json_file(args.baseline)
+    regressions = compare_with_baseline(run, baseline, args.threshold) if baseline else []
+    log_regression_results(run, baseline, regressions)
+
+    if args.save_baseline:
+        save_json_file(args.baseline, run)
+        log.info(f"Saved the results as the new baseline: {args.baseline}")
+
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
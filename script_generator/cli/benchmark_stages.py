@@ -0,0 +1,75 @@
+import argparse
+import sys
+
+from script_generator.benchmark.stages import benchmark_stages, log_benchmark_results, save_benchmark_results
+from script_generator.cli.shared.common_args import (
+    add_shared_generate_funscript_args,
+    validate_and_adjust_args,
+    build_app_state_from_args,
+)
+from script_generator.constants import BENCHMARK_FRAME_COUNT
+from script_generator.debug.logger import log
+from script_generator.utils.file import check_create_output_folder, get_output_file_path
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the object detection stages (decode, projection, YOLO and post-processing) in isolation."
+    )
+    parser.add_argument(
+        "video_path",
+        type=str,
+        help="Path to the input video file."
+    )
+    parser.add_argument(
+        "--frame-count",
+        type=int,
+        default=BENCHMARK_FRAME_COUNT,
+        help=f"Number of frames every stage processes, starting at --frame-start (default {BENCHMARK_FRAME_COUNT})."
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        help="Path of the JSON results file, defaults to benchmark_stages.json in the output folder of the video."
+    )
+    add_shared_generate_funscript_args(parser)
+
+    args = parser.parse_args()
+    validate_and_adjust_args(args)
+
+    provided_args = set()
+    for token in sys.argv[1:]:
+        if token.startswith("--"):
+            flag_name = token.lstrip("-").replace("-", "_")
+            provided_args.add(flag_name)
+        else:
+            provided_args.add("video_path")
+
+    try:
+        log.info(f"Benchmarking video: {args.video_path}")
+
+        state = build_app_state_from_args(args, provided_args)
+        configured, msg = state.is_configured()
+        if not configured:
+            log.warn(msg)
+            return
+
+        state.set_video_info()
+        results = benchmark_stages(state, args.frame_count)
+        log_benchmark_results(results)
+
+        output_path = args.output
+        if not output_path:
+            check_create_output_folder(state.video_path)
+            output_path, _ = get_output_file_path(state.video_path, ".json", "benchmark_stages")
+        save_benchmark_results(results, output_path)
+        log.info(f"Benchmark results saved to {output_path}")
+
+    except Exception as e:
+        log.error(f"An error occurred: {e}")
+        import traceback
+        traceback.print_exc()
+
+
+if __name__ == "__main__":
+    main()
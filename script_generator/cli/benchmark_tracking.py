@@ -0,0 +1,78 @@
+import argparse
+import os
+import sys
+
+from script_generator.benchmark.tracking import (
+    TRACKING_BENCHMARK_DURATIONS,
+    TRACKING_BENCHMARK_PATH,
+    benchmark_tracking,
+    log_tracking_results,
+    replay_tracking_videos,
+    save_tracking_results,
+)
+from script_generator.debug.logger import log
+from script_generator.state.app_state import AppState
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the tracking analysis on synthetic detections of videos from 10 minutes to 3 hours."
+    )
+    parser.add_argument(
+        "--durations",
+        type=float,
+        nargs="+",
+        default=TRACKING_BENCHMARK_DURATIONS,
+        help=f"Video lengths in minutes (default {' '.join(str(d) for d in TRACKING_BENCHMARK_DURATIONS)})."
+    )
+    parser.add_argument(
+        "--fps",
+        type=int,
+        default=30,
+        help="Frame rate of the synthetic videos."
+    )
+    parser.add_argument(
+        "--detections-per-frame",
+        type=int,
+        default=6,
+        help="Number of detections on every frame."
+    )
+    parser.add_argument(
+        "--replay",
+        type=str,
+        nargs="+",
+        metavar="VIDEO_PATH",
+        help="Instead of the synthetic videos, replay the stored raw YOLO detections of these videos and check that the "
+             "tracking gives exactly the points of their stored raw funscript."
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        default=os.path.join(TRACKING_BENCHMARK_PATH, "benchmark_tracking.json"),
+        help="Path of the JSON results file."
+    )
+
+    args = parser.parse_args()
+
+    try:
+        state = AppState()
+        if args.replay:
+            results = replay_tracking_videos(state, args.replay)
+        else:
+            results = benchmark_tracking(state, args.durations, args.fps, detections_per_frame=args.detections_per_frame)
+        log_tracking_results(results)
+        save_tracking_results(results, args.output)
+        log.info(f"Tracking benchmark results saved to {args.output}")
+
+    except Exception as e:
+        log.error(f"An error occurred: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(2)
+
+    if any(not replay["matches"] for replay in results.get("replays", [])):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import argparse
+import json
+import os
+import sys
+
+from script_generator.benchmark.calibration import (
+    CALIBRATION_PATH,
+    calibrate,
+    get_calibration_clip,
+    log_calibration_results,
+    save_pipeline_profile,
+)
+from script_generator.constants import CALIBRATION_CLIP_SECONDS
+from script_generator.debug.logger import log
+from script_generator.object_detection.util.fake_model import FAKE_MODEL_TYPES, create_fake_model
+from script_generator.state.app_state import AppState
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Find the fastest video reader, hardware acceleration, batch size, queue size and thread split for "
+                    "this machine and store them in config.json."
+    )
+    parser.add_argument(
+        "video_path",
+        type=str,
+        nargs="?",
+        help="Video to calibrate on (a clip is copied from it), a synthetic video is used when omitted."
+    )
+    parser.add_argument(
+        "--start",
+        type=float,
+        default=60,
+        help="Start of the clip in the video in seconds."
+    )
+    parser.add_argument(
+        "--duration",
+        type=float,
+        default=CALIBRATION_CLIP_SECONDS,
+        help=f"Duration of the clip in seconds (default {CALIBRATION_CLIP_SECONDS})."
+    )
+    parser.add_argument(
+        "--width",
+        type=int,
+        default=3840,
+        help="Width of the synthetic video."
+    )
+    parser.add_argument(
+        "--height",
+        type=int,
+        default=1920,
+        help="Height of the synthetic video."
+    )
+    parser.add_argument(
+        "--2d",
+        dest="is_2d",
+        action="store_true",
+        help="Generate a 2D synthetic video instead of a side by side VR video."
+    )
+    parser.add_argument(
+        "--fake-model",
+        type=str,
+        choices=FAKE_MODEL_TYPES,
+        help="Calibrate with a fake model instead of YOLO, only useful to test the calibration itself."
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Only report the best settings, don't store them in config.json."
+    )
+
+    args = parser.parse_args()
+
+    state = AppState()
+    if args.fake_model:
+        state.yolo_model = create_fake_model(state, args.fake_model)
+    if not state.yolo_model:
+        log.warn("YOLO model is not loaded. Please make sure to download the YOLO model to the models directory.")
+        sys.exit(2)
+    if not state.ffmpeg_path or not state.ffprobe_path:
+        log.warn("FFmpeg or FFprobe is missing. Please provide the correct paths in the settings.")
+        sys.exit(2)
+
+    try:
+        clip_path = get_calibration_clip(
+            state, args.duration, args.video_path, args.start if args.video_path else 0.0,
+            args.width, args.height, not args.is_2d
+        )
+        results = calibrate(state, clip_path)
+        log_calibration_results(results)
+
+        results_path = os.path.join(CALIBRATION_PATH, "calibration_results.json")
+        with open(results_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        log.info(f"Calibration results saved to {results_path}")
+
+        if not args.dry_run:
+            save_pipeline_profile(state, results["profile"])
+            log.info("Stored the best settings as the pipeline profile in config.json, they are used for all videos from now on")
+
+    except Exception as e:
+        log.error(f"An error occurred: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
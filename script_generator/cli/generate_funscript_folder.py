@@ -1,6 +1,7 @@
 import argparse
 import concurrent.futures
 import os
+import queue
 import sys
 import time
 from collections import deque
@@ -134,6 +135,14 @@ def main():
 
         tasks = deque(to_process)
 
+        # every parallel subprocess serves its metrics on its own port, a port is handed to the next video when done
+        metrics_ports = None
+        if args.metrics_port:
+            metrics_ports = queue.Queue()
+            for i in range(args.num_workers):
+                metrics_ports.put(args.metrics_port + i)
+            log.info(f"Serving metrics of the running videos on ports {args.metrics_port}-{args.metrics_port + args.num_workers - 1}")
+
         log.info(f"Starting batch generation with up to {args.num_workers} parallel subprocesses.")
 
         # Dictionary to keep track of the submitted tasks
@@ -149,7 +158,7 @@ def main():
                 video_path = tasks.popleft()
                 log.debug(f"[Submit] {video_path}")
                 running.append(video_path)
-                future = executor.submit(run_task_timed, video_path)
+                future = executor.submit(run_task_timed, video_path, args.num_workers, metrics_ports, args.deadline)
                 future_to_video[future] = video_path
                 time.sleep(0.1)  # slight delay to stagger submissions
 
@@ -192,12 +201,17 @@ def main():
     except Exception as e:
         log.error(f"An error occurred: {e}", exc_info=True)
 
-def run_task(video_path):
+def run_task(video_path, concurrent_jobs=1, metrics_port=None, deadline=None):
     """
     Runs the funscript generation for one video in a new terminal window.
     Returns the exit code (0 if successful).
     """
-    cmd = f'python -m script_generator.cli.generate_funscript_single "{video_path}"'
+    # every subprocess only uses its share of the cores
+    cmd = f'python -m script_generator.cli.generate_funscript_single "{video_path}" --concurrent-jobs {concurrent_jobs}'
+    if metrics_port:
+        cmd += f" --metrics-port {metrics_port}"
+    if deadline:
+        cmd += f" --deadline {deadline}"
     proc = open_new_terminal(cmd, relative_path_up=2)
     if proc is None:
         print(f"Failed to launch terminal for: {video_path}")
@@ -207,13 +221,18 @@ def run_task(video_path):
     return proc.returncode
 
 
-def run_task_timed(video_path):
+def run_task_timed(video_path, concurrent_jobs=1, metrics_ports=None, deadline=None):
     """
     Wraps run_task to record how long it takes.
     Returns a tuple: (exit code, elapsed_time_in_seconds).
     """
+    metrics_port = metrics_ports.get() if metrics_ports else None
     start = time.time()
-    ret = run_task(video_path)
+    try:
+        ret = run_task(video_path, concurrent_jobs, metrics_port, deadline)
+    finally:
+        if metrics_ports:
+            metrics_ports.put(metrics_port)
     elapsed = time.time() - start
     return ret, elapsed
 
@@ -8,6 +8,7 @@ from script_generator.cli.shared.common_args import (
 )
 from script_generator.cli.shared.generate_funscript import generate_funscript
 from script_generator.debug.logger import log
+from script_generator.debug.metrics_server import start_metrics_server, stop_metrics_server
 
 
 def main():
@@ -32,10 +33,12 @@ def main():
         else:
             provided_args.add("video_path")
 
+    metrics_server = None
     try:
         log.info(f"Processing video: {args.video_path}")
 
         state = build_app_state_from_args(args, provided_args)
+        metrics_server = start_metrics_server(state)
         state.set_video_info()
         generate_funscript(state)
         log.info("Funscript generation complete.")
@@ -45,6 +48,9 @@ def main():
         import traceback
         traceback.print_exc()
 
+    finally:
+        stop_metrics_server(metrics_server)
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,41 @@
+import argparse
+import os
+
+from script_generator.debug.logger import log
+from script_generator.state.app_state import AppState
+from script_generator.utils.file import ensure_path_exists
+from script_generator.video.ffmpeg.synthetic import generate_test_video, get_test_video_filename
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Generate a synthetic test video with ffmpeg's testsrc2, e.g. to benchmark the pipeline with --fake-model."
+    )
+    parser.add_argument(
+        "output_dir",
+        type=str,
+        help="Folder to write the video to."
+    )
+    parser.add_argument("--duration", type=float, default=60, help="Duration in seconds.")
+    parser.add_argument("--width", type=int, default=1920, help="Width of the frame (both eyes for VR).")
+    parser.add_argument("--height", type=int, default=1080, help="Height of the frame.")
+    parser.add_argument("--fps", type=int, default=30, help="Frame rate.")
+    parser.add_argument("--vr", action="store_true", help="Generate a side by side VR video.")
+
+    args = parser.parse_args()
+
+    try:
+        state = AppState()
+        ensure_path_exists(args.output_dir)
+        path = os.path.join(args.output_dir, get_test_video_filename(args.width, args.height, args.fps, args.vr))
+        generate_test_video(state.ffmpeg_path, path, args.duration, args.width, args.height, args.fps, args.vr)
+        log.info(f"Test video saved to {path}")
+
+    except Exception as e:
+        log.error(f"An error occurred: {e}")
+        import traceback
+        traceback.print_exc()
+
+
+if __name__ == "__main__":
+    main()
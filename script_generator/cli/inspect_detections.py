@@ -0,0 +1,91 @@
+import argparse
+import sys
+
+import numpy as np
+
+from script_generator.constants import CLASS_REVERSE_MATCH
+from script_generator.debug.logger import log
+from script_generator.object_detection.data_classes.detection_index import DetectionIndex
+from script_generator.object_detection.util.data import load_yolo_data
+from script_generator.state.app_state import AppState
+
+
+def get_longest_run(presence: np.ndarray):
+    """
+    :return: First frame and length of the longest run of consecutive frames in the presence timeline.
+    """
+    edges = np.diff(np.concatenate(([0], presence.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    if len(starts) == 0:
+        return None, 0
+    longest = int(np.argmax(ends - starts))
+    return int(starts[longest]), int(ends[longest] - starts[longest])
+
+
+def log_detection_summary(index: DetectionIndex, min_conf: float, top_tracks: int):
+    frame_ids = index.get_all_frame_ids()
+    log_message = f"\n{'-' * 60}\n DETECTIONS\n\n"
+    log_message += f"  {len(index)} detections in {len(frame_ids)} frames"
+    if len(frame_ids):
+        log_message += f" ({frame_ids[0]} - {frame_ids[-1]})"
+    log_message += f"\n\n Class presence (confidence >= {min_conf})\n"
+
+    for cls, class_name in CLASS_REVERSE_MATCH.items():
+        presence = index.get_class_presence(cls, min_conf)
+        frames = int(presence.sum())
+        if frames == 0:
+            continue
+        run_start, run_length = get_longest_run(presence)
+        log_message += (
+            f"  - {class_name:<12}: {frames:>7} frames ({frames / max(len(frame_ids), 1) * 100:5.1f}%), "
+            f"longest run {run_length} frames from frame {run_start}\n"
+        )
+
+    spans = index.get_track_spans()
+    log_message += f"\n Longest of {len(spans)} tracks\n"
+    for track_id, (first, last, count) in sorted(spans.items(), key=lambda s: s[1][1] - s[1][0], reverse=True)[:top_tracks]:
+        log_message += f"  - track {track_id:<6}: frames {first} - {last}, {count} detections\n"
+    log_message += f"{'-' * 60}\n"
+
+    for line in log_message.splitlines():
+        log.info(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Summarize the raw YOLO detections of a video: class presence and the longest tracks."
+    )
+    parser.add_argument(
+        "video_path",
+        type=str,
+        help="Path to the video file of which the detections are inspected."
+    )
+    parser.add_argument(
+        "--min-conf",
+        type=float,
+        default=0.5,
+        help="Minimum confidence for a detection to count as present."
+    )
+    parser.add_argument(
+        "--top-tracks",
+        type=int,
+        default=10,
+        help="Number of tracks to list."
+    )
+
+    args = parser.parse_args()
+
+    state = AppState()
+    state.video_path = args.video_path
+    exists, yolo_data, path, _ = load_yolo_data(state)
+    if not exists:
+        log.warn(f"No up to date raw YOLO detections found for {args.video_path}")
+        sys.exit(2)
+
+    log.info(f"Inspecting detections: {path}")
+    log_detection_summary(DetectionIndex(yolo_data), args.min_conf, args.top_tracks)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,7 @@ import os
 
 from script_generator.constants import VALID_VIDEO_READERS
 from script_generator.debug.logger import log
+from script_generator.object_detection.util.fake_model import FAKE_MODEL_TYPES, create_fake_model
 from script_generator.state.app_state import AppState
 
 # TODO this is a workaround and needs to be fixed properly
@@ -17,6 +18,11 @@ def add_shared_generate_funscript_args(parser: argparse.ArgumentParser) -> None:
         action="store_true",
         help="Re-use an existing raw YOLO output file if available."
     )
+    parser.add_argument(
+        "--no-resume",
+        action="store_true",
+        help="Start object detection from scratch instead of resuming an interrupted run."
+    )
     parser.add_argument(
         "--copy-funscript",
         action="store_true",
@@ -42,6 +48,68 @@ def add_shared_generate_funscript_args(parser: argparse.ArgumentParser) -> None:
         action="store_true",
         help="Saves a debug file to disk with all collected metrics."
     )
+    parser.add_argument(
+        "--trace",
+        action="store_true",
+        help="Records a timeline of the object detection pipeline to trace.json (open it in https://ui.perfetto.dev)."
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Samples the stacks of all threads during object detection and tracking and saves them as collapsed stacks for flamegraphs."
+    )
+    parser.add_argument(
+        "--memory-monitor",
+        action="store_true",
+        help="Samples the memory usage per phase and saves a timeline with the largest memory holders."
+    )
+    parser.add_argument(
+        "--tracemalloc",
+        action="store_true",
+        help="Memory monitor: Also trace python allocations per file (slows down processing)."
+    )
+    parser.add_argument(
+        "--memory-ceiling-mb",
+        type=float,
+        help="Stops processing with a memory report when the process uses more than this many MB (implies --memory-monitor)."
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        help="Serves live metrics on http://127.0.0.1:<port>/metrics (Prometheus) and /metrics.json while processing."
+    )
+    parser.add_argument(
+        "--stall-timeout",
+        type=float,
+        help="Seconds without progress after which a pipeline stage is reported as stalled with its state and the thread stacks (0 disables)."
+    )
+    parser.add_argument(
+        "--restart-stalled-decoder",
+        action="store_true",
+        help="Restarts FFmpeg from the last decoded frame when decoding stalls."
+    )
+    parser.add_argument(
+        "--concurrent-jobs",
+        type=int,
+        help="Number of videos processed in parallel on this machine, the CPU cores are divided between them (set by the folder command)."
+    )
+    parser.add_argument(
+        "--deadline",
+        type=float,
+        help="Minutes object detection of a video may take, the frame stride, inference resolution, batch size and skipping of near-duplicate frames are adapted on the fly to finish in time."
+    )
+    parser.add_argument(
+        "--fake-model",
+        type=str,
+        choices=FAKE_MODEL_TYPES,
+        help="Benchmarking: Replace YOLO with a fake model that replays the existing raw YOLO file or generates synthetic detections."
+    )
+    parser.add_argument(
+        "--fake-latency-ms",
+        type=float,
+        default=0.0,
+        help="Benchmarking: Time in milliseconds the fake model takes per batch."
+    )
     parser.add_argument(
         "--boost-enabled",
         action="store_true",
@@ -129,6 +197,8 @@ def build_app_state_from_args(args: argparse.Namespace, provided_args: set) -> A
         state.video_path = args.video_path
     if "reuse_yolo" in provided_args:
         state.use_existing_raw_yolo = args.reuse_yolo
+    if "no_resume" in provided_args:
+        state.resume_object_detection = not args.no_resume
     if "copy_funscript" in provided_args:
         state.copy_funscript_to_movie_dir = args.copy_funscript
     if "frame_start" in provided_args:
@@ -139,6 +209,30 @@ def build_app_state_from_args(args: argparse.Namespace, provided_args: set) -> A
         state.video_reader = args.video_reader
     if "save_debug_file" in provided_args:
         state.save_debug_file = args.save_debug_file
+    if "trace" in provided_args:
+        state.trace_pipeline = args.trace
+    if "profile" in provided_args:
+        state.profile_pipeline = args.profile
+    if "memory_monitor" in provided_args:
+        state.memory_monitor_enabled = args.memory_monitor
+    if "tracemalloc" in provided_args:
+        state.memory_tracemalloc = args.tracemalloc
+    if "memory_ceiling_mb" in provided_args:
+        state.memory_ceiling_mb = args.memory_ceiling_mb
+    if "metrics_port" in provided_args:
+        state.metrics_port = args.metrics_port
+    if "stall_timeout" in provided_args:
+        state.pipeline_stall_seconds = args.stall_timeout
+    if "restart_stalled_decoder" in provided_args:
+        state.restart_stalled_decoder = args.restart_stalled_decoder
+    if "concurrent_jobs" in provided_args:
+        state.concurrent_jobs = args.concurrent_jobs
+    if "deadline" in provided_args:
+        state.deadline_seconds = args.deadline * 60
+    if "fake_model" in provided_args:
+        state.yolo_model = create_fake_model(state, args.fake_model, args.fake_latency_ms)
+        # never mix fake detections with a checkpoint of a real run
+        state.resume_object_detection = False
 
     # Boosting
     if "boost_enabled" in provided_args:
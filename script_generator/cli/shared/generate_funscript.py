@@ -1,4 +1,4 @@
-from script_generator.object_detection.util.data import get_raw_yolo_file_info, load_yolo_data
+from script_generator.object_detection.util.data import check_yolo_data, get_raw_yolo_file_info
 from script_generator.scripts.analyze_video import analyze_video
 from script_generator.scripts.tracking_analysis import tracking_analysis
 from script_generator.state.app_state import AppState, log_state_settings
@@ -18,7 +18,7 @@ def generate_funscript(state: AppState):
         state.frame_start = to_int_or_none(state.frame_start)
         state.frame_end = to_int_or_none(state.frame_end)
 
-        exists, yolo_data, _, _ = load_yolo_data(state)
+        exists, _, _ = check_yolo_data(state)
 
         # analyze video if required
         if not state.use_existing_raw_yolo or not exists:
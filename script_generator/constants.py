@@ -25,16 +25,31 @@ VR_TO_2D_PITCH = -21  # The dataset is trained on -25
 UPDATE_PROGRESS_INTERVAL = 0.2  # Updates progress in the console and in gui
 STEP_SIZE = 120  # Define custom colormap based on Lucife's heatmapColors | Speed step size for color transitions
 QUEUE_MAXSIZE = 100  # Bounded queue size to avoid memory blow-up as raw frames consume a lot of memory, does not increase performance
+OBJECT_DETECTION_CHECKPOINT_INTERVAL = 1800  # Number of frames after which detections are flushed to disk and a resume checkpoint is written
+QUEUE_MEMORY_BUDGET_MB = 1024  # Default memory budget (MB) for all frames waiting in the pipeline queues of a single video
+PIPELINE_STALL_SECONDS = 120  # A pipeline stage that makes no progress for this long is reported as stalled (0 disables the watchdog)
+PIPELINE_WATCHDOG_INTERVAL = 1.0  # Interval (in seconds) at which the watchdog checks the progress of the pipeline stages
+FFMPEG_STDERR_MAX_LINES = 100  # Number of most recent ffmpeg log lines kept for error messages
+DEADLINE_MIN_DWELL_SECONDS = 10  # Seconds the deadline controller (--deadline) keeps a quality level before changing it again
+DEADLINE_SAFETY_MARGIN = 0.05  # Relative throughput above the required one the deadline controller aims for
+NEAR_DUPLICATE_THRESHOLD = 2.0  # Mean absolute difference (0-255) of the frame thumbnails below which a frame counts as a near-duplicate
+NEAR_DUPLICATE_MAX_SKIP = 15  # Maximum number of frames in a row that reuse the detections of a near-duplicate frame
+TRACK_IDLE_SECONDS = 10  # The tracker forgets the history of a track that hasn't been tracked for this long (0 keeps every track)
 
 ##################################################################################################
 # DEV
 ##################################################################################################
 
-# when enabled the queue will be processed one by one (use it on (QUEUE_MAXSIZE / frame rate) seconds longer videos or less)
-# raw frames take a lot of memory (RAM) so don't set the queue to high
-SEQUENTIAL_MODE = False
-if SEQUENTIAL_MODE:
-    QUEUE_MAXSIZE = 3000
+BENCHMARK_FRAME_COUNT = 300  # Default number of frames each stage processes in the benchmark_stages command
+BENCHMARK_RSS_SAMPLE_INTERVAL = 0.01  # Interval (in seconds) at which the benchmark samples the memory usage of a stage
+BENCHMARK_REGRESSION_THRESHOLD = 0.1  # Relative slowdown of a phase compared to the baseline that the regression benchmark flags
+CALIBRATION_CLIP_SECONDS = 10  # Duration of the clip every configuration of the calibrate command processes
+TRACE_MAX_EVENTS = 1_000_000  # Ring buffer size of the pipeline tracer (--trace), the oldest events are dropped first
+TRACE_MIN_WAIT_US = 500  # Queue waits shorter than this (in microseconds) are not added to the trace
+PROFILER_INTERVAL = 0.02  # Sampling interval (in seconds) of the profiler (--profile)
+MEMORY_MONITOR_INTERVAL = 0.5  # Sampling interval (in seconds) of the memory monitor (--memory-monitor)
+MEMORY_MONITOR_TOP_ALLOCATIONS = 15  # Number of files with the most allocations reported when tracemalloc is enabled
+METRICS_HOST = "127.0.0.1"  # Interface the metrics endpoint (--metrics-port) listens on
 
 ##################################################################################################
 # DEFAULT CONFIG
@@ -49,7 +64,11 @@ DEFAULT_CONFIG = {
     "copy_funscript_to_movie_dir": True,
     "funscript_output_dir": None,
     "make_funscript_backup": True,
-    "log_level": "INFO"
+    "log_level": "INFO",
+    "queue_memory_budget_mb": QUEUE_MEMORY_BUDGET_MB,
+    "pipeline_stall_seconds": PIPELINE_STALL_SECONDS,
+    "track_idle_seconds": TRACK_IDLE_SECONDS,
+    "pipeline_profile": None  # Fastest pipeline settings found by the calibrate command
 }
 
 ##################################################################################################
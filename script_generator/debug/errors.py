@@ -3,3 +3,6 @@ class FFProbeError(Exception):
 
 class FFMpegError(Exception):
     pass
+
+class MemoryCeilingError(Exception):
+    pass
@@ -0,0 +1,235 @@
+import itertools
+import json
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Callable, Dict, Optional, TYPE_CHECKING
+
+import numpy as np
+
+from script_generator.constants import MEMORY_MONITOR_INTERVAL, MEMORY_MONITOR_TOP_ALLOCATIONS
+from script_generator.debug.errors import MemoryCeilingError
+from script_generator.debug.logger import log
+from script_generator.utils.file import check_create_output_folder, get_output_file_path
+from script_generator.utils.memory import get_rss_bytes
+
+if TYPE_CHECKING:
+    from script_generator.state.app_state import AppState
+
+MB = 1024 * 1024
+
+
+def deep_getsizeof(obj) -> int:
+    """
+    Size of an object including the lists, tuples and dicts it contains.
+    """
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_getsizeof(k) + deep_getsizeof(v) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple)):
+        size += sum(deep_getsizeof(item) for item in obj)
+    return size
+
+
+def estimate_container_bytes(container, sample_size=10) -> int:
+    """
+    Estimates the size of a large list or dict from the deep size of a few of its items, measuring every item would
+    take too long to do while the pipeline is running.
+    """
+    if isinstance(container, np.ndarray):
+        return container.nbytes
+    if not container:
+        return sys.getsizeof(container) if container is not None else 0
+    try:
+        items = container.values() if isinstance(container, dict) else container
+        sample = list(itertools.islice(items, sample_size))
+    except RuntimeError:
+        # the dict was resized by the thread filling it
+        return 0
+    per_item = sum(deep_getsizeof(item) for item in sample) / len(sample)
+    return int(sys.getsizeof(container) + per_item * len(container))
+
+
+def get_default_holders(state: "AppState") -> Dict[str, Callable[[], int]]:
+    """
+    Functions that return the bytes held by the major memory consumers of the app.
+    """
+    def queue_bytes(name):
+        def get():
+            analyze_task = state.analyze_task
+            return getattr(analyze_task, name).nbytes if analyze_task else 0
+        return get
+
+    def unflushed_records():
+        analyze_task = state.analyze_task
+        writer = analyze_task.yolo_analysis_thread.writer if analyze_task else None
+        return estimate_container_bytes(writer.chunk) if writer else 0
+
+    return {
+        "OpenGL queue frames": queue_bytes("opengl_q"),
+        "YOLO queue frames": queue_bytes("yolo_q"),
+        "Analysis queue frames and results": queue_bytes("analysis_q"),
+        "Unflushed detection records": unflushed_records,
+        "Debug metrics": lambda: estimate_container_bytes(state.debug_data.metrics),
+        "Funscript data": lambda: sum(estimate_container_bytes(data) for data in (state.funscript_data, state.funscript_frames, state.funscript_distances)),
+    }
+
+
+class MemoryMonitor:
+    def __init__(self, state: "AppState", phase: str, ceiling_mb: Optional[float] = None, use_tracemalloc=False,
+                 on_ceiling: Optional[Callable[[], None]] = None, interval=MEMORY_MONITOR_INTERVAL):
+        """
+        Samples the process RSS and the bytes held by the major memory consumers of a phase in a background thread.
+
+        :param state: App state of the video being processed.
+        :param phase: Name of the phase (used for the output file).
+        :param ceiling_mb: RSS in MB above which the phase is aborted, None disables the ceiling.
+        :param use_tracemalloc: Also trace python allocations (slow) and report the files that allocated the most.
+        :param on_ceiling: Called from the monitor thread when the ceiling is exceeded, used to stop the phase.
+        :param interval: Sampling interval in seconds.
+        """
+        self.state = state
+        self.phase = phase
+        self.ceiling_bytes = int(ceiling_mb * MB) if ceiling_mb else None
+        self.use_tracemalloc = use_tracemalloc
+        self.on_ceiling = on_ceiling
+        self.interval = interval
+        self.holders = get_default_holders(state)
+        self.samples = []
+        self.peak_rss = 0
+        self.peak_holders = {name: 0 for name in self.holders}
+        self.top_allocations = []
+        self.ceiling_exceeded = False
+        self._started_tracemalloc = False
+        self._start_time = None
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        if self.ceiling_bytes and get_rss_bytes() is None:
+            log.warn("The memory ceiling is disabled as the memory usage can't be measured on this system (install psutil)")
+            self.ceiling_bytes = None
+
+    def add_holder(self, name: str, get_bytes: Callable[[], int]):
+        self.holders[name] = get_bytes
+        self.peak_holders[name] = 0
+
+    def sample(self, notify=True):
+        """
+        :param notify: Call on_ceiling when the ceiling is exceeded, the samples taken while the phase is not running
+                       only record it and leave raising to check_ceiling.
+        """
+        rss = get_rss_bytes() or 0
+        holders = {}
+        for name, get_bytes in self.holders.items():
+            try:
+                holders[name] = get_bytes()
+            except Exception:
+                holders[name] = 0
+            self.peak_holders[name] = max(self.peak_holders[name], holders[name])
+        self.peak_rss = max(self.peak_rss, rss)
+
+        sample = {"t": round(time.time() - self._start_time, 3), "rss_mb": rss / MB, "holders_mb": {k: v / MB for k, v in holders.items()}}
+        if self.use_tracemalloc and tracemalloc.is_tracing():
+            sample["traced_mb"] = tracemalloc.get_traced_memory()[0] / MB
+        self.samples.append(sample)
+
+        if self.ceiling_bytes and rss > self.ceiling_bytes and not self.ceiling_exceeded:
+            self.ceiling_exceeded = True
+            log.error(self.get_ceiling_message())
+            if notify and self.on_ceiling:
+                self.on_ceiling()
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            self.sample()
+
+    def start(self):
+        if self.use_tracemalloc and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        self._start_time = time.time()
+        self.sample(notify=False)
+        self._thread = threading.Thread(target=self._run, name="MemoryMonitor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+        self.sample(notify=False)
+
+        if self.use_tracemalloc and tracemalloc.is_tracing():
+            stats = tracemalloc.take_snapshot().statistics("filename")
+            self.top_allocations = [
+                {"file": str(stat.traceback[0].filename), "size_mb": stat.size / MB, "count": stat.count}
+                for stat in stats[:MEMORY_MONITOR_TOP_ALLOCATIONS]
+            ]
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def get_largest_holders(self, count=3):
+        return sorted(self.peak_holders.items(), key=lambda item: item[1], reverse=True)[:count]
+
+    def get_ceiling_message(self):
+        holders = ", ".join(f"{name}: {nbytes / MB:.0f} MB" for name, nbytes in self.get_largest_holders() if nbytes >= MB)
+        return (
+            f"Memory ceiling of {self.ceiling_bytes / MB:.0f} MB exceeded during {self.phase} "
+            f"(RSS {self.peak_rss / MB:.0f} MB). Largest holders: {holders or 'none measured'}. "
+            f"See memory_{self.phase}.json in the output folder for the timeline."
+        )
+
+    def check_ceiling(self):
+        """
+        Raises a MemoryCeilingError in the calling thread when the ceiling was exceeded.
+        """
+        if self.ceiling_exceeded:
+            raise MemoryCeilingError(self.get_ceiling_message())
+
+    def to_dict(self):
+        return {
+            "phase": self.phase,
+            "interval": self.interval,
+            "ceiling_mb": self.ceiling_bytes / MB if self.ceiling_bytes else None,
+            "ceiling_exceeded": self.ceiling_exceeded,
+            "peak_rss_mb": self.peak_rss / MB,
+            "peak_holders_mb": {k: v / MB for k, v in self.peak_holders.items()},
+            "top_allocations": self.top_allocations,
+            "samples": self.samples
+        }
+
+    def export(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f)
+
+        log_message = f"Memory timeline saved to {path}, peak RSS {self.peak_rss / MB:.0f} MB"
+        for name, nbytes in self.get_largest_holders():
+            log_message += f"\n  - {name:<35}: peak {nbytes / MB:.0f} MB"
+        for allocation in self.top_allocations[:3]:
+            log_message += f"\n  - {allocation['file']}: {allocation['size_mb']:.0f} MB allocated"
+        for line in log_message.splitlines():
+            log.info(line)
+
+
+def start_memory_monitor(state: "AppState", phase: str, on_ceiling: Optional[Callable[[], None]] = None) -> Optional[MemoryMonitor]:
+    if not state.memory_monitor_enabled and not state.memory_ceiling_mb:
+        return None
+    monitor = MemoryMonitor(state, phase, state.memory_ceiling_mb, state.memory_tracemalloc, on_ceiling)
+    monitor.start()
+    state.memory_monitor = monitor
+    return monitor
+
+
+def stop_memory_monitor(state: "AppState", monitor: Optional[MemoryMonitor]):
+    """
+    Stops the monitor and writes the timeline to output/<video>/memory_<phase>.json.
+    """
+    if monitor is None:
+        return
+    monitor.stop()
+    if state.memory_monitor is monitor:
+        state.memory_monitor = None
+    check_create_output_folder(state.video_path)
+    path, _ = get_output_file_path(state.video_path, ".json", f"memory_{monitor.phase}")
+    monitor.export(path)
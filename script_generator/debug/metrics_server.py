@@ -0,0 +1,229 @@
+import json
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, TYPE_CHECKING
+
+from script_generator.constants import METRICS_HOST
+from script_generator.debug.logger import log
+
+if TYPE_CHECKING:
+    from script_generator.state.app_state import AppState
+
+METRICS_PREFIX = "funscript"
+
+
+class ErrorCounter(logging.Handler):
+    def __init__(self):
+        """
+        Counts the error log records of all loggers, installed on the root logger while the metrics server runs.
+        """
+        super().__init__(level=logging.ERROR)
+        self.count = 0
+
+    def emit(self, record):
+        self.count += 1
+
+
+def collect_metrics(state: "AppState", error_count=0) -> dict:
+    """
+    Snapshot of the counters the pipeline already maintains (result sink, stage queues and tracking progress).
+    """
+    video = os.path.basename(state.video_path) if state.video_path else None
+    metrics = {"video": video, "errors": error_count, "object_detection": None, "tracking": None}
+
+    analyze_task = state.analyze_task
+    if analyze_task:
+        result_sink = analyze_task.result_sink
+        end_time = analyze_task.end_time or time.time()
+        elapsed = max(end_time - analyze_task.start_time, 1e-6)
+        frames_processed = result_sink.frames_processed
+        total_frames = state.video_info.total_frames if state.video_info else 0
+        fps = frames_processed / elapsed
+        remaining_frames = max(total_frames - analyze_task.frames_resumed - frames_processed, 0)
+        queues = [analyze_task.yolo_q, analyze_task.analysis_q]
+        if analyze_task.use_open_gl:
+            queues.insert(0, analyze_task.opengl_q)
+
+        stages = {}
+        for stage, stats in result_sink.get_stage_stats().items():
+            stage_name = str(stage)
+            stages[stage_name] = stats.to_dict()
+            # share of the wall time the stage was busy, stages that process batches count the batch for every frame
+            stages[stage_name]["utilization"] = stats.total / elapsed
+            stages[stage_name]["fps"] = 1 / stats.mean() if stats.mean() > 0 else 0.0
+
+        metrics["object_detection"] = {
+            "frames_processed": analyze_task.frames_resumed + frames_processed,
+            "total_frames": total_frames,
+            "fps": fps,
+            "eta_seconds": remaining_frames / fps if fps > 0 else None,
+            "running": analyze_task.end_time is None and not analyze_task.is_stopped and not analyze_task.has_failed,
+            "stopped": analyze_task.is_stopped,
+            "failed": analyze_task.has_failed,
+            "queue_memory_bytes": analyze_task.memory_budget.used,
+            "queues": {q.name: {"size": q.qsize(), "bytes": q.nbytes} for q in queues},
+            "stages": stages,
+            "decoder_warnings": analyze_task.decode_thread.get_ffmpeg_warnings(),
+            "decoder_restarts": analyze_task.decode_thread.restart_count,
+            "quality_level": analyze_task.deadline_controller.level_index if analyze_task.deadline_controller else None
+        }
+
+    if state.tracking_start_time:
+        frames_processed = max(state.current_frame_id + 1 - state.frame_start_track, 0)
+        total_frames = max((state.frame_end or 0) - state.frame_start_track, 0)
+        elapsed = max(time.time() - state.tracking_start_time, 1e-6)
+        metrics["tracking"] = {
+            "frames_processed": frames_processed,
+            "total_frames": total_frames,
+            "fps": frames_processed / elapsed
+        }
+
+    return metrics
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    escaped = {k: str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for k, v in labels.items()}
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped.items()) + "}"
+
+
+def to_prometheus(metrics: dict) -> str:
+    """
+    Formats the metrics in the Prometheus text exposition format.
+    """
+    lines = []
+    video_labels = {"video": metrics["video"] or ""}
+
+    def add(name, metric_type, help_text, samples):
+        lines.append(f"# HELP {METRICS_PREFIX}_{name} {help_text}")
+        lines.append(f"# TYPE {METRICS_PREFIX}_{name} {metric_type}")
+        for suffix, labels, value in samples:
+            if value is not None:
+                lines.append(f"{METRICS_PREFIX}_{name}{suffix}{_format_labels(labels)} {float(value):g}")
+
+    add("errors_total", "counter", "Number of errors logged.", [("", video_labels, metrics["errors"])])
+
+    od = metrics["object_detection"]
+    if od:
+        add("detection_frames_processed_total", "counter", "Frames processed by object detection.", [("", video_labels, od["frames_processed"])])
+        add("detection_frames", "gauge", "Frames to process by object detection.", [("", video_labels, od["total_frames"])])
+        add("detection_fps", "gauge", "Average object detection frames per second.", [("", video_labels, od["fps"])])
+        add("detection_eta_seconds", "gauge", "Estimated time until object detection is done.", [("", video_labels, od["eta_seconds"])])
+        add("detection_running", "gauge", "Whether object detection is running.", [("", video_labels, od["running"])])
+        add("detection_failed", "gauge", "Whether object detection failed.", [("", video_labels, od["failed"])])
+        add("queue_memory_bytes", "gauge", "Bytes held by all stage queues.", [("", video_labels, od["queue_memory_bytes"])])
+        add("queue_size", "gauge", "Number of frames waiting in a stage queue.",
+            [("", {**video_labels, "queue": name}, q["size"]) for name, q in od["queues"].items()])
+        add("queue_bytes", "gauge", "Bytes held by a stage queue.",
+            [("", {**video_labels, "queue": name}, q["bytes"]) for name, q in od["queues"].items()])
+        add("decoder_warnings_total", "counter", "Warnings FFmpeg reported while decoding, by category.",
+            [("", {**video_labels, "category": category}, count) for category, count in od["decoder_warnings"].items()])
+        add("decoder_restarts_total", "counter", "Number of times the stalled decoder was restarted.", [("", video_labels, od["decoder_restarts"])])
+        add("quality_level", "gauge", "Quality level of the deadline controller, 0 is full quality.", [("", video_labels, od["quality_level"])])
+        add("stage_fps", "gauge", "Frames per second a stage could process on its own.",
+            [("", {**video_labels, "stage": name}, s["fps"]) for name, s in od["stages"].items()])
+        add("stage_utilization", "gauge", "Share of the wall time a stage was busy.",
+            [("", {**video_labels, "stage": name}, s["utilization"]) for name, s in od["stages"].items()])
+
+        histogram_samples = []
+        for name, s in od["stages"].items():
+            labels = {**video_labels, "stage": name}
+            cumulative = 0
+            for bucket, count in zip(s["buckets"], s["counts"]):
+                cumulative += count
+                histogram_samples.append(("_bucket", {**labels, "le": f"{bucket:g}"}, cumulative))
+            histogram_samples.append(("_bucket", {**labels, "le": "+Inf"}, s["count"]))
+            histogram_samples.append(("_sum", labels, s["sum"]))
+            histogram_samples.append(("_count", labels, s["count"]))
+        add("stage_latency_seconds", "histogram", "Time a stage spent per frame.", histogram_samples)
+
+    tr = metrics["tracking"]
+    if tr:
+        add("tracking_frames_processed_total", "counter", "Frames processed by tracking.", [("", video_labels, tr["frames_processed"])])
+        add("tracking_frames", "gauge", "Frames to process by tracking.", [("", video_labels, tr["total_frames"])])
+        add("tracking_fps", "gauge", "Average tracking frames per second.", [("", video_labels, tr["fps"])])
+
+    return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    def __init__(self, state: "AppState", port: int, host: str = METRICS_HOST):
+        """
+        Local HTTP endpoint with the live metrics of the running analysis, /metrics serves the Prometheus text format
+        and /metrics.json the same metrics as json. Requests are answered from a background thread.
+
+        :param state: App state of the video being processed.
+        :param port: Port to listen on.
+        :param host: Interface to listen on, only the local machine by default.
+        """
+        self.state = state
+        self.error_counter = ErrorCounter()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split("?")[0]
+                if path == "/metrics":
+                    body = to_prometheus(server.collect()).encode("utf-8")
+                    content_type = "text/plain; version=0.0.4; charset=utf-8"
+                elif path == "/metrics.json":
+                    body = json.dumps(server.collect()).encode("utf-8")
+                    content_type = "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                # scrapes would flood the console
+                return
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def port(self):
+        return self._server.server_address[1]
+
+    def collect(self) -> dict:
+        return collect_metrics(self.state, self.error_counter.count)
+
+    def start(self):
+        logging.getLogger().addHandler(self.error_counter)
+        self._thread = threading.Thread(target=self._server.serve_forever, name="MetricsServer", daemon=True)
+        self._thread.start()
+        log.info(f"Serving metrics on http://{self._server.server_address[0]}:{self.port}/metrics")
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread:
+            self._thread.join()
+        logging.getLogger().removeHandler(self.error_counter)
+
+
+def start_metrics_server(state: "AppState") -> Optional[MetricsServer]:
+    if not state.metrics_port:
+        return None
+    try:
+        server = MetricsServer(state, state.metrics_port)
+    except OSError as e:
+        # metrics are optional, never fail the analysis because the port is taken
+        log.warn(f"Could not start the metrics server on port {state.metrics_port}: {e}")
+        return None
+    server.start()
+    return server
+
+
+def stop_metrics_server(server: Optional[MetricsServer]):
+    if server:
+        server.stop()
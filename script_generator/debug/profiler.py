@@ -0,0 +1,119 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Optional, TYPE_CHECKING
+
+from script_generator.constants import PROFILER_INTERVAL
+from script_generator.debug.logger import log
+from script_generator.utils.file import check_create_output_folder, get_output_file_path
+
+if TYPE_CHECKING:
+    from script_generator.state.app_state import AppState
+
+
+class SamplingProfiler:
+    def __init__(self, interval=PROFILER_INTERVAL):
+        """
+        In-process sampling profiler. A background thread periodically captures the stack of every other thread and
+        counts identical stacks, the result is written in the collapsed stack format used by flamegraph.pl and
+        speedscope.
+
+        :param interval: Sampling interval in seconds.
+        """
+        self.interval = interval
+        self.stacks = Counter()
+        self.sample_count = 0
+        self.sample_time = 0.0
+        self.start_time = None
+        self.end_time = None
+        self._labels = {}  # code object -> frame label, so every frame is only formatted once
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def _get_label(self, code):
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+        return label
+
+    def sample(self):
+        start_time = time.perf_counter()
+        thread_names = {t.ident: t.name for t in threading.enumerate()}
+        own_ident = threading.get_ident()
+
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self._get_label(frame.f_code))
+                frame = frame.f_back
+            stack.append(thread_names.get(ident, f"Thread-{ident}"))
+            stack.reverse()
+            self.stacks[";".join(stack)] += 1
+
+        self.sample_count += 1
+        self.sample_time += time.perf_counter() - start_time
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            self.sample()
+
+    def start(self):
+        self.start_time = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="SamplingProfiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+        self.end_time = time.perf_counter()
+
+    def get_overhead(self):
+        """
+        :return: Fraction of the wall time spent taking samples.
+        """
+        wall_time = (self.end_time or time.perf_counter()) - self.start_time
+        return self.sample_time / wall_time if wall_time > 0 else 0.0
+
+    def export(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        log.info(
+            f"Profile with {self.sample_count} samples saved to {path} "
+            f"(sampling overhead {self.get_overhead() * 100:.2f}%, open it in https://www.speedscope.app)"
+        )
+
+
+def start_profiler(state: "AppState") -> Optional[SamplingProfiler]:
+    if not state.profile_pipeline:
+        return None
+    profiler = SamplingProfiler()
+    profiler.start()
+    return profiler
+
+
+def stop_profiler(state: "AppState", profiler: Optional[SamplingProfiler], name: str):
+    """
+    Stops the profiler and writes the samples to output/<video>/profile_<name>.collapsed.
+    """
+    if profiler is None:
+        return
+    profiler.stop()
+    check_create_output_folder(state.video_path)
+    path, _ = get_output_file_path(state.video_path, ".collapsed", f"profile_{name}")
+    profiler.export(path)
+
+
+@contextmanager
+def profile(state: "AppState", name: str):
+    profiler = start_profiler(state)
+    try:
+        yield profiler
+    finally:
+        stop_profiler(state, profiler, name)
@@ -0,0 +1,74 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from script_generator.constants import TRACE_MAX_EVENTS
+from script_generator.debug.logger import log
+
+
+class PipelineTracer:
+    def __init__(self, max_events=TRACE_MAX_EVENTS):
+        """
+        Records timeline events of the object detection pipeline in a ring buffer and exports them in the Chrome trace
+        event format, which can be opened in https://ui.perfetto.dev or chrome://tracing.
+
+        :param max_events: Capacity of the ring buffer, the oldest events are dropped when it is full.
+        """
+        self.events = deque(maxlen=max_events)  # appends are thread safe
+        self.thread_names = {}
+        self._t0 = time.perf_counter()
+
+    def now(self):
+        """
+        :return: Timestamp in microseconds since the tracer was created.
+        """
+        return (time.perf_counter() - self._t0) * 1_000_000
+
+    def _tid(self):
+        tid = threading.get_ident()
+        if tid not in self.thread_names:
+            self.thread_names[tid] = threading.current_thread().name
+        return tid
+
+    def complete(self, name, cat, start, end, args=None):
+        """
+        Adds a complete (begin + end) event, start and end are timestamps from now().
+        """
+        self.events.append(("X", name, cat, start, end - start, self._tid(), args))
+
+    @contextmanager
+    def span(self, name, cat="stage", args=None):
+        start = self.now()
+        try:
+            yield
+        finally:
+            self.complete(name, cat, start, self.now(), args)
+
+    def counter(self, name, values):
+        """
+        Adds a counter sample (e.g. queue depths), values is a dict of series name to number.
+        """
+        self.events.append(("C", name, "counter", self.now(), 0, self._tid(), values))
+
+    def to_chrome_trace(self):
+        pid = os.getpid()
+        trace_events = [
+            {"ph": "M", "name": "thread_name", "pid": pid, "tid": tid, "args": {"name": name}}
+            for tid, name in list(self.thread_names.items())
+        ]
+        for ph, name, cat, ts, dur, tid, args in list(self.events):
+            event = {"ph": ph, "name": name, "cat": cat, "ts": ts, "pid": pid, "tid": tid}
+            if ph == "X":
+                event["dur"] = dur
+            if args:
+                event["args"] = args
+            trace_events.append(event)
+        return {"traceEvents": trace_events, "displayTimeUnit": "ms"}
+
+    def export(self, path):
+        with open(path, "w") as f:
+            json.dump(self.to_chrome_trace(), f)
+        log.info(f"Pipeline trace with {len(self.events)} events saved to {path} (open it in https://ui.perfetto.dev)")
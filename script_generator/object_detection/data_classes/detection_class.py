@@ -0,0 +1,36 @@
+from enum import IntEnum
+
+
+class DetectionClass(IntEnum):
+    """
+    Class ids of the YOLO model as stored in the detection records (the names are in CLASS_REVERSE_MATCH). The ids are
+    also the bit positions of a class in a class mask.
+    """
+    PENIS = 0
+    GLANS = 1
+    PUSSY = 2
+    BUTT = 3
+    ANUS = 4
+    BREAST = 5
+    NAVEL = 6
+    HAND = 7
+    FACE = 8
+    FOOT = 9
+    HIPS_CENTER = 10
+
+    @classmethod
+    def from_name(cls, name: str) -> "DetectionClass":
+        return cls[name.upper().replace(" ", "_")]
+
+
+NUM_DETECTION_CLASSES = len(DetectionClass)
+
+
+def get_class_mask(*classes: int) -> int:
+    """
+    :return: Bitmask with the bit of every class set, a class is in the mask when mask & (1 << cls) is not 0.
+    """
+    mask = 0
+    for cls in classes:
+        mask |= 1 << cls
+    return mask
@@ -0,0 +1,143 @@
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from script_generator.constants import CLASS_PRIORITY_ORDER, CLASS_REVERSE_MATCH
+from script_generator.object_detection.util.detection_columns import DetectionColumns
+
+DEFAULT_CLASS_PRIORITY = 7  # priority of the classes that are not in CLASS_PRIORITY_ORDER
+
+
+def get_class_priorities(max_cls: int) -> np.ndarray:
+    """
+    :return: Priority (lower first) per class id, the same order ObjectDetectionResult.get_boxes sorts by.
+    """
+    return np.array(
+        [CLASS_PRIORITY_ORDER.get(CLASS_REVERSE_MATCH.get(cls, "unknown"), DEFAULT_CLASS_PRIORITY) for cls in range(max_cls + 1)],
+        dtype=np.int16
+    )
+
+
+class DetectionIndex:
+    def __init__(self, detections: DetectionColumns):
+        """
+        Read-only index over all detections of a video. The rows of every frame are stored as one contiguous range
+        (CSR offsets) and sorted by class priority when the index is built, so fetching the boxes of a frame is a slice
+        and queries over the whole video are numpy operations.
+
+        :param detections: Detections sorted by frame, as loaded from the rawyolo file.
+        """
+        cls = np.asarray(detections.cls)
+        priorities = get_class_priorities(int(cls.max()) if len(cls) else 0)
+        # stable, so detections with the same priority keep the order they were detected in
+        order = np.lexsort((priorities[cls], detections.frame))
+
+        self.frame = np.asarray(detections.frame)[order]
+        self.cls = cls[order]
+        self.conf = np.asarray(detections.conf)[order]
+        self.boxes = np.stack([detections.x1, detections.y1, detections.x2, detections.y2], axis=1)[order]
+        self.track_id = np.asarray(detections.track_id)[order]
+        self.first_frame = detections.first_frame
+        self.frame_offsets = np.asarray(detections.frame_offsets)
+        self.class_names = [CLASS_REVERSE_MATCH.get(c, "unknown") for c in range(len(priorities))]
+
+    def __len__(self):
+        return len(self.frame)
+
+    def __contains__(self, frame_id: int) -> bool:
+        """
+        Whether the frame has detections.
+        """
+        start, end = self.get_frame_range(frame_id)
+        return end > start
+
+    def get_frame_range(self, frame_id: int) -> Tuple[int, int]:
+        i = frame_id - self.first_frame
+        if i < 0 or i >= len(self.frame_offsets) - 1:
+            return 0, 0
+        return int(self.frame_offsets[i]), int(self.frame_offsets[i + 1])
+
+    def get_boxes(self, frame_id: int) -> List[tuple]:
+        """
+        The detections of a frame as (box, conf, cls, class_name, track_id) sorted by class priority, the same as
+        ObjectDetectionResult.get_boxes.
+        """
+        start, end = self.get_frame_range(frame_id)
+        if start == end:
+            return []
+        class_names = self.class_names
+        classes = self.cls[start:end].tolist()
+        return [
+            (box, conf, cls, class_names[cls], track_id)
+            for box, conf, cls, track_id in zip(
+                self.boxes[start:end].tolist(), self.conf[start:end].tolist(), classes, self.track_id[start:end].tolist()
+            )
+        ]
+
+    def get_frame_presence(self, frame_start: int, frame_end: int) -> np.ndarray:
+        """
+        :return: Per frame in [frame_start, frame_end) whether it has detections, the dense counterpart of the offsets.
+        """
+        presence = np.zeros(max(frame_end - frame_start, 0), dtype=bool)
+        counts = np.diff(self.frame_offsets)
+        start = max(frame_start, self.first_frame)
+        end = min(frame_end, self.first_frame + len(counts))
+        if end > start:
+            presence[start - frame_start:end - frame_start] = counts[start - self.first_frame:end - self.first_frame] > 0
+        return presence
+
+    def get_all_frame_ids(self) -> np.ndarray:
+        """
+        :return: The frames that have detections, in ascending order.
+        """
+        return np.flatnonzero(np.diff(self.frame_offsets)) + self.first_frame
+
+    def get_class_presence(self, cls: int, min_conf: float = 0.0) -> np.ndarray:
+        """
+        :return: Per frame (indexed by frame id, up to the last frame with detections) whether the class was detected.
+        """
+        presence = np.zeros(self.first_frame + len(self.frame_offsets) - 1, dtype=bool)
+        presence[self.frame[(self.cls == cls) & (self.conf >= min_conf)]] = True
+        return presence
+
+    def get_consecutive_counts(self, cls: int, min_conf: float = 0.0, start_frame: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Walks the detections of a class in order and counts for each how many consecutive frames led up to it. As in
+        the original search for the penis, a second detection in the same frame starts the count over and the count
+        starts as if frame 0 had a detection.
+
+        :return: The frame of every matching detection and its count.
+        """
+        frames = self.frame[(self.frame >= start_frame) & (self.cls == cls) & (self.conf >= min_conf)]
+        previous = np.concatenate(([0], frames[:-1]))
+        index = np.arange(len(frames))
+        # the count is the distance to the last detection that broke the run
+        breaks = np.where(frames - 1 != previous, index, -1)
+        return frames, index - np.maximum.accumulate(breaks)
+
+    def find_consecutive(self, cls: int, min_count: int, min_conf: float = 0.0, start_frame: int = 0) -> Optional[int]:
+        """
+        :return: The first frame at which the class has been detected in more than min_count consecutive frames before
+            it (see get_consecutive_counts), None when that never happens.
+        """
+        frames, counts = self.get_consecutive_counts(cls, min_conf, start_frame)
+        hits = np.flatnonzero(counts > min_count)
+        return int(frames[hits[0]]) if len(hits) else None
+
+    def get_track_spans(self) -> Dict[int, Tuple[int, int, int]]:
+        """
+        :return: Per track id the first and last frame it was detected in and the number of detections.
+        """
+        if len(self.track_id) == 0:
+            return {}
+        order = np.lexsort((self.frame, self.track_id))
+        track_ids = self.track_id[order]
+        frames = self.frame[order]
+        starts = np.flatnonzero(np.concatenate(([True], track_ids[1:] != track_ids[:-1])))
+        ends = np.concatenate((starts[1:], [len(track_ids)])) - 1
+        return {
+            track_id: (first, last, count)
+            for track_id, first, last, count in zip(
+                track_ids[starts].tolist(), frames[starts].tolist(), frames[ends].tolist(), (ends - starts + 1).tolist()
+            )
+        }
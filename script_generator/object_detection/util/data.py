@@ -1,16 +1,20 @@
 import os
+import time
 
 import torch
 from ultralytics import YOLO
 
 from script_generator.constants import MODELS_PATH, MODEL_FILENAMES, OBJECT_DETECTION_VERSION
 from script_generator.debug.logger import log, log_od
+from script_generator.object_detection.util.detection_columns import DetectionColumns, read_detection_file_header, write_detection_columns
 from script_generator.utils.file import get_output_file_path
 from script_generator.utils.helpers import is_mac
 from script_generator.utils.json_utils import get_data_file_info
-from script_generator.utils.msgpack_utils import save_msgpack_json, load_msgpack_json
+from script_generator.utils.msgpack_utils import load_msgpack_json
 from script_generator.utils.version import version_is_less_than
 
+RAW_YOLO_SUFFIX = ".detections"  # columnar detection file, see detection_columns.py
+
 
 def get_yolo_model_path():
     yolo_models = [os.path.join(MODELS_PATH, filename) for filename in MODEL_FILENAMES]
@@ -42,7 +46,17 @@ def load_yolo_model(yolo_model_path):
     return YOLO(yolo_model_path, task="detect")
 
 
+def get_raw_yolo_path(state):
+    path, _ = get_output_file_path(state.video_path, RAW_YOLO_SUFFIX, "rawyolo")
+    return path
+
+
 def get_raw_yolo_file_info(state):
+    result_columns = get_data_file_info(state.video_path, RAW_YOLO_SUFFIX, "rawyolo")
+    if result_columns[0]:
+        return result_columns
+
+    # detections of older versions, converted to the columnar format when the tracking loads them
     result_msgpack = get_data_file_info(state.video_path, ".msgpack", "rawyolo")
     if result_msgpack[0]:
         return result_msgpack
@@ -50,22 +64,89 @@ def get_raw_yolo_file_info(state):
     return False, None, None
 
 
-def save_yolo_data(state, data):
+def remove_legacy_raw_yolo(state):
     path, _ = get_output_file_path(state.video_path, ".msgpack", "rawyolo")
-    json_data = {"version": OBJECT_DETECTION_VERSION, "data": data}
-    save_msgpack_json(path, json_data)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def save_yolo_data(state, data):
+    write_detection_columns(get_raw_yolo_path(state), OBJECT_DETECTION_VERSION, len(data), [data])
+
+
+def load_msgpack_yolo_data(msgpack_path):
+    """
+    :return: The json of the rawyolo.msgpack of an older version or None if it is outdated or empty.
+    """
+    json = load_msgpack_json(msgpack_path)
+    if not isinstance(json, dict) or not json.get("version") or version_is_less_than(json["version"], OBJECT_DETECTION_VERSION) or not json.get("data"):
+        if isinstance(json, dict) and json.get("version") and version_is_less_than(json["version"], OBJECT_DETECTION_VERSION):
+            log_od.warn(f"A raw yolo was found but was skipped due to an outdated version: {msgpack_path}")
+        return None
+    return json
+
 
+def convert_msgpack_yolo_data(state, msgpack_path, json):
+    """
+    Converts the rawyolo.msgpack of an older version to the columnar format, the msgpack file is removed afterwards.
 
-def load_yolo_data(state):
+    :param json: The loaded msgpack file, see load_msgpack_yolo_data.
+    :return: Path of the columnar file.
+    """
+    start_time = time.time()
+    path = get_raw_yolo_path(state)
+    write_detection_columns(path, json["version"], len(json["data"]), [json["data"]])
+    os.remove(msgpack_path)
+    log_od.info(f"Converted {len(json['data'])} detections to the columnar format in {(time.time() - start_time) * 1000:.0f}ms: {path}")
+    return path
+
+
+def check_yolo_data(state):
+    """
+    Checks whether there are up to date detections without loading them. The detection file is neither mapped nor
+    converted, so it can be rewritten right after (Windows doesn't allow replacing a mapped file).
+
+    :return: exists, path and filename.
+    """
+    exists, path, filename = get_raw_yolo_file_info(state)
+    if not exists:
+        return False, path, filename
+
+    if path.endswith(".msgpack"):
+        return load_msgpack_yolo_data(path) is not None, path, filename
+
+    header = read_detection_file_header(path)
+    if version_is_less_than(header["version"], OBJECT_DETECTION_VERSION) or header["record_count"] == 0:
+        if version_is_less_than(header["version"], OBJECT_DETECTION_VERSION):
+            log_od.warn(f"A raw yolo was found but was skipped due to an outdated version: {path}")
+        return False, path, filename
+    return True, path, filename
+
+
+def load_yolo_data(state, convert=False):
+    """
+    :param convert: Whether detections of an older version are converted to the columnar format (and the msgpack file
+        removed), otherwise they are only loaded into memory.
+    :return: exists, the detections as DetectionColumns, path and filename.
+    """
     exists, path, filename = get_raw_yolo_file_info(state)
     if not exists:
         return False, None, path, filename
 
-    json = load_msgpack_json(path)
+    if path.endswith(".msgpack"):
+        json = load_msgpack_yolo_data(path)
+        if json is None:
+            return False, None, path, filename
+        if not convert:
+            return True, DetectionColumns.from_records(json["version"], json["data"]), path, filename
+        path = convert_msgpack_yolo_data(state, path, json)
+        filename = os.path.basename(path)
 
-    if not isinstance(json, dict) or not json.get("version") or version_is_less_than(json["version"], OBJECT_DETECTION_VERSION) or not json.get("data"):
-        if version_is_less_than(json["version"], OBJECT_DETECTION_VERSION):
+    detections = DetectionColumns.load(path)
+
+    if version_is_less_than(detections.version, OBJECT_DETECTION_VERSION) or len(detections) == 0:
+        if version_is_less_than(detections.version, OBJECT_DETECTION_VERSION):
             log_od.warn(f"A raw yolo was found but was skipped due to an outdated version: {path}")
         return False, None, path, filename
 
-    return True, json["data"], path, filename
+    return True, detections, path, filename
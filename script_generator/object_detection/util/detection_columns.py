@@ -0,0 +1,217 @@
+import json
+import os
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+import numpy as np
+
+# Columns of a detection record, in the order of the records [frame_pos, cls, conf, x1, y1, x2, y2, track_id]
+DETECTION_COLUMNS = [
+    ("frame", np.dtype("<i4")),
+    ("cls", np.dtype("<i2")),
+    ("conf", np.dtype("<f8")),  # float64 so the rounded confidences load back as exactly the same python floats
+    ("x1", np.dtype("<i4")),
+    ("y1", np.dtype("<i4")),
+    ("x2", np.dtype("<i4")),
+    ("y2", np.dtype("<i4")),
+    ("track_id", np.dtype("<i4")),
+]
+FRAME_OFFSETS_DTYPE = np.dtype("<i8")
+
+DETECTION_FILE_MAGIC = b"FSGDET01"
+DETECTION_FILE_HEADER_SIZE = 4096  # magic + json header, padded so the columns start at an aligned offset
+DETECTION_FILE_ALIGNMENT = 64
+
+
+def _align(offset: int) -> int:
+    return (offset + DETECTION_FILE_ALIGNMENT - 1) // DETECTION_FILE_ALIGNMENT * DETECTION_FILE_ALIGNMENT
+
+
+def _get_column_offsets(record_count: int) -> Tuple[Dict[str, int], int]:
+    """
+    :return: The file offset of every column and the offset right after the last column.
+    """
+    offsets = {}
+    offset = DETECTION_FILE_HEADER_SIZE
+    for name, dtype in DETECTION_COLUMNS:
+        offsets[name] = offset
+        offset = _align(offset + record_count * dtype.itemsize)
+    return offsets, offset
+
+
+def _get_frame_offsets(frame: np.ndarray) -> Tuple[int, np.ndarray]:
+    """
+    :return: The first frame and the offset of the detections of every frame from it, frame must be sorted.
+    """
+    if len(frame) == 0:
+        return 0, np.zeros(1, dtype=FRAME_OFFSETS_DTYPE)
+    first_frame = int(frame[0])
+    frame_count = int(frame[-1]) - first_frame + 1
+    return first_frame, np.searchsorted(frame, np.arange(first_frame, first_frame + frame_count + 1)).astype(FRAME_OFFSETS_DTYPE)
+
+
+class DetectionColumns:
+    def __init__(self, version: str, columns: Dict[str, np.ndarray], first_frame: int, frame_offsets: np.ndarray):
+        """
+        Detections stored as one typed array per column, sorted by frame, with an index of where the detections of every
+        frame start. The arrays usually are read-only views on a memory-mapped detection file.
+
+        :param columns: Array per column of DETECTION_COLUMNS.
+        :param first_frame: Frame of the first entry in frame_offsets.
+        :param frame_offsets: The detections of frame f are at [frame_offsets[f - first_frame], frame_offsets[f - first_frame + 1]).
+        """
+        self.version = version
+        self.columns = columns
+        self.frame = columns["frame"]
+        self.cls = columns["cls"]
+        self.conf = columns["conf"]
+        self.x1 = columns["x1"]
+        self.y1 = columns["y1"]
+        self.x2 = columns["x2"]
+        self.y2 = columns["y2"]
+        self.track_id = columns["track_id"]
+        self.first_frame = first_frame
+        self.frame_offsets = frame_offsets
+
+    def __len__(self):
+        return len(self.frame)
+
+    def __iter__(self) -> Iterator[list]:
+        """
+        Yields the detections as records [frame_pos, cls, conf, x1, y1, x2, y2, track_id] with python values, like the
+        records of the msgpack format.
+        """
+        columns = [self.columns[name].tolist() for name, _ in DETECTION_COLUMNS]
+        for record in zip(*columns):
+            yield list(record)
+
+    def get_frame_range(self, frame_id: int) -> Tuple[int, int]:
+        """
+        :return: Start and end (exclusive) of the detections of a frame.
+        """
+        i = frame_id - self.first_frame
+        if i < 0 or i >= len(self.frame_offsets) - 1:
+            return 0, 0
+        return int(self.frame_offsets[i]), int(self.frame_offsets[i + 1])
+
+    def get_frame_ids(self) -> np.ndarray:
+        """
+        :return: The frames that have detections, in ascending order.
+        """
+        return np.flatnonzero(np.diff(self.frame_offsets)) + self.first_frame
+
+    def copy(self) -> "DetectionColumns":
+        """
+        :return: The detections in arrays of their own, detached from the detection file so it can be rewritten.
+        """
+        columns = {name: np.array(column) for name, column in self.columns.items()}
+        return DetectionColumns(self.version, columns, self.first_frame, np.array(self.frame_offsets))
+
+    @classmethod
+    def from_records(cls, version: str, records: List[list]) -> "DetectionColumns":
+        """
+        Detections of records [frame_pos, cls, conf, x1, y1, x2, y2, track_id] in memory, without a detection file.
+        """
+        rows = np.asarray(records, dtype=np.float64).reshape(-1, len(DETECTION_COLUMNS))
+        order = np.argsort(rows[:, 0], kind="stable")
+        columns = {name: rows[order, i].astype(dtype) for i, (name, dtype) in enumerate(DETECTION_COLUMNS)}
+        first_frame, frame_offsets = _get_frame_offsets(columns["frame"])
+        return cls(version, columns, first_frame, frame_offsets)
+
+    @classmethod
+    def load(cls, path: str) -> "DetectionColumns":
+        """
+        Memory-maps a detection file, only the header is read so this takes the same time for any size of file.
+        """
+        header = read_detection_file_header(path)
+
+        record_count = header["record_count"]
+        data = np.memmap(path, dtype=np.uint8, mode="r")
+        columns = {}
+        for name, dtype in DETECTION_COLUMNS:
+            offset = header["columns"][name]
+            columns[name] = data[offset:offset + record_count * dtype.itemsize].view(dtype)
+        index_offset, index_length = header["frame_offsets"], header["frame_count"] + 1
+        frame_offsets = data[index_offset:index_offset + index_length * FRAME_OFFSETS_DTYPE.itemsize].view(FRAME_OFFSETS_DTYPE)
+        return cls(header["version"], columns, header["first_frame"], frame_offsets)
+
+
+def read_detection_file_header(path: str) -> dict:
+    with open(path, "rb") as f:
+        header_bytes = f.read(DETECTION_FILE_HEADER_SIZE)
+    if not header_bytes.startswith(DETECTION_FILE_MAGIC):
+        raise ValueError(f"Not a detection file: {path}")
+    return json.loads(header_bytes[len(DETECTION_FILE_MAGIC):].rstrip(b"\0").decode("utf-8"))
+
+
+def write_detection_columns(path: str, version: str, record_count: int, chunks: Iterable[List[list]]):
+    """
+    Writes detection records to a columnar detection file. The records are copied into the memory-mapped file chunk by
+    chunk, so the records never all have to be in memory as python objects.
+
+    Layout: magic and json header (padded to DETECTION_FILE_HEADER_SIZE), every column as a contiguous little endian
+    array, then the per frame offsets. Column and index offsets in the header are absolute and aligned to 64 bytes.
+
+    :param record_count: Total number of records in all chunks.
+    :param chunks: Lists of records [frame_pos, cls, conf, x1, y1, x2, y2, track_id].
+    """
+    column_offsets, index_offset = _get_column_offsets(record_count)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.truncate(index_offset)
+
+    columns = {}
+    data = None
+    if record_count > 0:
+        data = np.memmap(tmp_path, dtype=np.uint8, mode="r+")
+        for name, dtype in DETECTION_COLUMNS:
+            offset = column_offsets[name]
+            columns[name] = data[offset:offset + record_count * dtype.itemsize].view(dtype)
+
+        pos = 0
+        for chunk in chunks:
+            if not chunk:
+                continue
+            rows = np.asarray(chunk, dtype=np.float64).reshape(-1, len(DETECTION_COLUMNS))
+            if pos + len(rows) > record_count:
+                raise ValueError(f"More detection records than the expected {record_count}")
+            for i, (name, dtype) in enumerate(DETECTION_COLUMNS):
+                columns[name][pos:pos + len(rows)] = rows[:, i]
+            pos += len(rows)
+        if pos != record_count:
+            raise ValueError(f"Expected {record_count} detection records but got {pos}")
+
+        # the writer adds the frames in order, only records of other sources may need sorting
+        frame = columns["frame"]
+        if np.any(frame[1:] < frame[:-1]):
+            order = np.argsort(frame, kind="stable")
+            for name, _ in DETECTION_COLUMNS:
+                columns[name][:] = columns[name][order]
+
+        first_frame, frame_offsets = _get_frame_offsets(frame)
+        frame_count = len(frame_offsets) - 1
+        data.flush()
+        del frame
+    else:
+        first_frame, frame_count = 0, 0
+        frame_offsets = np.zeros(1, dtype=FRAME_OFFSETS_DTYPE)
+
+    # release the mapping before the file is renamed (Windows doesn't allow renaming mapped files)
+    del columns, data
+
+    header = {
+        "version": version,
+        "record_count": record_count,
+        "first_frame": first_frame,
+        "frame_count": frame_count,
+        "columns": column_offsets,
+        "frame_offsets": index_offset
+    }
+    header_bytes = DETECTION_FILE_MAGIC + json.dumps(header).encode("utf-8")
+    if len(header_bytes) > DETECTION_FILE_HEADER_SIZE:
+        raise ValueError("Detection file header is too large")
+
+    with open(tmp_path, "r+b") as f:
+        f.write(header_bytes.ljust(DETECTION_FILE_HEADER_SIZE, b"\0"))
+        f.seek(index_offset)
+        f.write(frame_offsets.tobytes())
+    os.replace(tmp_path, path)
@@ -0,0 +1,152 @@
+import math
+import random
+import time
+from typing import List, Optional, TYPE_CHECKING
+
+import torch
+
+from script_generator.debug.logger import log_od
+from script_generator.object_detection.data_classes.detection_class import DetectionClass
+from script_generator.object_detection.util.data import load_yolo_data
+
+if TYPE_CHECKING:
+    from script_generator.state.app_state import AppState
+
+FAKE_MODEL_TYPES = ["replay", "synthetic"]
+
+# Classes the synthetic model cycles through, the pose model's hips center is left out as YOLO never detects it
+SYNTHETIC_CLASSES = [int(cls) for cls in DetectionClass if cls != DetectionClass.HIPS_CENTER]
+
+
+class FakeBoxes:
+    def __init__(self, detections: List[list]):
+        """
+        Mirrors the tensors of ultralytics' Boxes that the post-processing reads (id, xywh, cls and conf).
+
+        :param detections: [cls, conf, x1, y1, x2, y2, track_id] per detection.
+        """
+        data = torch.tensor(
+            [[(x1 + x2) / 2, (y1 + y2) / 2, x2 - x1, y2 - y1, conf, cls, track_id] for cls, conf, x1, y1, x2, y2, track_id in detections],
+            dtype=torch.float32
+        ).reshape(-1, 7)
+        self.xywh = data[:, :4]
+        self.conf = data[:, 4]
+        self.cls = data[:, 5]
+        # YOLO.track returns no ids when nothing is tracked
+        self.id = data[:, 6] if len(detections) > 0 else None
+
+    def __len__(self):
+        return len(self.conf)
+
+
+class FakeResults:
+    def __init__(self, orig_img, detections: List[list]):
+        self.orig_img = orig_img
+        self.boxes = FakeBoxes(detections)
+
+
+class FakeYoloModel:
+    def __init__(self, latency_ms: float = 0.0):
+        """
+        Stand-in for the YOLO model in state.yolo_model, used to benchmark the pipeline without running inference.
+
+        :param latency_ms: Time each batch takes, spent sleeping so it releases the GIL like GPU inference does.
+        """
+        self.latency_ms = latency_ms
+
+    def track(self, frames, persist=True, conf=0.0, verbose=False, frame_positions=None, **kwargs):
+        """
+        :param frame_positions: Video frame of every frame, frames that are left out (e.g. skipped by the deadline
+            controller) would otherwise shift the detections of all later frames. Without them the frames are counted.
+        """
+        start_time = time.time()
+        results = []
+        for frame, frame_pos in zip(frames, frame_positions or [None] * len(frames)):
+            detections = [d for d in self.get_detections(frame, frame_pos) if d[1] >= conf]
+            results.append(FakeResults(frame, detections))
+
+        remaining = self.latency_ms / 1000 - (time.time() - start_time)
+        if remaining > 0:
+            time.sleep(remaining)
+        return results
+
+    __call__ = track
+
+    def get_detections(self, frame, frame_pos: Optional[int] = None) -> List[list]:
+        raise NotImplementedError("Subclasses must implement get_detections()")
+
+
+class ReplayYoloModel(FakeYoloModel):
+    def __init__(self, state: "AppState", latency_ms: float = 0.0):
+        """
+        Replays the detections of an existing rawyolo file of the video frame by frame.
+        """
+        super().__init__(latency_ms)
+        self.state = state
+        self.frame_pos = 0
+        self._analyze_task = None
+
+        exists, yolo_data, path, _ = load_yolo_data(state)
+        if not exists:
+            raise FileNotFoundError(f"The replay model needs an up to date raw yolo file: {path}")
+        # the analysis rewrites the raw yolo file, which can't be replaced while it's mapped (on Windows)
+        self.detections = yolo_data.copy()
+        del yolo_data
+
+        log_od.info(f"Replay model loaded detections of {len(self.detections.get_frame_ids())} frames from {path}")
+
+    def track(self, frames, persist=True, conf=0.0, verbose=False, frame_positions=None, **kwargs):
+        # without frame positions the frames are counted, from the first frame of every new analysis
+        analyze_task = self.state.analyze_task
+        if analyze_task is not self._analyze_task:
+            self._analyze_task = analyze_task
+            self.frame_pos = analyze_task.frame_start if analyze_task else (self.state.frame_start or 0)
+        return super().track(frames, persist, conf, verbose, frame_positions, **kwargs)
+
+    def get_detections(self, frame, frame_pos=None):
+        if frame_pos is None:
+            frame_pos = self.frame_pos
+        self.frame_pos = frame_pos + 1
+        d = self.detections
+        start, end = d.get_frame_range(frame_pos)
+        columns = [d.cls, d.conf, d.x1, d.y1, d.x2, d.y2, d.track_id]
+        # hips center records come from the pose model and are added by the post-processing itself
+        return [list(detection) for detection in zip(*(column[start:end].tolist() for column in columns)) if detection[0] != DetectionClass.HIPS_CENTER]
+
+
+class SyntheticYoloModel(FakeYoloModel):
+    def __init__(self, latency_ms: float = 0.0, detections_per_frame: int = 6, seed: int = 0):
+        """
+        Generates deterministic detections that move smoothly over time, each with a stable track id.
+        """
+        super().__init__(latency_ms)
+        self.detections_per_frame = detections_per_frame
+        self.frame_pos = 0
+        # fixed per track properties so every run generates the same detections
+        rng = random.Random(seed)
+        self.tracks = [
+            (SYNTHETIC_CLASSES[i % len(SYNTHETIC_CLASSES)], round(rng.uniform(0.4, 1.0), 2), rng.uniform(0, 2 * math.pi))
+            for i in range(detections_per_frame)
+        ]
+
+    def get_detections(self, frame, frame_pos=None):
+        if frame_pos is None:
+            frame_pos = self.frame_pos
+        self.frame_pos = frame_pos + 1
+        height, width = frame.shape[:2]
+        box_size = min(width, height) // 8
+        detections = []
+        for i, (cls, conf, phase) in enumerate(self.tracks):
+            cx = int(width * (i + 0.5) / self.detections_per_frame)
+            cy = int(height / 2 + height / 4 * math.sin(frame_pos / 15 + phase))
+            detections.append([cls, conf, cx - box_size // 2, cy - box_size // 2, cx + box_size // 2, cy + box_size // 2, i + 1])
+        return detections
+
+
+def create_fake_model(state: "AppState", model_type: str, latency_ms: float = 0.0) -> Optional[FakeYoloModel]:
+    if model_type == "replay":
+        return ReplayYoloModel(state, latency_ms)
+    if model_type == "synthetic":
+        return SyntheticYoloModel(latency_ms)
+    log_od.error(f"Unknown fake model type: {model_type}, valid options: {', '.join(FAKE_MODEL_TYPES)}")
+    return None
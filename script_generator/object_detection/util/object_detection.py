@@ -1,10 +1,8 @@
 import os
 
-from script_generator.constants import CLASS_REVERSE_MATCH
 from script_generator.debug.logger import log, log_tr
 from script_generator.gui.utils.widgets import Widgets
-from script_generator.object_detection.data_classes.box_record import BoxRecord
-from script_generator.object_detection.data_classes.object_detection_result import ObjectDetectionResult
+from script_generator.object_detection.data_classes.detection_index import DetectionIndex
 from script_generator.object_detection.util.data import get_raw_yolo_file_info
 
 
@@ -31,45 +29,18 @@ def check_skip_object_detection(state, root):
     return "generate"
 
 
-def make_data_boxes(records):
-    """
-    Convert YOLO records into BoxRecord objects.
-    :param records: List of YOLO detection records.
-    :return: A Result object containing BoxRecord instances.
-    """
-    result = ObjectDetectionResult()  # Create a Result instance
-    for record in records:
-        frame_idx, cls, conf, x1, y1, x2, y2, track_id = record
-        box = [x1, y1, x2, y2]
-        class_name = CLASS_REVERSE_MATCH.get(cls, 'unknown')
-        box_record = BoxRecord(box, conf, cls, class_name, track_id)
-        result.add_record(frame_idx, box_record)
-    return result
-
-
-def parse_yolo_data_looking_for_penis(data, start_frame):
+def parse_yolo_data_looking_for_penis(index: DetectionIndex, start_frame):
     """
     Parse YOLO data to find the first instance of a penis.
-    :param data: The YOLO detection data.
+    :param index: Index over the YOLO detections.
     :param start_frame: The starting frame for the search.
     :return: The frame ID where the penis is first detected.
     """
 
     penis_cls = 0
-    prev_frame = 0
-    cons_frames = 0
     threshold = 5
 
-    for line in data:
-        frame_idx, cls, conf, x1, y1, x2, y2, track_id = line
-        if frame_idx >= start_frame and cls == penis_cls and conf >= 0.5:
-            penis_frame = frame_idx
-            if prev_frame == frame_idx - 1:
-                cons_frames += 1
-            else:
-                cons_frames = 0
-            prev_frame = frame_idx
-
-            if cons_frames > threshold:
-                log_tr.info(f"First instance of Glans/Penis found in frame {frame_idx - threshold}")
-                return penis_frame - threshold
+    frame_idx = index.find_consecutive(penis_cls, threshold, min_conf=0.5, start_frame=start_frame)
+    if frame_idx is not None:
+        log_tr.info(f"First instance of Glans/Penis found in frame {frame_idx - threshold}")
+        return frame_idx - threshold
@@ -0,0 +1,192 @@
+import json
+import os
+import time
+from dataclasses import dataclass, asdict
+from typing import Optional, TYPE_CHECKING
+
+from script_generator.constants import OBJECT_DETECTION_CHECKPOINT_INTERVAL, OBJECT_DETECTION_VERSION
+from script_generator.debug.logger import log_od
+from script_generator.object_detection.util.data import get_raw_yolo_path, remove_legacy_raw_yolo
+from script_generator.object_detection.util.detection_columns import write_detection_columns
+from script_generator.utils.file import get_output_file_path
+from script_generator.utils.msgpack_utils import pack_msgpack, iter_msgpack_objects
+
+if TYPE_CHECKING:
+    from script_generator.state.app_state import AppState
+
+
+@dataclass
+class DetectionCheckpoint:
+    version: str
+    video_path: str
+    video_size_bytes: int
+    yolo_model: Optional[str]
+    frame_start: int
+    frame_pos: int  # last frame of which all detections are durable on disk
+    part_size: int  # size of the part file up to and including the last durable chunk
+    record_count: int
+    max_track_id: int
+
+    def is_valid_for(self, state: "AppState") -> bool:
+        return (
+            self.version == OBJECT_DETECTION_VERSION
+            and self.video_path == state.video_path
+            and self.video_size_bytes == state.video_info.size_bytes
+            and self.yolo_model == get_yolo_model_name(state)
+            and self.frame_start == (state.frame_start or 0)
+        )
+
+
+def get_yolo_model_name(state: "AppState"):
+    return os.path.basename(state.yolo_model_path) if state.yolo_model_path else None
+
+
+def get_raw_yolo_part_path(state: "AppState"):
+    path, _ = get_output_file_path(state.video_path, ".msgpack.part", "rawyolo")
+    return path
+
+
+def get_checkpoint_path(state: "AppState"):
+    path, _ = get_output_file_path(state.video_path, ".json", "rawyolo_checkpoint")
+    return path
+
+
+def load_detection_checkpoint(state: "AppState") -> Optional[DetectionCheckpoint]:
+    """
+    Loads the checkpoint of an interrupted object detection run. Stale or unusable checkpoints are removed.
+    """
+    checkpoint_path = get_checkpoint_path(state)
+    part_path = get_raw_yolo_part_path(state)
+    if not os.path.exists(checkpoint_path):
+        return None
+
+    try:
+        with open(checkpoint_path, "r", encoding="utf-8") as f:
+            checkpoint = DetectionCheckpoint(**json.load(f))
+    except (json.JSONDecodeError, TypeError, OSError) as e:
+        log_od.warn(f"Could not read object detection checkpoint {checkpoint_path}: {e}")
+        checkpoint = None
+
+    if checkpoint is None or not checkpoint.is_valid_for(state) or not os.path.exists(part_path) \
+            or os.path.getsize(part_path) < checkpoint.part_size:
+        log_od.info("Discarding object detection checkpoint as it doesn't match the current video or settings")
+        remove_detection_checkpoint(state)
+        return None
+
+    return checkpoint
+
+
+def remove_detection_checkpoint(state: "AppState"):
+    for path in [get_checkpoint_path(state), get_raw_yolo_part_path(state)]:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+class RawYoloWriter:
+    def __init__(self, state: "AppState", checkpoint: Optional[DetectionCheckpoint] = None):
+        """
+        Streams detection records to disk in chunks and keeps a checkpoint of the last durable frame so an interrupted
+        run can be resumed. The final rawyolo file is only written once all frames have been processed.
+
+        :param state: App state of the video being analyzed.
+        :param checkpoint: Checkpoint to resume from or None to start over.
+        """
+        self.state = state
+        self.part_path = get_raw_yolo_part_path(state)
+        self.checkpoint_path = get_checkpoint_path(state)
+        self.chunk = []
+        self.done_records = 0  # records at the start of the chunk that belong to frames that are done
+        self.frames_since_flush = 0
+        self.last_frame_pos = None
+
+        if checkpoint:
+            # drop anything that was written after the last checkpoint
+            with open(self.part_path, "r+b") as f:
+                f.truncate(checkpoint.part_size)
+            self.record_count = checkpoint.record_count
+            self.max_track_id = checkpoint.max_track_id
+            # the YOLO tracker starts over on resume, shift its ids so they don't collide with the previous run
+            self.track_id_offset = checkpoint.max_track_id
+        else:
+            remove_detection_checkpoint(state)
+            self.record_count = 0
+            self.max_track_id = 0
+            self.track_id_offset = 0
+
+        self.part_file = open(self.part_path, "ab")
+
+    def add_record(self, record):
+        """
+        :param record: [frame_pos, cls, conf, x1, y1, x2, y2, track_id], track id 0 is reserved for generic tracks.
+        """
+        if record[7] > 0:
+            record[7] += self.track_id_offset
+            self.max_track_id = max(self.max_track_id, record[7])
+        self.chunk.append(record)
+
+    def frame_done(self, frame_pos):
+        """
+        Marks all detections of a frame as added, flushes them to disk once the checkpoint interval is reached.
+        """
+        self.last_frame_pos = frame_pos
+        self.done_records = len(self.chunk)
+        self.frames_since_flush += 1
+        if self.frames_since_flush >= OBJECT_DETECTION_CHECKPOINT_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        """
+        Writes the records of the frames that are done and a checkpoint after the last of them, the records of a frame
+        that is still being added stay in memory so a resumed run doesn't add them again.
+        """
+        if self.last_frame_pos is None or self.part_file.closed:
+            return
+
+        if self.done_records:
+            self.part_file.write(pack_msgpack(self.chunk[:self.done_records]))
+            self.record_count += self.done_records
+            self.chunk = self.chunk[self.done_records:]
+            self.done_records = 0
+        self.part_file.flush()
+        os.fsync(self.part_file.fileno())
+        self.frames_since_flush = 0
+
+        checkpoint = DetectionCheckpoint(
+            version=OBJECT_DETECTION_VERSION,
+            video_path=self.state.video_path,
+            video_size_bytes=self.state.video_info.size_bytes,
+            yolo_model=get_yolo_model_name(self.state),
+            frame_start=self.state.frame_start or 0,
+            frame_pos=self.last_frame_pos,
+            part_size=self.part_file.tell(),
+            record_count=self.record_count,
+            max_track_id=self.max_track_id
+        )
+
+        # write the checkpoint atomically so a crash never leaves a half written file behind
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(asdict(checkpoint), f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def close(self):
+        if not self.part_file.closed:
+            self.part_file.close()
+
+    def finish(self):
+        """
+        Flushes the remaining records and copies all chunks into the final columnar rawyolo file.
+        """
+        self.flush()
+        self.close()
+
+        start_time = time.time()
+        path = get_raw_yolo_path(self.state)
+        chunks = iter_msgpack_objects(self.part_path) if os.path.exists(self.part_path) else []
+        write_detection_columns(path, OBJECT_DETECTION_VERSION, self.record_count, chunks)
+
+        remove_detection_checkpoint(self.state)
+        remove_legacy_raw_yolo(self.state)
+        log_od.info(f"Saved {self.record_count} detections in {(time.time() - start_time) * 1000:.0f}ms: {path}")
@@ -6,40 +6,58 @@ from script_generator.constants import RUN_POSE_MODEL
 from script_generator.constants import CLASS_REVERSE_MATCH, CLASS_COLORS
 from script_generator.debug.logger import log
 from script_generator.gui.messages.messages import UpdateGUIState
+from script_generator.object_detection.data_classes.detection_class import DetectionClass
 from script_generator.object_detection.data_classes.object_detection_result import ObjectDetectionResult
-from script_generator.object_detection.util.data import save_yolo_data
+from script_generator.object_detection.util.raw_yolo_writer import RawYoloWriter
 from script_generator.tasks.workers.abstract_task_processor import AbstractTaskProcessor, TaskProcessorTypes
-from script_generator.utils.file import get_output_file_path
-from script_generator.utils.msgpack_utils import save_msgpack_json
 from script_generator.video.data_classes.video_info import get_cropped_dimensions
 
 
 class PostProcessWorker(AbstractTaskProcessor):
     process_type = TaskProcessorTypes.YOLO_ANALYSIS
-    records = []
+    writer = None
     test_result = ObjectDetectionResult()  # Test result object for debugging
 
     def task_logic(self):
-        self.records = []
+        self.writer = self.create_writer()
         self.test_result = ObjectDetectionResult()
         state = self.state
+        tracer = state.tracer
         width, height = get_cropped_dimensions(state.video_info)
 
         debug_window_open = False
+        last_records = []  # records of the previous frame (before the track id offset) for frames that reuse them
         for task in self.get_task():
+            task.start(self.process_type)
 
             frame_pos = task.frame_pos
             det_results = task.yolo_results
             frame = task.rendered_frame
             pose_results = None # TODO pose support
 
+            # Inference was skipped for this frame, repeat the detections of the previous frame
+            if task.reuse_detections:
+                for record in last_records:
+                    self.writer.add_record([frame_pos] + record[1:])
+                self.writer.frame_done(frame_pos)
+                task.end(self.process_type)
+                self.finish_task(task)
+                continue
+
+            last_records = []
+
             # Skip if no boxes are detected or no tracks are found
             if  det_results.boxes.id is None or (len(det_results.boxes) == 0 and not state.live_preview_mode):
                 task.rendered_frame = None # Clear memory
                 task.yolo_results = None  # Clear memory
+                self.writer.frame_done(frame_pos)
+                task.end(self.process_type)
                 self.finish_task(task)
                 continue
 
+            # converting the detections into records runs in python and holds the GIL
+            trace_start = tracer.now() if tracer else None
+
             ### DETECTION of BODY PARTS
             # Extract track IDs, boxes, classes, and confidence scores
             track_ids = det_results.boxes.id.cpu().tolist()
@@ -57,7 +75,8 @@ class PostProcessWorker(AbstractTaskProcessor):
                 y2 = y + h // 2
                 # Create a detection record
                 record = [frame_pos, int(cls), round(conf, 1), x1, y1, x2, y2, track_id]
-                self.records.append(record)
+                last_records.append(record.copy())
+                self.writer.add_record(record)
                 if state.live_preview_mode:
                     test_box = [[x1, y1, x2, y2], round(conf, 1), int(cls), CLASS_REVERSE_MATCH.get(int(cls), 'unknown'), track_id]
                     self.test_result.add_record(frame_pos, test_box)
@@ -67,6 +86,9 @@ class PostProcessWorker(AbstractTaskProcessor):
                     log.debug(f"For class id: {int(cls)}, getting: {CLASS_REVERSE_MATCH.get(int(cls), 'unknown')}")
                     log.debug(f"Test box: {test_box}")
 
+            if tracer:
+                tracer.complete("extract records", "gil", trace_start, tracer.now(), {"frame": frame_pos})
+
             if RUN_POSE_MODEL:
                 ### POSE DETECTION - Hips and wrists
                 # Extract track IDs, boxes, classes, and confidence scores
@@ -93,12 +115,13 @@ class PostProcessWorker(AbstractTaskProcessor):
                         y1 = mid_hips[1] - 5
                         x2 = mid_hips[0] + 5
                         y2 = mid_hips[1] + 5
-                        cls = 10  # hips center
+                        cls = DetectionClass.HIPS_CENTER
                         # logger.debug(f"pose_confs: {pose_confs}")
                         conf = pose_confs[0]
 
-                        record = [frame_pos, 10, round(conf, 1), x1, y1, x2, y2, 0]
-                        self.records.append(record)
+                        record = [frame_pos, int(cls), round(conf, 1), x1, y1, x2, y2, 0]
+                        last_records.append(record.copy())
+                        self.writer.add_record(record)
                         if state.live_preview_mode:
                             # Print and test the record
                             log.debug(f"Record : {record}")
@@ -151,17 +174,39 @@ class PostProcessWorker(AbstractTaskProcessor):
 
             task.rendered_frame = None # Clear memory
             task.yolo_results = None # Clear memory (yolo results contains a copy of the image)
+            self.writer.frame_done(frame_pos)
+            task.end(self.process_type)
             self.finish_task(task)
-            
+
+    def stop_process(self):
+        if not self.is_alive():
+            super().stop_process()
+            return
+
+        # the writer is only used by the worker thread, it flushes it once it reaches the sentinel, after the frames
+        # that are already queued (the sentinel of the previous stage may never come when that stage failed)
+        self.input_queue.put(None)
+
+    def create_writer(self):
+        return RawYoloWriter(self.state, self.state.analyze_task.checkpoint)
 
     def on_last_item(self):
-        # stop processing when the task is force closed
-        if self.state.analyze_task and self.state.analyze_task.is_stopped:
+        if self.writer is None:
+            return
+
+        writer = self.writer
+        self.writer = None
+        analyze_task = self.state.analyze_task
+
+        # stop processing when the task is force closed or failed, flush what we have so the video can be resumed later
+        if analyze_task and (analyze_task.is_stopped or analyze_task.has_failed):
+            writer.flush()
+            writer.close()
             return
 
-        self.state.analyze_task.end_time = time.time()
+        analyze_task.end_time = time.time()
 
-        save_yolo_data(self.state, self.records)
+        writer.finish()
 
 def handle_user_input(window_name):
     key = cv2.waitKey(1) & 0xFF
@@ -1,7 +1,9 @@
 import time
 
-from script_generator.constants import YOLO_CONF, YOLO_BATCH_SIZE, YOLO_PERSIST
+from script_generator.constants import YOLO_CONF, YOLO_PERSIST
 from script_generator.debug.logger import log_od
+from script_generator.object_detection.util.fake_model import FakeYoloModel
+from script_generator.tasks.util.deadline_controller import FULL_QUALITY, FrameSkipper
 from script_generator.tasks.workers.abstract_task_processor import AbstractTaskProcessor, TaskProcessorTypes
 
 
@@ -12,36 +14,76 @@ class YoloWorker(AbstractTaskProcessor):
     # if run_pose_model:
     #     yolo_pose_results = pose_model.track(frame, persist=True, conf=YOLO_CONF, verbose=False)
 
+    frame_skipper = None
+    controller = None
+    batch = []
+    tasks = []
+
     def task_logic(self):
-        batch = []
-        tasks = []
+        self.batch = []
+        self.tasks = []
+        # the deadline controller changes the quality level while the video is processed
+        self.controller = self.state.analyze_task.deadline_controller if self.state.analyze_task else None
+        self.frame_skipper = FrameSkipper() if self.controller else None
 
         for task in self.get_task():
             if task.rendered_frame is not None:
-                batch.append(task.rendered_frame)
-                tasks.append(task)
+                level = self.get_level()
+                if self.frame_skipper and self.frame_skipper.should_skip(task.frame_pos, task.rendered_frame, level):
+                    # the post-processing repeats the detections of the previous frame
+                    task.rendered_frame = None
+                    task.reuse_detections = True
+                    self.tasks.append(task)
+                    if not self.batch:
+                        self.process_pending()
+                    continue
+
+                self.batch.append(task.rendered_frame)
+                self.tasks.append(task)
 
                 # If batch is ready, process it
-                if len(batch) >= YOLO_BATCH_SIZE:
-                    self.process_batch(batch, tasks)
-                    batch = []
-                    tasks = []
+                if len(self.batch) >= level.get_batch_size(self.state.yolo_batch_size):
+                    self.process_pending()
             else:
                 log_od.warn(f"Rendered frame missing on Yolo task")
 
-        # Process any remaining tasks in the batch
-        if batch:
-            self.process_batch(batch, tasks)
-
-    def process_batch(self, frames, tasks):
-        start_time = time.time()
-        # Yolo expects bgr images when using numpy frames
-        # yolo_results = self.state.yolo_model(frames, conf=YOLO_CONF, verbose=False) # replace with this line for pipeline speed testing
-        yolo_results = self.state.yolo_model.track(frames, persist=YOLO_PERSIST, conf=YOLO_CONF, verbose=False)
-        avg_time = (time.time() - start_time) / len(tasks)
-
-        for t, result in zip(tasks, yolo_results):
-            t.yolo_results = result
-            batch_time = time.time() - start_time
-            t.duration(str(self.process_type), avg_time)
+    def get_level(self):
+        return self.controller.level if self.controller else FULL_QUALITY
+
+    def on_last_item(self):
+        # Process any remaining tasks in the batch, before the sentinel is passed on
+        analyze_task = self.state.analyze_task
+        if self.tasks and not (analyze_task and analyze_task.is_stopped):
+            self.process_pending()
+
+    def process_pending(self):
+        batch, tasks = self.batch, self.tasks
+        self.batch = []
+        self.tasks = []
+        self.process_batch(batch, tasks, self.get_level().imgsz)
+
+    def process_batch(self, frames, tasks, imgsz=None):
+        """
+        :param frames: Frames to run inference on, the tasks that reuse detections have no frame.
+        :param imgsz: Inference resolution, None uses the resolution the model was trained on.
+        """
+        yolo_results = []
+        avg_time = 0
+        if frames:
+            start_time = time.time()
+            kwargs = {"imgsz": imgsz} if imgsz else {}
+            if isinstance(self.state.yolo_model, FakeYoloModel):
+                # fake models look up the detections of a frame by its position, some frames may have been skipped
+                kwargs["frame_positions"] = [t.frame_pos for t in tasks if not t.reuse_detections]
+            # Yolo expects bgr images when using numpy frames
+            # yolo_results = self.state.yolo_model(frames, conf=YOLO_CONF, verbose=False) # replace with this line for pipeline speed testing
+            with self.trace_span("yolo batch", args={"size": len(frames), "frame": tasks[0].frame_pos}):
+                yolo_results = self.state.yolo_model.track(frames, persist=YOLO_PERSIST, conf=YOLO_CONF, verbose=False, **kwargs)
+            avg_time = (time.time() - start_time) / len(frames)
+
+        results = iter(yolo_results)
+        for t in tasks:
+            if not t.reuse_detections:
+                t.yolo_results = next(results)
+                t.duration(self.process_type, avg_time)
             self.finish_task(t)
@@ -1,27 +1,34 @@
 import threading
 import time
-from typing import List, TYPE_CHECKING
+from typing import Optional
 
 from tqdm import tqdm
 
-from script_generator.constants import SEQUENTIAL_MODE, UPDATE_PROGRESS_INTERVAL
+from script_generator.constants import UPDATE_PROGRESS_INTERVAL
 from script_generator.debug.logger import log_od
+from script_generator.debug.memory_monitor import start_memory_monitor, stop_memory_monitor
+from script_generator.debug.profiler import start_profiler, stop_profiler
+from script_generator.debug.tracer import PipelineTracer
 from script_generator.gui.messages.messages import ProgressMessage
+from script_generator.object_detection.util.raw_yolo_writer import load_detection_checkpoint, remove_detection_checkpoint
 from script_generator.state.app_state import AppState
 from script_generator.tasks.data_classes.analyze_video_task import AnalyzeVideoTask
-from script_generator.tasks.workers.abstract_task_processor import TaskProcessorTypes
+from script_generator.tasks.util.deadline_controller import create_deadline_controller
+from script_generator.tasks.util.pipeline_watchdog import start_pipeline_watchdog
+from script_generator.tasks.util.result_sink import ResultSink
 from script_generator.utils.data_classes.meta_data import MetaData
-from script_generator.utils.file import check_create_output_folder
+from script_generator.utils.file import check_create_output_folder, get_output_file_path
+from script_generator.utils.thread_budget import allocate_thread_budget, apply_thread_budget
 
-if TYPE_CHECKING:
-    from script_generator.video.analyse_frame_task import AnalyzeFrameTask
 
-
-def analyze_video(state: AppState) -> List["AnalyzeFrameTask"]:
-    log_od.info(f"[OBJECT DETECTION] Starting up pipeline{' in sequential mode' if SEQUENTIAL_MODE else ''}...")
+def analyze_video(state: AppState) -> Optional[ResultSink]:
+    log_od.info("[OBJECT DETECTION] Starting up pipeline...")
 
     log_thread_stop_event = threading.Event()
     threads = []
+    profiler = start_profiler(state)
+    memory_monitor = None
+    watchdog = None
 
     try:
         # make sure the output folder exists for this video
@@ -43,51 +50,68 @@ def analyze_video(state: AppState) -> List["AnalyzeFrameTask"]:
 
         use_open_gl = state.video_reader == "FFmpeg + OpenGL (Windows)"
 
+        # Pick up where an interrupted run left off
+        checkpoint = None
+        if state.resume_object_detection:
+            checkpoint = load_detection_checkpoint(state)
+            if checkpoint:
+                log_od.info(f"[OBJECT DETECTION] Resuming from checkpoint after frame {checkpoint.frame_pos} ({checkpoint.record_count} detections)")
+        else:
+            remove_detection_checkpoint(state)
+
+        state.tracer = PipelineTracer() if state.trace_pipeline else None
+
+        # divide the cores between ffmpeg, inference and the python stages of all jobs running on this machine
+        state.thread_budget = allocate_thread_budget(
+            state.concurrent_jobs,
+            calibrated_decoder_threads=state.decoder_threads,
+            calibrated_inference_threads=state.inference_threads
+        )
+        apply_thread_budget(state.thread_budget)
+
         # Create the task
-        a = AnalyzeVideoTask(state, use_open_gl)
+        a = AnalyzeVideoTask(state, use_open_gl, checkpoint)
+        a.deadline_controller = create_deadline_controller(state, a)
+
+        # stopping keeps the detections on disk, so a run that hit the memory ceiling can be resumed
+        memory_monitor = start_memory_monitor(state, "object_detection", on_ceiling=a.stop)
+        if memory_monitor:
+            memory_monitor.check_ceiling()
 
         # Start logging thread
         queue_logging_thread = threading.Thread(
             target=log_progress,
+            name="ProgressLogger",
             args=(state, a, log_thread_stop_event),
             daemon=True,
         )
         queue_logging_thread.start()
 
-        # Sequential mode can be used to determine performance bottlenecks on very short videos
-        if SEQUENTIAL_MODE:
-            def run_thread(thread, thread_name, out_queue):
-                start_time = time.time()
-                thread.start()
-                thread.join()
-                out_queue.put(None)
-                log_od.info(f"[OBJECT DETECTION] {thread_name} thread done in {time.time() - start_time} s")
-
-            run_thread(a.decode_thread, TaskProcessorTypes.VIDEO, a.opengl_q)
-            if use_open_gl:
-                run_thread(a.opengl_thread, TaskProcessorTypes.OPENGL, a.yolo_q)
-            run_thread(a.yolo_thread, TaskProcessorTypes.YOLO, a.analysis_q)
-            run_thread(a.yolo_analysis_thread, TaskProcessorTypes.YOLO_ANALYSIS, a.result_q)
-        else:
-            threads = [a.decode_thread, a.opengl_thread, a.yolo_thread, a.yolo_analysis_thread] if use_open_gl else [a.decode_thread, a.yolo_thread, a.yolo_analysis_thread]
-            for thread in threads:
-                thread.start()
-            for thread in threads:
-                thread.join()
+        threads = [a.decode_thread, a.opengl_thread, a.yolo_thread, a.yolo_analysis_thread] if use_open_gl else [a.decode_thread, a.yolo_thread, a.yolo_analysis_thread]
+        for thread in threads:
+            thread.start()
+        watchdog = start_pipeline_watchdog(state, a)
+        for thread in threads:
+            thread.join()
+
+        # Check for exceptions in threads
+        for thread in threads:
+            if thread is not None:
+                thread.check_exception()
 
-            # Check for exceptions in threads
-            for thread in threads:
-                if thread is not None:
-                    thread.check_exception()
+        if memory_monitor:
+            memory_monitor.check_ceiling()
 
         state.analyze_task.end_time = time.time()
 
         log_thread_stop_event.set()
 
         if a.is_stopped:
-            return []
+            return None
 
-        log_performance(state=state, results_queue=a.result_q)
+        log_performance(state=state, result_sink=a.result_sink)
+        if a.deadline_controller:
+            a.deadline_controller.log_summary()
 
         if state.update_ui:
             state.update_ui(ProgressMessage(
@@ -99,7 +123,7 @@ def analyze_video(state: AppState) -> List["AnalyzeFrameTask"]:
 
         meta.finish_analyze_video(state)
 
-        return a.result_q.queue
+        return a.result_sink
 
     except Exception as e:
         log_od.error(f"An error occurred during video analysis: {e}")
@@ -110,6 +134,18 @@ def analyze_video(state: AppState) -> List["AnalyzeFrameTask"]:
                 thread.join(timeout=1)
         raise
 
+    finally:
+        if watchdog:
+            watchdog.stop()
+        stop_profiler(state, profiler, "object_detection")
+        stop_memory_monitor(state, memory_monitor)
+
+        # also export the trace of failed or stopped runs as that's usually when it's needed most
+        if state.tracer:
+            trace_path, _ = get_output_file_path(state.video_path, ".json", "trace")
+            state.tracer.export(trace_path)
+            state.tracer = None
+
 
 def log_progress(state, analyze_task, stop_event):
     total_frames = state.video_info.total_frames
@@ -130,16 +166,23 @@ def log_progress(state, analyze_task, stop_event):
             if analyze_task.is_stopped:
                 stop_event.set()
 
-            opengl_size = analyze_task.opengl_q.qsize()
-            yolo_size = analyze_task.yolo_q.qsize()
-            analysis_size = analyze_task.analysis_q.qsize()
-            frames_processed = analyze_task.result_q.qsize()
+            frames_processed = analyze_task.frames_resumed + analyze_task.result_sink.frames_processed
 
             progress_bar.n = frames_processed
-            open_gl = f"OpenGL: {opengl_size:>3}, " if state.video_reader == "FFmpeg + OpenGL (Windows)" else ""
+            controller = analyze_task.deadline_controller
+            if controller:
+                controller.update(frames_processed)
+            stage_queues = [analyze_task.yolo_q, analyze_task.analysis_q]
+            if state.video_reader == "FFmpeg + OpenGL (Windows)":
+                stage_queues.insert(0, analyze_task.opengl_q)
+            queue_stats = ", ".join(f"{q.name}: {q.qsize():>3} ({format_mb(q.nbytes)})" for q in stage_queues)
+            quality = f", Quality level: {controller.level_index}" if controller else ""
             progress_bar.set_postfix_str(
-                f"Q's: {open_gl}YOLO: {yolo_size:>3}, Analysis: {analysis_size:>3}"
+                f"Q's: {queue_stats}, Mem: {format_mb(analyze_task.memory_budget.used)}{quality}"
             )
+            if state.tracer:
+                state.tracer.counter("Queue size", {q.name: q.qsize() for q in stage_queues})
+                state.tracer.counter("Queue memory (MB)", {q.name: q.nbytes / (1024 * 1024) for q in stage_queues})
             progress_bar.refresh()
 
             if frames_processed >= total_frames:
@@ -162,62 +205,48 @@ def log_progress(state, analyze_task, stop_event):
 
             time.sleep(UPDATE_PROGRESS_INTERVAL)
 
-def log_performance(state, results_queue):
+def format_mb(nbytes):
+    return f"{nbytes / (1024 * 1024):>5.0f}MB"
+
+def log_performance(state, result_sink: ResultSink):
     analyze_task = state.analyze_task
-    tasks = [task for task in results_queue.queue if hasattr(task, 'profile')]
-    total_frames = len(tasks)
+    total_frames = result_sink.frames_processed
 
     total_pipeline_time = analyze_task.end_time - analyze_task.start_time
     video_duration = total_frames / state.video_info.fps
     avg_processing_fps = total_frames / total_pipeline_time
     realtime_percentage = (avg_processing_fps / 60.0) * 100.0
+    budget = analyze_task.memory_budget.max_bytes
 
     log_message = (
         f"\n{'-' * 60}"
-        f"\n OBJECT DETECTION COMPLETED {'(sequential mode)' if SEQUENTIAL_MODE else ''}\n"
+        f"\n OBJECT DETECTION COMPLETED\n"
         f"\n Settings\n"
         f"  - Video reader               : {state.video_reader}\n"     
+        f"  - Queue memory budget        : {format_mb(budget).strip() if budget else 'disabled'}\n"
         f"\n Video stats\n"
         f"  - Total Frames               : {total_frames}\n"
         f"  - Video Duration             : {video_duration:.2f} s\n"
     )
 
-    if SEQUENTIAL_MODE:
-        log_message += f"\n Sequential Queue statistics\n"
-        for key, total_time in analyze_task.profile.items():
-            if key.endswith("_duration"):  # Only include duration metrics
-                avg_time = total_time / total_frames if total_frames > 0 else 0.0
-                stage_name = key.replace("_duration", "").capitalize()
-                log_message += (
-                    f"  - {stage_name:<27}: {avg_time * 1000:.0f} ms | "
-                    f"{(1 / avg_time if avg_time > 0 else 0):.0f} fps\n"
-                )
-    else:
+    log_message += (
+        f"\n Performance stats\n"
+        f"  - Average Processing         : {avg_processing_fps:.2f} fps\n"
+        f"  - Real-time Processing       : {realtime_percentage:.2f} %\n"
+        f"  - Total Pipeline Runtime (s) : {total_pipeline_time:.2f} s\n"
+        f"  - Queue memory peak          : {format_mb(analyze_task.memory_budget.peak).strip()}\n"
+    )
+    log_message += f"\n Task Average Times (while running in parallel)\n"
+
+    # Calculate and format averages for each stage
+    for stage, stats in result_sink.get_stage_stats().items():
+        avg_time = stats.total / total_frames if total_frames > 0 else 0.0
+        stage_name = stage.replace("_", " ").capitalize()
         log_message += (
-            f"\n Performance stats\n"
-            f"  - Average Processing         : {avg_processing_fps:.2f} fps\n"
-            f"  - Real-time Processing       : {realtime_percentage:.2f} %\n"
-            f"  - Total Pipeline Runtime (s) : {total_pipeline_time:.2f} s\n"
+            f"  - {stage_name:<27}: {avg_time * 1000:.0f} ms | "
+            f"{(1 / avg_time if avg_time > 0 else 0):.0f} fps | "
+            f"p99 <= {stats.quantile(0.99) * 1000:.0f} ms\n"
         )
-        log_message += f"\n Task Average Times (while running in parallel)\n"
-
-        aggregated_times = {}
-        for task in tasks:
-            for key, total_time in task.profile.items():
-                if key.endswith("_duration"):
-                    if key not in aggregated_times:
-                        aggregated_times[key] = {"total_time": 0, "task_count": 0}
-                    aggregated_times[key]["total_time"] += total_time
-                    aggregated_times[key]["task_count"] += 1
-
-        # Calculate and format averages for each key
-        for key, data in aggregated_times.items():
-            avg_time = data["total_time"] / total_frames if total_frames > 0 else 0.0
-            stage_name = key.replace("_duration", "").replace("_", " ").capitalize()
-            log_message += (
-                f"  - {stage_name:<27}: {avg_time * 1000:.0f} ms | "
-                f"{(1 / avg_time if avg_time > 0 else 0):.0f} fps\n"
-            )
 
     log_message += f"{'-' * 60}\n"
 
@@ -1,5 +1,7 @@
 from script_generator.analysis.workers.analyze_tracking_results import analyze_tracking_results
 from script_generator.debug.logger import log_tr
+from script_generator.debug.memory_monitor import start_memory_monitor, stop_memory_monitor
+from script_generator.debug.profiler import profile
 from script_generator.funscript.create_funscript import create_funscript
 from script_generator.object_detection.util.data import get_raw_yolo_file_info
 from script_generator.object_detection.util.object_detection import parse_yolo_data_looking_for_penis
@@ -16,7 +18,12 @@ def tracking_analysis(state):
     meta = MetaData.get_create_meta(state)
 
     # Performing the tracking part and generation of the raw funscript data
-    state.funscript_data = analyze_tracking_results(state)
+    memory_monitor = start_memory_monitor(state, "tracking")
+    try:
+        with profile(state, "tracking"):
+            state.funscript_data = analyze_tracking_results(state)
+    finally:
+        stop_memory_monitor(state, memory_monitor)
 
     # Save debug file
     state.debug_data.save_debug_file()
@@ -4,14 +4,20 @@ import string
 from tkinter import messagebox
 from typing import Literal, Optional, TYPE_CHECKING
 
+import numpy as np
+
 from script_generator.config.config_manager import ConfigManager
+from script_generator.constants import QUEUE_MAXSIZE, VALID_VIDEO_READERS, YOLO_BATCH_SIZE
 from script_generator.debug.debug_data import DebugData, get_metrics_file_info
 from script_generator.debug.logger import log
 from script_generator.object_detection.util.data import load_yolo_model, get_raw_yolo_file_info
 from script_generator.video.data_classes.video_info import VideoInfo, get_video_info
 
 if TYPE_CHECKING:
+    from script_generator.debug.memory_monitor import MemoryMonitor
+    from script_generator.debug.tracer import PipelineTracer
     from script_generator.tasks.data_classes.analyze_video_task import AnalyzeVideoTask
+    from script_generator.utils.thread_budget import ThreadBudget
 
 class AppState:
     _instance: Optional["AppState"] = None
@@ -44,6 +50,10 @@ class AppState:
         self.ffmpeg_path = c.get("ffmpeg_path")
         self.ffprobe_path = c.get("ffprobe_path")
         self.yolo_model_path = c.get("yolo_model_path")
+        self.queue_memory_budget_mb = c.get("queue_memory_budget_mb")
+        self.pipeline_stall_seconds = c.get("pipeline_stall_seconds")
+        self.track_idle_seconds = c.get("track_idle_seconds")
+        self.pipeline_profile: dict | None = c.get("pipeline_profile")
 
         # Gui/settings debug
         self.log_level = c.get("log_level")
@@ -65,19 +75,39 @@ class AppState:
 
         # TODO move this to a analyse results class
         self.funscript_data = []
-        self.funscript_frames = []
-        self.funscript_distances = []
+        self.funscript_frames = np.empty(0, dtype=np.int32)  # frame and distance of every point found by the tracking
+        self.funscript_distances = np.empty(0, dtype=np.int32)
         self.offset_x: int = 0
         self.frame_start_track = 0
         self.current_frame_id = 0
         self.frame_area = 0
+        self.tracking_start_time: float | None = None
 
         # Cli
         self.use_existing_raw_yolo = False
+        self.resume_object_detection = True
+        self.trace_pipeline = False
+        self.profile_pipeline = False
+        self.memory_monitor_enabled = False
+        self.memory_tracemalloc = False
+        self.memory_ceiling_mb: float | None = None
+        self.metrics_port: int | None = None
+        self.restart_stalled_decoder = False
+        self.concurrent_jobs = 1
+        self.deadline_seconds: float | None = None
+
+        # Pipeline tuning, overridden by the profile of the calibrate command
+        self.yolo_batch_size = YOLO_BATCH_SIZE
+        self.queue_maxsize = QUEUE_MAXSIZE
+        self.decoder_threads: int | None = None  # None lets the thread budget decide
+        self.inference_threads: int | None = None
 
         # State
         self.video_info: VideoInfo | None = None
         self.analyze_task: AnalyzeVideoTask | None = None
+        self.tracer: PipelineTracer | None = None
+        self.memory_monitor: MemoryMonitor | None = None
+        self.thread_budget: ThreadBudget | None = None
         self.has_raw_yolo = False
         self.has_tracking_data = False
         self.is_processing = False
@@ -87,6 +117,22 @@ class AppState:
         self.update_ui = None
         self.ffmpeg_hwaccel = c.get("ffmpeg_hwaccel")
         self.yolo_model = load_yolo_model(self.yolo_model_path)
+        self.apply_pipeline_profile(self.pipeline_profile)
+
+    def apply_pipeline_profile(self, profile: dict | None):
+        """
+        Applies the settings the calibrate command found to be the fastest on this machine.
+        """
+        if not profile:
+            return
+        if profile.get("video_reader") in VALID_VIDEO_READERS:
+            self.video_reader = profile["video_reader"]
+        if "ffmpeg_hwaccel" in profile:
+            self.ffmpeg_hwaccel = profile["ffmpeg_hwaccel"]
+        self.yolo_batch_size = profile.get("yolo_batch_size") or YOLO_BATCH_SIZE
+        self.queue_maxsize = profile.get("queue_maxsize") or QUEUE_MAXSIZE
+        self.decoder_threads = profile.get("decoder_threads")
+        self.inference_threads = profile.get("inference_threads")
 
     def set_is_cli(self, cli):
         self.is_cli = cli
@@ -115,12 +161,13 @@ class AppState:
 
             # TODO move this to a task an remove this here
             self.funscript_data = []
-            self.funscript_frames = []
-            self.funscript_distances = []
+            self.funscript_frames = np.empty(0, dtype=np.int32)
+            self.funscript_distances = np.empty(0, dtype=np.int32)
             self.offset_x: int = 0
             self.frame_start_track = 0
             self.current_frame_id = 0
             self.frame_area = 0
+            self.tracking_start_time = None
             self.debug_data = DebugData(self)
 
             if not self.video_path:
@@ -1,11 +1,11 @@
-import queue
 import time
 from dataclasses import dataclass, field
 from threading import Lock
-from typing import List, TYPE_CHECKING
+from typing import List, Optional, TYPE_CHECKING
 
-from script_generator.constants import QUEUE_MAXSIZE
 from script_generator.tasks.data_classes.abstract_task import Task
+from script_generator.tasks.util.byte_budget_queue import ByteBudgetQueue, MemoryBudget
+from script_generator.tasks.util.result_sink import ResultSink
 
 from script_generator.object_detection.workers.post_process_worker import PostProcessWorker
 from script_generator.object_detection.workers.yolo_worker import YoloWorker
@@ -13,31 +13,43 @@ from script_generator.video.workers.ffmpeg_worker import VideoWorker
 from script_generator.video.workers.vr_to_2d_worker import VrTo2DWorker
 
 if TYPE_CHECKING:
+    from script_generator.object_detection.util.raw_yolo_writer import DetectionCheckpoint
     from script_generator.state.app_state import AppState
+    from script_generator.tasks.util.deadline_controller import DeadlineController
 
 
 @dataclass
 class AnalyzeVideoTask(Task):
     tasks: List[Task] = field(default_factory=list)
 
-    def __init__(self, state: "AppState", use_open_gl):
+    def __init__(self, state: "AppState", use_open_gl, checkpoint: Optional["DetectionCheckpoint"] = None):
         super().__init__()
         self.tasks = []
         self._lock = Lock()
         self.profile = {}
         self.start_time = time.time()
-        self.opengl_q = queue.Queue(maxsize=QUEUE_MAXSIZE)
-        self.yolo_q = queue.Queue(maxsize=QUEUE_MAXSIZE)
-        self.analysis_q = queue.Queue(maxsize=QUEUE_MAXSIZE)
-        self.result_q = queue.Queue(maxsize=0)
+        self.memory_budget = MemoryBudget(get_queue_memory_budget_bytes(state))
+
+        # Only the queue fed by the video decoder blocks on the memory budget, the other queues are accounted for
+        self.opengl_q = ByteBudgetQueue("OpenGL", maxsize=state.queue_maxsize, budget=self.memory_budget, blocking=use_open_gl)
+        self.yolo_q = ByteBudgetQueue("YOLO", maxsize=state.queue_maxsize, budget=self.memory_budget, blocking=not use_open_gl)
+        self.analysis_q = ByteBudgetQueue("Analysis", maxsize=state.queue_maxsize, budget=self.memory_budget)
+        self.result_sink = ResultSink()
         self.use_open_gl = use_open_gl
         self.is_stopped = False
+        self.has_failed = False
+        self.deadline_controller: Optional["DeadlineController"] = None
+
+        # Resume after the last durable frame of an interrupted run
+        self.checkpoint = checkpoint
+        self.frame_start = checkpoint.frame_pos + 1 if checkpoint else (state.frame_start or 0)
+        self.frames_resumed = self.frame_start - (state.frame_start or 0)
 
         # Create threads
         self.decode_thread = VideoWorker(state=state, output_queue=self.opengl_q if use_open_gl else self.yolo_q)
         self.opengl_thread = VrTo2DWorker(state=state, input_queue=self.opengl_q, output_queue=self.yolo_q) if use_open_gl else None
         self.yolo_thread = YoloWorker(state=state, input_queue=self.yolo_q, output_queue=self.analysis_q)
-        self.yolo_analysis_thread = PostProcessWorker(state=state, input_queue=self.analysis_q, output_queue=self.result_q)
+        self.yolo_analysis_thread = PostProcessWorker(state=state, input_queue=self.analysis_q, output_queue=self.result_sink)
 
         state.analyze_task = self
 
@@ -59,4 +71,12 @@ class AnalyzeVideoTask(Task):
         if self.yolo_thread:
             self.yolo_thread.stop_process()
         if self.yolo_analysis_thread:
-            self.yolo_analysis_thread.stop_process()
\ No newline at end of file
+            self.yolo_analysis_thread.stop_process()
+
+
+def get_queue_memory_budget_bytes(state: "AppState"):
+    budget_mb = state.queue_memory_budget_mb
+    if not budget_mb or budget_mb <= 0:
+        return None
+
+    return int(budget_mb * 1024 * 1024)
\ No newline at end of file
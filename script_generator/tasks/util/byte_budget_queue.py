@@ -0,0 +1,114 @@
+import queue
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+
+def get_nbytes(item) -> int:
+    """
+    Returns the number of bytes an item holds while it sits in a queue (0 for sentinels and unknown objects).
+    """
+    if item is None:
+        return 0
+    get_item_nbytes = getattr(item, "get_nbytes", None)
+    return get_item_nbytes() if get_item_nbytes else 0
+
+
+class MemoryBudget:
+    def __init__(self, max_bytes: Optional[int]):
+        """
+        Global memory budget shared by all stage queues of a pipeline.
+
+        :param max_bytes: Maximum number of bytes that may be held in the queues, None disables the limit.
+        """
+        self.max_bytes = max_bytes
+        self.used = 0
+        self.peak = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, nbytes: int, block=True, timeout: Optional[float] = None):
+        """
+        Reserves bytes in the budget. When blocking, waits until there is room. An item is always admitted when the
+        budget is empty so a single oversized item can never stall the pipeline.
+
+        :raises queue.Full: When the bytes could not be reserved within the timeout.
+        """
+        with self._cond:
+            if block and self.max_bytes is not None:
+                has_room = self._cond.wait_for(lambda: self.used == 0 or self.used + nbytes <= self.max_bytes, timeout)
+                if not has_room:
+                    raise queue.Full
+            self.used += nbytes
+            self.peak = max(self.peak, self.used)
+
+    def release(self, nbytes: int):
+        if nbytes == 0:
+            return
+        with self._cond:
+            self.used -= nbytes
+            self._cond.notify_all()
+
+
+class ByteBudgetQueue(queue.Queue):
+    def __init__(self, name: str, maxsize=0, budget: Optional[MemoryBudget] = None, blocking=False):
+        """
+        Queue that tracks the bytes of the items it holds and accounts them in a shared memory budget.
+
+        Only the queue that is fed by the head of the pipeline should be blocking. Downstream queues merely move bytes
+        that were already admitted, blocking them on the budget could deadlock a worker that holds a partial batch.
+
+        :param name: Name of the stage queue (used for logging).
+        :param maxsize: Maximum number of items, 0 is unbounded.
+        :param budget: Shared memory budget or None to only track the bytes.
+        :param blocking: Whether producers wait for room in the budget.
+        """
+        super().__init__(maxsize)
+        self.name = name
+        self.budget = budget
+        self.blocking = blocking
+        self.nbytes = 0
+        self.puts = 0  # number of items that entered and left the queue, used to detect stalled stages
+        self.gets = 0
+        self._item_nbytes = deque()
+        self._put_nbytes = {}  # bytes of the item each producer thread is putting, read back by _put
+
+    def put(self, item, block=True, timeout=None):
+        nbytes = get_nbytes(item)
+        deadline = time.monotonic() + timeout if block and timeout is not None else None
+        if self.budget:
+            self.budget.acquire(nbytes, block=self.blocking and block, timeout=timeout)
+        if deadline is not None:
+            # the wait for the budget counts towards the timeout
+            timeout = max(deadline - time.monotonic(), 0)
+
+        thread_id = threading.get_ident()
+        self._put_nbytes[thread_id] = nbytes
+        try:
+            super().put(item, block, timeout)
+        except queue.Full:
+            if self.budget:
+                self.budget.release(nbytes)
+            raise
+        finally:
+            self._put_nbytes.pop(thread_id, None)
+
+    def _put(self, item):
+        # called by queue.Queue with the mutex held, in the thread that puts the item
+        nbytes = self._put_nbytes.pop(threading.get_ident(), None)
+        if nbytes is None:
+            nbytes = get_nbytes(item)
+        self._item_nbytes.append(nbytes)
+        self.nbytes += nbytes
+        self.puts += 1
+        super()._put(item)
+
+    def _get(self):
+        # called by queue.Queue with the mutex held
+        item = super()._get()
+        nbytes = self._item_nbytes.popleft()
+        self.nbytes -= nbytes
+        self.gets += 1
+        if self.budget:
+            self.budget.release(nbytes)
+        return item
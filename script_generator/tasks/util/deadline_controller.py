@@ -0,0 +1,181 @@
+import time
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Optional, TYPE_CHECKING
+
+import cv2
+import numpy as np
+
+from script_generator.constants import DEADLINE_MIN_DWELL_SECONDS, DEADLINE_SAFETY_MARGIN, NEAR_DUPLICATE_MAX_SKIP, NEAR_DUPLICATE_THRESHOLD
+from script_generator.debug.logger import log_od
+
+if TYPE_CHECKING:
+    from script_generator.state.app_state import AppState
+    from script_generator.tasks.data_classes.analyze_video_task import AnalyzeVideoTask
+
+
+@dataclass(frozen=True)
+class QualityLevel:
+    frame_stride: int = 1  # run inference on every n-th frame, the frames in between reuse its detections
+    imgsz: Optional[int] = None  # inference resolution, None uses the resolution the model was trained on
+    batch_scale: int = 1  # multiplier of the YOLO batch size
+    skip_duplicates: bool = False  # reuse the detections of the previous frame when a frame barely changed
+
+    def get_batch_size(self, batch_size: int) -> int:
+        # batching isn't supported everywhere (batch size 1), don't force it
+        return batch_size * self.batch_scale if batch_size > 1 else batch_size
+
+
+# Levels from full quality to fastest, every level cuts more cost than the one before. Levers that don't change the
+# detections come first, frame stride comes last as it hurts the funscript the most.
+QUALITY_LEVELS = [
+    QualityLevel(),
+    QualityLevel(batch_scale=2),
+    QualityLevel(batch_scale=2, skip_duplicates=True),
+    QualityLevel(batch_scale=2, skip_duplicates=True, imgsz=512),
+    QualityLevel(batch_scale=2, skip_duplicates=True, imgsz=512, frame_stride=2),
+    QualityLevel(batch_scale=2, skip_duplicates=True, imgsz=416, frame_stride=2),
+    QualityLevel(batch_scale=2, skip_duplicates=True, imgsz=416, frame_stride=3),
+]
+FULL_QUALITY = QUALITY_LEVELS[0]
+
+
+def get_frame_signature(frame: np.ndarray) -> np.ndarray:
+    """
+    Tiny grayscale thumbnail of a frame to cheaply tell whether two frames are nearly the same.
+    """
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    return cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA)
+
+
+def is_near_duplicate(signature: np.ndarray, previous: Optional[np.ndarray], threshold=NEAR_DUPLICATE_THRESHOLD) -> bool:
+    return previous is not None and float(cv2.absdiff(signature, previous).mean()) < threshold
+
+
+class FrameSkipper:
+    def __init__(self):
+        """
+        Decides per frame whether inference can be skipped at the given quality level. Frames are compared to the last
+        frame that went through inference, so slow changes still add up to a new inference.
+        """
+        self.last_inferred_pos: Optional[int] = None
+        self.last_signature: Optional[np.ndarray] = None
+        self.frames_skipped = 0
+
+    def should_skip(self, frame_pos: int, frame: np.ndarray, level: QualityLevel) -> bool:
+        if self.last_inferred_pos is None:
+            skip = False
+        else:
+            gap = frame_pos - self.last_inferred_pos
+            skip = gap < level.frame_stride
+
+        signature = None
+        if level.skip_duplicates:
+            signature = get_frame_signature(frame)
+            if not skip and self.last_inferred_pos is not None and frame_pos - self.last_inferred_pos <= NEAR_DUPLICATE_MAX_SKIP:
+                skip = is_near_duplicate(signature, self.last_signature)
+
+        if skip:
+            self.frames_skipped += 1
+        else:
+            self.last_inferred_pos = frame_pos
+            self.last_signature = signature
+        return skip
+
+
+class DeadlineController:
+    def __init__(self, state: "AppState", analyze_task: "AnalyzeVideoTask", deadline_seconds: float,
+                 min_dwell=DEADLINE_MIN_DWELL_SECONDS, safety_margin=DEADLINE_SAFETY_MARGIN):
+        """
+        Lowers or raises the quality level of object detection while it runs so it finishes within the deadline. The
+        throughput is measured since the last change and compared to the throughput the remaining frames need.
+
+        :param deadline_seconds: Wall time object detection may take, counted from the start of the analysis.
+        :param min_dwell: Seconds a level is kept before the next change, so its throughput can be measured.
+        :param safety_margin: Relative throughput above the required one to aim for.
+        """
+        self.state = state
+        self.analyze_task = analyze_task
+        self.deadline_seconds = deadline_seconds
+        self.min_dwell = min_dwell
+        self.safety_margin = safety_margin
+        self.level_index = 0
+        self.level_fps: Dict[int, float] = {}  # last measured throughput per level
+        self.decisions: List[dict] = []
+        self.last_change_time = analyze_task.start_time
+        self.last_change_frames = analyze_task.frames_resumed
+
+    @property
+    def level(self) -> QualityLevel:
+        return QUALITY_LEVELS[self.level_index]
+
+    def update(self, frames_processed: int, now: Optional[float] = None):
+        """
+        Called from the progress logger with the number of processed frames of the video.
+        """
+        now = now or time.time()
+        if now - self.last_change_time < self.min_dwell:
+            return
+
+        fps = (frames_processed - self.last_change_frames) / (now - self.last_change_time)
+        self.level_fps[self.level_index] = fps
+
+        remaining_frames = self.state.video_info.total_frames - frames_processed
+        remaining_time = self.deadline_seconds - (now - self.analyze_task.start_time)
+        required_fps = remaining_frames / remaining_time if remaining_time > 0 else float("inf")
+        target_fps = required_fps * (1 + self.safety_margin)
+
+        if fps < target_fps and self.level_index < len(QUALITY_LEVELS) - 1:
+            self._change(self.level_index + 1, "behind", frames_processed, fps, required_fps, now)
+        elif self.level_index > 0:
+            # only go back up when well ahead and the better level was fast enough too (or never measured), avoids flapping
+            previous_fps = self.level_fps.get(self.level_index - 1)
+            if fps > target_fps * 2 and (previous_fps is None or previous_fps > target_fps):
+                self._change(self.level_index - 1, "ahead", frames_processed, fps, required_fps, now)
+
+    def _change(self, level_index, reason, frames_processed, fps, required_fps, now):
+        self.level_index = level_index
+        self.last_change_time = now
+        self.last_change_frames = frames_processed
+        decision = {
+            "elapsed_seconds": round(now - self.analyze_task.start_time, 1),
+            "frame": frames_processed,
+            "fps": round(fps, 1),
+            "required_fps": round(required_fps, 1) if required_fps != float("inf") else None,
+            "reason": reason,
+            "level": level_index,
+            **asdict(self.level)
+        }
+        self.decisions.append(decision)
+        log_od.info(
+            f"[DEADLINE] {'Lowering' if reason == 'behind' else 'Raising'} quality to level {level_index} "
+            f"({fps:.1f} fps, {decision['required_fps'] or 'inf'} fps required): {asdict(self.level)}"
+        )
+
+    def summary(self) -> dict:
+        end_time = self.analyze_task.end_time or time.time()
+        elapsed = end_time - self.analyze_task.start_time
+        frame_skipper = self.analyze_task.yolo_thread.frame_skipper
+        return {
+            "deadline_seconds": self.deadline_seconds,
+            "elapsed_seconds": round(elapsed, 1),
+            "met": elapsed <= self.deadline_seconds,
+            "final_level": self.level_index,
+            "frames_skipped": frame_skipper.frames_skipped if frame_skipper else 0,
+            "decisions": self.decisions
+        }
+
+    def log_summary(self):
+        summary = self.summary()
+        log_method = log_od.info if summary["met"] else log_od.warn
+        log_method(
+            f"[DEADLINE] {'Met' if summary['met'] else 'Missed'} the deadline of {self.deadline_seconds:.0f} s in "
+            f"{summary['elapsed_seconds']:.0f} s with {len(self.decisions)} quality change(s), final level "
+            f"{summary['final_level']}, {summary['frames_skipped']} frames reused the detections of a previous frame"
+        )
+
+
+def create_deadline_controller(state: "AppState", analyze_task: "AnalyzeVideoTask") -> Optional[DeadlineController]:
+    if not state.deadline_seconds:
+        return None
+    log_od.info(f"[DEADLINE] Object detection has to finish within {state.deadline_seconds:.0f} s, adapting the quality as needed")
+    return DeadlineController(state, analyze_task, state.deadline_seconds)
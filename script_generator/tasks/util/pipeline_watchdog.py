@@ -0,0 +1,143 @@
+import sys
+import threading
+import time
+import traceback
+from dataclasses import dataclass
+from typing import Callable, List, Optional, TYPE_CHECKING
+
+from script_generator.constants import PIPELINE_WATCHDOG_INTERVAL
+from script_generator.debug.logger import log_od
+
+if TYPE_CHECKING:
+    from script_generator.state.app_state import AppState
+    from script_generator.tasks.data_classes.analyze_video_task import AnalyzeVideoTask
+    from script_generator.tasks.util.byte_budget_queue import ByteBudgetQueue
+
+
+@dataclass
+class WatchedStage:
+    name: str
+    thread: threading.Thread
+    get_progress: Callable[[], int]
+    input_queue: Optional["ByteBudgetQueue"]
+    output_queue: Optional["ByteBudgetQueue"]
+    last_progress: int = -1
+    last_progress_time: float = 0.0
+    stalled: bool = False
+
+    def is_waiting_for_work(self):
+        """
+        A stage without work to do isn't stalled, the stage feeding it is. The decoder has no input queue and counts
+        as stalled when the queue it fills has run dry.
+        """
+        if self.input_queue is None:
+            return self.output_queue is not None and self.output_queue.qsize() > 0
+        return self.input_queue.qsize() == 0
+
+
+def format_thread_stacks() -> str:
+    thread_names = {t.ident: t.name for t in threading.enumerate()}
+    lines = []
+    for ident, frame in sys._current_frames().items():
+        lines.append(f"Thread {thread_names.get(ident, ident)}:")
+        lines.extend(line.rstrip() for line in traceback.format_stack(frame))
+    return "\n".join(lines)
+
+
+class PipelineWatchdog:
+    def __init__(self, state: "AppState", analyze_task: "AnalyzeVideoTask", stall_seconds: float,
+                 restart_decoder=False, interval=PIPELINE_WATCHDOG_INTERVAL):
+        """
+        Watches the progress of every pipeline stage and reports the stages that have work but made no progress for
+        stall_seconds, together with the state of all stages and the stacks of all threads.
+
+        :param stall_seconds: Seconds without progress after which a stage counts as stalled.
+        :param restart_decoder: Restart ffmpeg from the next frame when the decoder stalls.
+        :param interval: Seconds between checks.
+        """
+        self.state = state
+        self.analyze_task = analyze_task
+        self.stall_seconds = stall_seconds
+        self.restart_decoder = restart_decoder
+        self.interval = interval
+        self.stall_count = 0
+        self.stages = self._get_stages(analyze_task)
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def _get_stages(a: "AnalyzeVideoTask") -> List[WatchedStage]:
+        decoder_output = a.opengl_q if a.use_open_gl else a.yolo_q
+        stages = [WatchedStage("Decoder", a.decode_thread, lambda: a.decode_thread.frames_read, None, decoder_output)]
+        if a.use_open_gl:
+            stages.append(WatchedStage("OpenGL", a.opengl_thread, lambda: a.opengl_q.gets, a.opengl_q, a.yolo_q))
+        stages.append(WatchedStage("YOLO", a.yolo_thread, lambda: a.yolo_q.gets, a.yolo_q, a.analysis_q))
+        stages.append(WatchedStage("Post-processing", a.yolo_analysis_thread, lambda: a.analysis_q.gets, a.analysis_q, None))
+        return stages
+
+    def check(self, now: Optional[float] = None):
+        now = now or time.time()
+        stalled_stages = []
+        for stage in self.stages:
+            progress = stage.get_progress()
+            if progress != stage.last_progress or not stage.thread.is_alive() or stage.is_waiting_for_work():
+                stage.last_progress = progress
+                stage.last_progress_time = now
+                stage.stalled = False
+            elif not stage.stalled and now - stage.last_progress_time >= self.stall_seconds:
+                stage.stalled = True
+                stalled_stages.append(stage)
+
+        if stalled_stages:
+            self.stall_count += 1
+            self.report(stalled_stages, now)
+            decoder = self.stages[0]
+            if self.restart_decoder and decoder in stalled_stages:
+                self.analyze_task.decode_thread.request_restart()
+                decoder.stalled = False
+                decoder.last_progress_time = now
+
+    def report(self, stalled_stages: List[WatchedStage], now: float):
+        names = ", ".join(stage.name for stage in stalled_stages)
+        log_message = f"[WATCHDOG] No progress for {self.stall_seconds:.0f} s in: {names}\n Stage state\n"
+        for stage in self.stages:
+            queue = stage.input_queue
+            queue_state = f"input queue {queue.qsize()} frames ({queue.nbytes / (1024 * 1024):.0f} MB)" if queue else "no input queue"
+            log_message += (
+                f"  - {stage.name:<16}: {'alive' if stage.thread.is_alive() else 'stopped'}, "
+                f"{stage.last_progress} frames, last progress {now - stage.last_progress_time:.0f} s ago, {queue_state}\n"
+            )
+
+        decoder = self.analyze_task.decode_thread
+        warnings = decoder.get_ffmpeg_warnings()
+        if warnings:
+            log_message += f" FFmpeg warnings: {warnings}\n"
+            log_message += f" Last FFmpeg output:\n{decoder.stderr_drains[-1].get_output(timeout=0)}\n"
+        log_message += f" Thread stacks\n{format_thread_stacks()}"
+
+        for line in log_message.splitlines():
+            log_od.error(line)
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            self.check()
+
+    def start(self):
+        now = time.time()
+        for stage in self.stages:
+            stage.last_progress_time = now
+        self._thread = threading.Thread(target=self._run, name="PipelineWatchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+
+
+def start_pipeline_watchdog(state: "AppState", analyze_task: "AnalyzeVideoTask") -> Optional[PipelineWatchdog]:
+    if not state.pipeline_stall_seconds:
+        return None
+    watchdog = PipelineWatchdog(state, analyze_task, state.pipeline_stall_seconds, state.restart_stalled_decoder)
+    watchdog.start()
+    return watchdog
@@ -0,0 +1,88 @@
+import bisect
+import threading
+from typing import Dict
+
+# Upper bounds (in seconds) of the latency histogram buckets, the last bucket catches everything above
+LATENCY_BUCKETS = [0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0, 5.0]
+
+
+class LatencyHistogram:
+    def __init__(self, buckets=None):
+        """
+        Online latency statistics (count, sum, min, max and a fixed bucket histogram) without keeping any samples.
+        """
+        self.buckets = buckets or LATENCY_BUCKETS
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+
+    def add(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def mean(self):
+        return self.total / self.count if self.count > 0 else 0.0
+
+    def quantile(self, q: float):
+        """
+        Approximates a quantile by the upper bound of the bucket it falls in (the max for the overflow bucket).
+        """
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank and bucket_count > 0:
+                return min(self.buckets[i], self.max) if i < len(self.buckets) else self.max
+        return self.max
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "min": self.min if self.count > 0 else 0.0,
+            "max": self.max,
+            "buckets": self.buckets,
+            "counts": self.counts
+        }
+
+
+class ResultSink:
+    def __init__(self):
+        """
+        Final stage of the object detection pipeline. Drops every finished frame task right away and only keeps the
+        online per-stage timing statistics and a processed frame counter. Implements the put interface of a queue so
+        it can be used as the output queue of the last worker.
+        """
+        self.frames_processed = 0
+        self.stage_stats: Dict[str, LatencyHistogram] = {}
+        self.finished = threading.Event()
+        self._lock = threading.Lock()
+
+    def put(self, task, block=True, timeout=None):
+        if task is None:
+            self.finished.set()
+            return
+
+        with self._lock:
+            for stage, duration in task.iter_durations():
+                stats = self.stage_stats.get(stage)
+                if stats is None:
+                    stats = self.stage_stats[stage] = LatencyHistogram()
+                stats.add(duration)
+            self.frames_processed += 1
+
+    def qsize(self):
+        return self.frames_processed
+
+    def get_stage_stats(self) -> Dict[str, LatencyHistogram]:
+        with self._lock:
+            return dict(self.stage_stats)
@@ -1,7 +1,9 @@
 import queue
 import threading
+from contextlib import nullcontext
 from typing import Generator, Optional, TYPE_CHECKING
 from enum import Enum
+from script_generator.constants import TRACE_MIN_WAIT_US
 from script_generator.debug.logger import log
 
 if TYPE_CHECKING:
@@ -19,7 +21,7 @@ class AbstractTaskProcessor(threading.Thread):
         :param input_queue: Queue to consume tasks from.
         :param output_queue: Queue to produce processed tasks.
         """
-        super().__init__()
+        super().__init__(name=self.__class__.__name__)
         self.state = state
         self.input_queue = input_queue
         self.output_queue = output_queue
@@ -34,6 +36,19 @@ class AbstractTaskProcessor(threading.Thread):
         thread_name = threading.current_thread().name
         log.info(f"[{self.__class__.__name__}-{thread_name}] {message}")
 
+    def trace_span(self, name, cat="stage", args=None):
+        """
+        Context manager that adds a span to the pipeline trace when tracing is enabled.
+        """
+        tracer = self.state.tracer
+        return tracer.span(name, cat, args) if tracer else nullcontext()
+
+    def trace_wait(self, name, start):
+        tracer = self.state.tracer
+        end = tracer.now()
+        if end - start >= TRACE_MIN_WAIT_US:
+            tracer.complete(name, "idle", start, end)
+
     def get_task(self) -> Generator["AnalyzeFrameTask", None, None]:
         """
         Generator for retrieving tasks from the input queue.
@@ -43,9 +58,15 @@ class AbstractTaskProcessor(threading.Thread):
         if self.input_queue is None:
             raise ValueError("Input queue is None. An input queue must be provided to use get_task().")
 
+        tracer = self.state.tracer
         while not self._stop_event.is_set():
             try:
-                task = self.input_queue.get(timeout=1)
+                wait_start = tracer.now() if tracer else None
+                try:
+                    task = self.input_queue.get(timeout=1)
+                finally:
+                    if tracer:
+                        self.trace_wait("wait for input", wait_start)
 
                 if task is None:
                     self.input_queue.task_done()  # Remove sentinel
@@ -64,12 +85,17 @@ class AbstractTaskProcessor(threading.Thread):
 
         :param task: The task to place in the output queue.
         """
+        tracer = self.state.tracer
+        wait_start = tracer.now() if tracer else None
         while not self._stop_event.is_set():
             try:
                 self.output_queue.put(task, timeout=1)
                 break
             except queue.Full:
-                return
+                # the queue is full or the memory budget is exhausted, keep waiting instead of dropping the frame
+                continue
+        if tracer:
+            self.trace_wait("blocked on output", wait_start)
 
     def run(self):
         """
@@ -81,6 +107,7 @@ class AbstractTaskProcessor(threading.Thread):
             self.task_logic()
         except Exception as e:
             self.exception = e  # Capture the exception
+            self.state.analyze_task.has_failed = True
             # Propagate sentinel to the output queue
             self.output_queue.put(None)
             log.error(f"An error occurred during task execution on thread {self.process_type}: {e}")
@@ -26,6 +26,7 @@ class MetaData:
     funscript_date: str | None
     tracking_version: str | None
     funscript_version: str | None
+    deadline: dict | None = None  # decisions of the deadline controller of the last object detection run
 
     def to_json(self) -> str:
         data = asdict(self)
@@ -36,6 +37,8 @@ class MetaData:
         self.yolo_model = os.path.basename(state.yolo_model_path)
         self.raw_yolo_date = self.updated_date = now_str
         self.raw_yolo_version = OBJECT_DETECTION_VERSION
+        controller = state.analyze_task.deadline_controller if state.analyze_task else None
+        self.deadline = controller.summary() if controller else None
         MetaData._write_meta(state, self)
 
     def finish_tracking_analysis(self, state: "AppState"):
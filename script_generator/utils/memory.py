@@ -0,0 +1,59 @@
+import os
+import threading
+from typing import Optional
+
+try:
+    import psutil  # optional, only needed to measure memory on platforms without /proc (e.g. Windows)
+except ImportError:
+    psutil = None
+
+_process = psutil.Process() if psutil else None
+
+
+def get_rss_bytes() -> Optional[int]:
+    """
+    Returns the resident set size of the current process or None if it can't be determined on this platform.
+    """
+    if _process:
+        return _process.memory_info().rss
+
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class PeakRssSampler:
+    def __init__(self, interval: float):
+        """
+        Samples the resident set size in a background thread and keeps the peak, use it as a context manager around
+        the code that should be measured.
+
+        :param interval: Sampling interval in seconds.
+        """
+        self.interval = interval
+        self.peak: Optional[int] = None
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        rss = get_rss_bytes()
+        if rss is not None and (self.peak is None or rss > self.peak):
+            self.peak = rss
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            self._sample()
+
+    def __enter__(self):
+        self._sample()
+        self._thread = threading.Thread(target=self._run, name="PeakRssSampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._stop_event.set()
+        self._thread.join()
+        self._sample()
+        return False
@@ -32,6 +32,17 @@ def save_msgpack_json(path, data):
         log.error(f"Failed to save to msgpack: {e}")
         raise
 
+def pack_msgpack(data):
+    return msgpack.packb(data, use_bin_type=True, default=_default_serializer)
+
+def iter_msgpack_objects(path):
+    """
+    Lazily yields the objects of a file that contains multiple concatenated msgpack objects.
+    """
+    with open(path, "rb") as f:
+        for obj in msgpack.Unpacker(f, raw=False, strict_map_key=False):
+            yield obj
+
 def _default_serializer(obj):
     if isinstance(obj, np.integer):
         return int(obj)
@@ -0,0 +1,119 @@
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+import cv2
+import torch
+
+from script_generator.debug.logger import log
+
+try:
+    import psutil  # optional, only needed to tell physical from logical cores
+except ImportError:
+    psutil = None
+
+# Threads reserved for the python stages of a job (frame reading, post-processing, OpenGL), they share the GIL so
+# more cores than this don't make them faster
+PYTHON_STAGE_THREADS = 1
+
+
+@dataclass
+class ThreadBudget:
+    logical_cores: int
+    physical_cores: int
+    concurrent_jobs: int
+    job_cores: int
+    decoder_threads: int
+    inference_threads: int
+    inference_interop_threads: int
+    python_threads: int
+    gpu_inference: bool
+
+
+def get_cpu_topology():
+    """
+    :return: The logical cores this process may run on and the physical cores behind them.
+    """
+    try:
+        logical = len(os.sched_getaffinity(0))
+    except AttributeError:
+        # not available on Windows and macOS
+        logical = os.cpu_count() or 1
+
+    physical = psutil.cpu_count(logical=False) if psutil else None
+    if not physical:
+        physical = logical
+    # the affinity mask may limit the process to part of the machine
+    physical = max(1, min(physical, logical))
+    return logical, physical
+
+
+def has_gpu_inference():
+    return torch.cuda.is_available() or torch.backends.mps.is_available()
+
+
+def allocate_thread_budget(concurrent_jobs=1, gpu_inference: Optional[bool] = None, logical_cores=None, physical_cores=None,
+                           calibrated_decoder_threads: Optional[int] = None, calibrated_inference_threads: Optional[int] = None) -> ThreadBudget:
+    """
+    Divides the cores of the machine between the jobs that run in parallel and, within a job, between the ffmpeg
+    decoder, the inference library and the python stages, so parallel jobs don't oversubscribe the CPU.
+
+    :param concurrent_jobs: Number of videos processed at the same time on this machine.
+    :param gpu_inference: Whether inference runs on a GPU, in which case it only needs a few threads to feed it.
+    :param calibrated_decoder_threads: Decoder threads of a single job, divided between the concurrent jobs.
+    :param calibrated_inference_threads: Inference threads of a single job, divided between the concurrent jobs.
+    """
+    if logical_cores is None or physical_cores is None:
+        logical_cores, physical_cores = get_cpu_topology()
+    if gpu_inference is None:
+        gpu_inference = has_gpu_inference()
+    concurrent_jobs = max(1, concurrent_jobs)
+
+    job_cores = max(1, logical_cores // concurrent_jobs)
+    job_physical_cores = max(1, physical_cores // concurrent_jobs)
+    remaining = max(1, job_cores - PYTHON_STAGE_THREADS)
+
+    # compute bound inference scales with physical cores, the decoder gets the rest (including the hyper threads)
+    if gpu_inference:
+        inference_threads = min(2, remaining)
+    else:
+        inference_threads = max(1, min(job_physical_cores, remaining - 1))
+    decoder_threads = max(1, remaining - inference_threads)
+
+    if calibrated_decoder_threads:
+        decoder_threads = max(1, calibrated_decoder_threads // concurrent_jobs)
+    if calibrated_inference_threads:
+        inference_threads = max(1, calibrated_inference_threads // concurrent_jobs)
+
+    return ThreadBudget(
+        logical_cores=logical_cores,
+        physical_cores=physical_cores,
+        concurrent_jobs=concurrent_jobs,
+        job_cores=job_cores,
+        decoder_threads=decoder_threads,
+        inference_threads=inference_threads,
+        inference_interop_threads=1,
+        python_threads=PYTHON_STAGE_THREADS,
+        gpu_inference=gpu_inference
+    )
+
+
+def apply_thread_budget(budget: ThreadBudget):
+    """
+    Applies the budget to torch and OpenCV, the ffmpeg decoder threads are read from the budget when the ffmpeg
+    command is built.
+    """
+    torch.set_num_threads(budget.inference_threads)
+    try:
+        torch.set_num_interop_threads(budget.inference_interop_threads)
+    except RuntimeError:
+        # can only be set once and before any inter-op parallel work started
+        pass
+    cv2.setNumThreads(budget.python_threads)
+
+    log.info(
+        f"Thread budget: {budget.job_cores} of {budget.logical_cores} logical cores ({budget.physical_cores} physical) "
+        f"for this job ({budget.concurrent_jobs} concurrent), ffmpeg decoder: {budget.decoder_threads}, "
+        f"inference ({'GPU' if budget.gpu_inference else 'CPU'}): {budget.inference_threads} intra-op / "
+        f"{torch.get_num_interop_threads()} inter-op, python stages and OpenCV: {budget.python_threads}"
+    )
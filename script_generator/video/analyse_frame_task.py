@@ -1,15 +1,89 @@
-from dataclasses import dataclass
-from typing import Optional
+import itertools
+import time
+from typing import Dict, Iterator, Optional, Tuple
 
 import numpy as np
 
-from script_generator.tasks.data_classes.abstract_task import Task
+from script_generator.tasks.workers.abstract_task_processor import TaskProcessorTypes
 
+STAGES = list(TaskProcessorTypes)
+STAGE_NAMES = [str(stage) for stage in STAGES]
+STAGE_INDEX = {stage: i for i, stage in enumerate(STAGES)}
+NUM_STAGES = len(STAGES)
 
-@dataclass
-class AnalyzeFrameTask(Task):
-    frame_pos: int = -1
-    preprocessed_frame: Optional[np.ndarray] = None  # Cropped frame from video stream
-    rendered_frame: Optional[np.ndarray] = None  # The final 2D image from OpenGL
-    yolo_results = None
-    # detections: List[Detection] = field(default_factory=list) # YOLO detection results
\ No newline at end of file
+# Offsets of the start, end and duration timing of a stage in AnalyzeFrameTask.timings
+_START, _END, _DURATION = 0, 1, 2
+
+
+class AnalyzeFrameTask:
+    """
+    A single frame flowing through the object detection pipeline. This is created for every frame of the video, so it
+    uses slots, takes no locks (a task is only ever handled by one worker at a time) and stores its timings in a flat
+    list indexed by stage instead of a dict with string keys.
+    """
+    __slots__ = ("id", "frame_pos", "preprocessed_frame", "rendered_frame", "yolo_results", "reuse_detections", "timings")
+
+    _ids = itertools.count(1)  # next() on itertools.count is atomic under the GIL
+
+    def __init__(self, frame_pos: int = -1, preprocessed_frame: Optional[np.ndarray] = None, rendered_frame: Optional[np.ndarray] = None):
+        self.id = next(AnalyzeFrameTask._ids)
+        self.frame_pos = frame_pos
+        self.preprocessed_frame = preprocessed_frame  # Cropped frame from video stream
+        self.rendered_frame = rendered_frame  # The final 2D image from OpenGL
+        self.yolo_results = None
+        self.reuse_detections = False  # inference was skipped, the detections of the previous frame are repeated
+        self.timings = [None] * (NUM_STAGES * 3)  # start, end and duration per stage
+
+    def start(self, process_type: TaskProcessorTypes):
+        self.timings[STAGE_INDEX[process_type] * 3 + _START] = time.time()
+
+    def end(self, process_type: TaskProcessorTypes):
+        i = STAGE_INDEX[process_type] * 3
+        end_time = time.time()
+        self.timings[i + _END] = end_time
+        start_time = self.timings[i + _START]
+        if start_time is not None:
+            self.timings[i + _DURATION] = end_time - start_time
+
+    def duration(self, process_type: TaskProcessorTypes, duration: float):
+        self.timings[STAGE_INDEX[process_type] * 3 + _DURATION] = duration
+
+    def get_duration(self, process_type: TaskProcessorTypes) -> Optional[float]:
+        return self.timings[STAGE_INDEX[process_type] * 3 + _DURATION]
+
+    def iter_durations(self) -> Iterator[Tuple[str, float]]:
+        """
+        Yields (stage name, duration) for every stage that recorded a duration.
+        """
+        timings = self.timings
+        for i in range(NUM_STAGES):
+            duration = timings[i * 3 + _DURATION]
+            if duration is not None:
+                yield STAGE_NAMES[i], duration
+
+    @property
+    def profile(self) -> Dict[str, float]:
+        """
+        Timings in the same {"<stage>_start|end|duration": value} layout as Task.profile, built on demand.
+        """
+        profile = {}
+        for i, stage_name in enumerate(STAGE_NAMES):
+            for offset, action in ((_START, "start"), (_END, "end"), (_DURATION, "duration")):
+                value = self.timings[i * 3 + offset]
+                if value is not None:
+                    profile[f"{stage_name}_{action}"] = value
+        return profile
+
+    def get_nbytes(self) -> int:
+        """
+        Number of bytes held by the frames of this task, used for the queue memory budget.
+        """
+        nbytes = 0
+        for frame in (self.preprocessed_frame, self.rendered_frame):
+            if frame is not None:
+                nbytes += frame.nbytes
+        # yolo results keep a reference to the source image, only count it if it's not the rendered frame itself
+        orig_img = getattr(self.yolo_results, "orig_img", None)
+        if orig_img is not None and orig_img is not self.rendered_frame:
+            nbytes += orig_img.nbytes
+        return nbytes
@@ -22,15 +22,19 @@ def get_ffmpeg_read_cmd(state: AppState, frame_start: int | None, output="-", di
 
     frame_size = width * height * 3  # Size of one frame in bytes
 
+    # decoding and filtering share the cores the thread budget gives to ffmpeg, 0 lets ffmpeg use all cores
+    threads = state.thread_budget.decoder_threads if state.thread_budget else 0
+    thread_args = ["-threads", str(threads), "-filter_threads", str(threads)] if threads else ["-threads", "0"]
+
     return [
         state.ffmpeg_path,
         *hwaccel_read,
         '-nostats', '-loglevel', 'warning',
         "-ss", str(start_time / 1000),  # Seek to start time in seconds
+        *thread_args,  # input option, so it applies to the decoder
         "-i", video.path,
         "-an",  # Disable audio processing
         *video_filter,
         "-f", "rawvideo", "-pix_fmt", "bgr24",  # cv2 requires bgr (over rgb) and Yolo expects bgr images when using numpy frames (converts them internally)
-        "-threads", "0", # all threads
         output
     ], frame_size, width, height
\ No newline at end of file
@@ -79,9 +79,12 @@ def _test_hwaccel(ffmpeg_path, hw):
     return ok
 
 
+HWACCEL_PREFERENCE = ["cuda", "vaapi", "amf", "videotoolbox", "qsv", "d3d11va"]
+
+
 def get_preferred_hwaccel(ffmpeg_path):
     supported = _list_ffmpeg_hwaccels(ffmpeg_path)
-    for hw in ["cuda", "vaapi", "amf", "videotoolbox", "qsv", "d3d11va"]:
+    for hw in HWACCEL_PREFERENCE:
         if hw in supported and _test_hwaccel(ffmpeg_path, hw):
             log_vid.info(f"Setting preferred FFmpeg hardware acceleration too: {hw}")
             return hw
@@ -89,6 +92,14 @@ def get_preferred_hwaccel(ffmpeg_path):
     return None
 
 
+def get_working_hwaccels(ffmpeg_path):
+    """
+    Returns every hardware acceleration method that is compiled into ffmpeg and works on this machine.
+    """
+    supported = _list_ffmpeg_hwaccels(ffmpeg_path)
+    return [hw for hw in HWACCEL_PREFERENCE if hw in supported and _test_hwaccel(ffmpeg_path, hw)]
+
+
 def get_hwaccel_read_args(state):
     hwaccel = state.ffmpeg_hwaccel
     if hwaccel == "cuda":
@@ -0,0 +1,64 @@
+import re
+import threading
+from collections import Counter, deque
+from typing import IO, Dict
+
+from script_generator.constants import FFMPEG_STDERR_MAX_LINES
+
+# Categories of the ffmpeg warnings that are counted, the first matching pattern wins
+FFMPEG_WARNING_PATTERNS = [
+    ("corrupt", re.compile(r"corrupt|invalid|error while decoding|decode_slice_header|out of range|too large|negative number|cabac|bytestream|overread|block unavailable", re.IGNORECASE)),
+    ("missing_reference", re.compile(r"missing picture|reference picture|no frame!|mmco", re.IGNORECASE)),
+    ("concealed", re.compile(r"concealing", re.IGNORECASE)),
+    ("timestamps", re.compile(r"dts|pts|timestamp", re.IGNORECASE)),
+    ("hwaccel", re.compile(r"hwaccel|cuda|vaapi|videotoolbox|d3d11|qsv", re.IGNORECASE)),
+]
+
+
+def get_warning_category(line: str) -> str:
+    for category, pattern in FFMPEG_WARNING_PATTERNS:
+        if pattern.search(line):
+            return category
+    return "other"
+
+
+class FFmpegStderrDrain(threading.Thread):
+    def __init__(self, stream: IO[bytes], max_lines=FFMPEG_STDERR_MAX_LINES):
+        """
+        Reads the stderr of an ffmpeg process in the background so a chatty ffmpeg can never fill the pipe and block
+        decoding. Every line is counted by warning category and the last lines are kept for error messages.
+
+        :param stream: stderr pipe of the ffmpeg process.
+        :param max_lines: Number of most recent lines to keep.
+        """
+        super().__init__(name="FFmpegStderrDrain", daemon=True)
+        self.stream = stream
+        self.counts = Counter()
+        self.lines = deque(maxlen=max_lines)
+        self._lock = threading.Lock()
+
+    def run(self):
+        try:
+            for raw_line in iter(self.stream.readline, b""):
+                line = raw_line.decode("utf-8", errors="replace").rstrip()
+                if not line:
+                    continue
+                category = get_warning_category(line)
+                with self._lock:
+                    self.counts[category] += 1
+                    self.lines.append(line)
+        except (OSError, ValueError):
+            # the pipe was closed while the process was terminated
+            return
+
+    def get_counts(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.counts)
+
+    def get_output(self, timeout=1.0) -> str:
+        """
+        Returns the last lines ffmpeg wrote, waits for the process to close stderr first so nothing is missing.
+        """
+        self.join(timeout)
+        with self._lock:
+            return "\n".join(self.lines)
@@ -0,0 +1,64 @@
+import os
+import subprocess
+
+from script_generator.debug.errors import FFMpegError
+from script_generator.debug.logger import log_vid
+
+
+def get_test_video_filename(width: int, height: int, fps: int, is_vr: bool):
+    # the _LR_180 suffix makes the app detect the video as side by side VR
+    return f"testsrc_{width}x{height}_{fps}fps{'_LR_180' if is_vr else ''}.mp4"
+
+
+def generate_test_video(ffmpeg_path: str, path: str, duration: float, width: int, height: int, fps: int = 30, is_vr=False):
+    """
+    Generates a reproducible video with ffmpeg's lavfi testsrc2 source. VR videos are side by side, with the same
+    test pattern for both eyes.
+
+    :param ffmpeg_path: Path to the ffmpeg executable.
+    :param path: Output path, use get_test_video_filename for VR videos so the projection is detected.
+    :param duration: Duration in seconds.
+    :param width: Width of the whole frame (both eyes for VR).
+    :param height: Height of the frame.
+    :param fps: Frame rate.
+    :param is_vr: Whether to generate a side by side VR video.
+    """
+    eye_width = width // 2 if is_vr else width
+    video_filter = ["-filter_complex", "[0:v]split[l][r];[l][r]hstack"] if is_vr else []
+
+    cmd = [
+        ffmpeg_path, "-y", "-nostats", "-loglevel", "error",
+        "-f", "lavfi", "-i", f"testsrc2=size={eye_width}x{height}:rate={fps}:duration={duration}",
+        *video_filter,
+        "-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p",
+        path
+    ]
+
+    log_vid.info(f"Generating test video: {path}")
+    r = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    if r.returncode != 0 or not os.path.exists(path):
+        raise FFMpegError(f"Could not generate test video {path}: {r.stderr.strip()}")
+
+    return path
+
+
+def extract_test_clip(ffmpeg_path: str, video_path: str, path: str, start: float, duration: float):
+    """
+    Copies a part of a video without re-encoding, so the clip decodes like the original.
+
+    :param start: Start of the clip in seconds, the clip starts at the key frame before it.
+    :param duration: Duration in seconds.
+    """
+    cmd = [
+        ffmpeg_path, "-y", "-nostats", "-loglevel", "error",
+        "-ss", str(start), "-i", video_path, "-t", str(duration),
+        "-map", "0:v:0", "-c", "copy",
+        path
+    ]
+
+    log_vid.info(f"Extracting test clip: {path}")
+    r = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    if r.returncode != 0 or not os.path.exists(path):
+        raise FFMpegError(f"Could not extract a test clip from {video_path}: {r.stderr.strip()}")
+
+    return path
@@ -1,4 +1,6 @@
 import subprocess
+import time
+from collections import Counter
 
 import numpy as np
 
@@ -7,32 +9,66 @@ from script_generator.debug.logger import log_vid
 from script_generator.tasks.workers.abstract_task_processor import AbstractTaskProcessor, TaskProcessorTypes
 from script_generator.video.analyse_frame_task import AnalyzeFrameTask
 from script_generator.video.ffmpeg.commands import get_ffmpeg_read_cmd
+from script_generator.video.ffmpeg.stderr_drain import FFmpegStderrDrain
 
 
 class VideoWorker(AbstractTaskProcessor):
     process_type = TaskProcessorTypes.VIDEO
     process = None
     read_frames = True
+    frame_end = None  # last frame to read (inclusive), None reads until the end of the video
+    current_frame = 0  # next frame to read, the decoder is restarted from here
+    frames_read = 0
+    restart_requested = False
+    restart_count = 0
+    stderr_drains = []
 
-    def task_logic(self):
-        self.process = None
-        self.read_frames = True
-
+    def start_ffmpeg(self, frame_start):
         cmd, frame_size, width, height = get_ffmpeg_read_cmd(
             self.state,
-            self.state.frame_start
+            frame_start
         )
         log_vid.info(f"FFMPEG executing command: {' '.join(cmd)}")
 
         self.process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        current_frame = self.state.frame_start
+        # ffmpeg blocks when nobody reads its stderr, e.g. when it keeps reporting corrupt packets
+        stderr_drain = FFmpegStderrDrain(self.process.stderr)
+        stderr_drain.start()
+        self.stderr_drains.append(stderr_drain)
+        return cmd, frame_size, width, height
+
+    def task_logic(self):
+        self.process = None
+        self.read_frames = True
+        self.restart_requested = False
+        self.restart_count = 0
+        self.stderr_drains = []
+
+        # the analyze task starts later than the requested frame when resuming from a checkpoint
+        frame_start = self.state.analyze_task.frame_start
+        self.current_frame = frame_start
+        self.frames_read = 0
+        cmd, frame_size, width, height = self.start_ffmpeg(frame_start)
 
         try:
             while self.read_frames:
-                in_bytes = self.process.stdout.read(frame_size)
+                current_frame = self.current_frame
+                if self.frame_end is not None and current_frame > self.frame_end:
+                    break
+
+                read_start = time.time()
+                with self.trace_span("decode", args={"frame": current_frame}):
+                    in_bytes = self.process.stdout.read(frame_size)
+                if len(in_bytes) < frame_size and self.restart_requested and self.read_frames:
+                    self.restart_requested = False
+                    self.restart_count += 1
+                    log_vid.warning(f"Restarting FFMPEG at frame {current_frame}")
+                    self.stop_ffmpeg()
+                    cmd, frame_size, width, height = self.start_ffmpeg(current_frame)
+                    continue
                 if not in_bytes:
-                    if current_frame == self.state.frame_start:
-                        error_output = self.process.stderr.read().decode('utf-8', errors='replace')
+                    if current_frame == frame_start:
+                        error_output = self.stderr_drains[-1].get_output()
                         log_vid.error(f"FFMPEG could not read frames from this video\nFFMPEG command:\n{' '.join(cmd)}\nFFMPEG ERROR:\n{error_output}")
                         raise FFMpegError(f"FFMPEG could not read frames from this video. See the log for details.")
                     else:
@@ -47,25 +83,51 @@ class VideoWorker(AbstractTaskProcessor):
                 else:
                     task.preprocessed_frame = frame
 
-                task.end(str(self.process_type))
+                # reading blocks until ffmpeg has decoded the frame, so this is the decode time as seen by the pipeline
+                task.duration(self.process_type, time.time() - read_start)
+                task.end(self.process_type)
 
                 self.finish_task(task)
-                current_frame += 1
+                self.current_frame = current_frame + 1
+                self.frames_read += 1
 
         except Exception as e:
             # Suppress any errors when the thread is force closed
             if self.read_frames:
                 log_vid.error(f"Error reading frame: {e}")
+                # flag the failure before the sentinel is sent so the detections are kept for resuming
+                self.state.analyze_task.has_failed = True
                 raise e
 
         finally:
             self.stop_process()
             self.release()
+            self.log_ffmpeg_warnings()
 
-    def release(self):
-        log_vid.debug("Stopping FFmpeg reader")
-        self.read_frames = False
-        self.stop_process()
+    def request_restart(self):
+        """
+        Restarts ffmpeg from the next frame to read, used when decoding stalled. Killing the process unblocks the read
+        of the decode thread, which then starts a new process. A hung ffmpeg may not respond to terminate.
+        """
+        self.restart_requested = True
+        process = self.process
+        if process:
+            process.kill()
+
+    def get_ffmpeg_warnings(self):
+        counts = Counter()
+        for stderr_drain in self.stderr_drains:
+            counts.update(stderr_drain.get_counts())
+        return dict(counts)
+
+    def log_ffmpeg_warnings(self):
+        warnings = self.get_ffmpeg_warnings()
+        if warnings:
+            summary = ", ".join(f"{category}: {count}" for category, count in sorted(warnings.items()))
+            log_vid.warning(f"FFMPEG reported {sum(warnings.values())} warning(s) ({summary}), the last lines are logged at DEBUG level")
+            log_vid.debug(self.stderr_drains[-1].get_output())
+
+    def stop_ffmpeg(self):
         if self.process:
             self.process.terminate()
             try:
@@ -73,3 +135,9 @@ class VideoWorker(AbstractTaskProcessor):
             except subprocess.TimeoutExpired:
                 self.process.kill()
             self.process = None
+
+    def release(self):
+        log_vid.debug("Stopping FFmpeg reader")
+        self.read_frames = False
+        self.stop_process()
+        self.stop_ffmpeg()
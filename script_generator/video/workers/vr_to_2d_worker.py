@@ -61,28 +61,29 @@ class VrTo2DWorker(AbstractTaskProcessor):
         glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
 
         for task in self.get_task():
-            task.start(str(self.process_type))
+            with self.trace_span("opengl", args={"frame": task.frame_pos}):
+                task.start(self.process_type)
 
-            # Upload to texture
-            h, w, _ = task.preprocessed_frame.shape
-            glTexImage2D(GL_TEXTURE_2D, 0, GL_RGB, w, h, 0, GL_RGB, GL_UNSIGNED_BYTE, task.preprocessed_frame)
+                # Upload to texture
+                h, w, _ = task.preprocessed_frame.shape
+                glTexImage2D(GL_TEXTURE_2D, 0, GL_RGB, w, h, 0, GL_RGB, GL_UNSIGNED_BYTE, task.preprocessed_frame)
 
-            glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
-            glBindTexture(GL_TEXTURE_2D, texture_id)
-            glCallList(dome_display_list)
+                glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+                glBindTexture(GL_TEXTURE_2D, texture_id)
+                glCallList(dome_display_list)
 
-            # Read pixels
-            pixels = glReadPixels(0, 0, RENDER_RESOLUTION, RENDER_RESOLUTION, GL_RGB, GL_UNSIGNED_BYTE)
-            rendered_frame = np.frombuffer(pixels, dtype=np.uint8).reshape(
-                RENDER_RESOLUTION, RENDER_RESOLUTION, 3
-            )
-            rendered_frame = np.flipud(rendered_frame)
+                # Read pixels
+                pixels = glReadPixels(0, 0, RENDER_RESOLUTION, RENDER_RESOLUTION, GL_RGB, GL_UNSIGNED_BYTE)
+                rendered_frame = np.frombuffer(pixels, dtype=np.uint8).reshape(
+                    RENDER_RESOLUTION, RENDER_RESOLUTION, 3
+                )
+                rendered_frame = np.flipud(rendered_frame)
 
-            # Store result
-            task.rendered_frame = rendered_frame
-            task.preprocessed_frame = None
+                # Store result
+                task.rendered_frame = rendered_frame
+                task.preprocessed_frame = None
 
-            task.end(str(self.process_type))
+                task.end(self.process_type)
 
             # Debug
             # output_path = os.path.join(DEBUG_PATH, f"frame_{task.id:05d}.png")
@@ -0,0 +1,65 @@
+import random
+
+from collections import deque
+
+from utils.lib_SlidingWindow import AbsDiffWindow, MajorityWindow
+
+
+def test_abs_diff_window_matches_sum_over_values():
+    rng = random.Random(0)
+    window = AbsDiffWindow(60)
+    values = []
+    for _ in range(1000):
+        # smoothed distances like the tracker appends, floats that don't add up exactly
+        value = 0.1 * rng.randint(0, 100) + 0.2 * rng.randint(0, 100) + 0.7 * rng.randint(0, 100)
+        window.append(value)
+        values = (values + [value])[-60:]
+        expected = sum(abs(values[i] - values[i - 1]) for i in range(1, len(values)))
+        assert window.total_variation() == expected
+        assert list(window) == values
+
+
+def get_counted_majority(history):
+    # how the tracker found the majority before, ties go to the label that is counted first
+    counts = {label: history.count(label) for label in history}
+    return max(counts, key=counts.get, default="Not relevant")
+
+
+def test_majority_window_tie_moves_with_window():
+    window = MajorityWindow(4)
+    steps = [
+        ("a", "a"),  # a
+        ("b", "a"),  # a b, tie
+        ("b", "b"),  # a b b
+        ("a", "a"),  # a b b a, tie goes to a as it comes first
+        ("a", "b"),  # b b a a, tie goes to b now the oldest a left the window
+        ("c", "a"),  # b a a c
+        ("c", "a"),  # a a c c, tie
+        ("b", "c"),  # a c c b
+        ("b", "c"),  # c c b b, tie
+        ("b", "b"),  # c b b b
+    ]
+    for label, expected in steps:
+        window.append(label)
+        assert window.majority() == expected
+        assert get_counted_majority(list(window)) == expected
+
+
+def test_majority_window_matches_counting():
+    rng = random.Random(0)
+    window = MajorityWindow(30)
+    history = deque(maxlen=30)
+    assert window.majority(default="Not relevant") == get_counted_majority(list(history))
+    for _ in range(5000):
+        # few labels in runs so ties happen often
+        label = rng.choice(["Not relevant", "Close up", "Missionnary / Cowgirl", "Doggy / Rev. Cowgirl"])
+        for _ in range(rng.randint(1, 5)):
+            window.append(label)
+            history.append(label)
+            assert window.majority(default="Not relevant") == get_counted_majority(list(history))
+
+
+if __name__ == "__main__":
+    test_abs_diff_window_matches_sum_over_values()
+    test_majority_window_tie_moves_with_window()
+    test_majority_window_matches_counting()
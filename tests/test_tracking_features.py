@@ -0,0 +1,99 @@
+import random
+
+from types import SimpleNamespace
+
+from script_generator.analysis.tracking_features import TrackingFeatures, get_frame_features
+from script_generator.constants import OBJECT_DETECTION_VERSION
+from script_generator.object_detection.data_classes.detection_class import DetectionClass
+from script_generator.object_detection.data_classes.detection_index import DetectionIndex
+from script_generator.object_detection.util.detection_columns import DetectionColumns
+from utils.lib_ObjectTracker import ObjectTracker
+
+FRAME_COUNT = 600
+IMAGE_SIZE = 640
+
+
+def get_synthetic_records(seed):
+    """
+    Records [frame_pos, cls, conf, x1, y1, x2, y2, track_id] of boxes that move around, with confidences around the
+    threshold and ties, large butt boxes over a pussy box for close ups and frames without detections.
+    """
+    rng = random.Random(seed)
+    confs = [0.2, 0.3, 0.31, 0.5, 0.8, 0.8, 0.9]
+    classes = list(DetectionClass)
+    tracks = {}
+    records = []
+    for frame_pos in range(FRAME_COUNT):
+        if len(tracks) < 4 or rng.random() < 0.05:
+            tracks[len(records) + 1] = [rng.choice(classes), rng.uniform(150, 490), rng.uniform(150, 490), rng.uniform(30, 200)]
+        if rng.random() < 0.03:
+            tracks.pop(rng.choice(list(tracks)))
+        if rng.random() < 0.05:
+            continue
+
+        for track_id, track in tracks.items():
+            track[1] += rng.uniform(-6, 6)
+            track[2] += rng.uniform(-12, 12)
+            cls, x, y, size = track
+            box = [int(x - size / 2), int(y - size / 2), int(x + size / 2), int(y + size / 2)]
+            records.append([frame_pos, int(cls), rng.choice(confs), *box, track_id])
+
+        # a penis, sometimes twice in a frame, and a glans on it
+        for _ in range(rng.choice([0, 1, 1, 1, 2])):
+            y = 320 + rng.randint(-60, 60)
+            records.append([frame_pos, DetectionClass.PENIS, rng.choice(confs), 300, y - 120, 360, y + 40, 999])
+        if rng.random() < 0.4:
+            records.append([frame_pos, DetectionClass.GLANS, rng.choice(confs), 310, 300, 350, 330, 998])
+
+        # close ups
+        if rng.random() < 0.2:
+            records.append([frame_pos, DetectionClass.PUSSY, rng.choice(confs), 280, 280, 360, 360, 997])
+            size = rng.choice([200, 400, 600])
+            records.append([frame_pos, DetectionClass.BUTT, rng.choice(confs), 320 - size // 2, 320 - size // 2, 320 + size // 2, 320 + size // 2, 996])
+
+    rng.shuffle(records)  # the index sorts the records by frame and class priority
+    return records
+
+
+def get_comparable(features):
+    if features is None:
+        return None
+    best_boxes = [(list(best[0]), best[1]) if best is not None else None for best in features.best_boxes]
+    candidates = [(list(box), cls, track_id) for box, cls, track_id in features.candidates]
+    return best_boxes, features.close_up_butt_area, candidates
+
+
+def test_tracking_features_match_frame_features():
+    for seed, is_vr in [(0, False), (1, True)]:
+        index = DetectionIndex(DetectionColumns.from_records(OBJECT_DETECTION_VERSION, get_synthetic_records(seed)))
+        features = TrackingFeatures(index, is_vr, IMAGE_SIZE * IMAGE_SIZE, chunk_frames=7)
+        for frame_pos in range(FRAME_COUNT + 10):
+            boxes = index.get_boxes(frame_pos)
+            expected = get_frame_features(boxes, is_vr, IMAGE_SIZE * IMAGE_SIZE) if boxes else None
+            assert get_comparable(features.get(frame_pos)) == get_comparable(expected), frame_pos
+
+
+def test_track_frame_matches_tracking_logic():
+    for seed, is_vr, track_idle_seconds in [(0, False, 10), (1, True, 0), (2, False, 1)]:
+        index = DetectionIndex(DetectionColumns.from_records(OBJECT_DETECTION_VERSION, get_synthetic_records(seed)))
+        features = TrackingFeatures(index, is_vr, IMAGE_SIZE * IMAGE_SIZE, chunk_frames=7)
+        state = SimpleNamespace(
+            current_frame_id=0, frame_area=IMAGE_SIZE * IMAGE_SIZE, track_idle_seconds=track_idle_seconds,
+            video_info=SimpleNamespace(fps=30, is_vr=is_vr)
+        )
+        tracker, reference = ObjectTracker(state), ObjectTracker(state)
+        outputs, expected = [], []
+        for frame_pos in range(FRAME_COUNT):
+            state.current_frame_id = frame_pos
+            if frame_pos not in index:
+                continue
+            tracker.track_frame(state, features.get(frame_pos))
+            reference.tracking_logic(state, index.get_boxes(frame_pos))
+            outputs.append((tracker.distance, tracker.sex_position, tracker.penetration))
+            expected.append((reference.distance, reference.sex_position, reference.penetration))
+        assert outputs == expected
+
+
+if __name__ == "__main__":
+    test_tracking_features_match_frame_features()
+    test_track_frame_matches_tracking_logic()
@@ -1,9 +1,26 @@
 import math
-from collections import deque
+from collections import OrderedDict, deque
 import numpy as np
 
-from script_generator.constants import CLASS_NAMES
+from script_generator.analysis.tracking_features import BEST_BOX_CLASSES, FrameFeatures, get_candidate_overlaps, get_frame_features
 from script_generator.debug.logger import log_tr
+from script_generator.object_detection.data_classes.detection_class import DetectionClass, NUM_DETECTION_CLASSES, get_class_mask
+from utils.lib_SlidingWindow import AbsDiffWindow, MajorityWindow, MinMaxWindow
+
+POSITION_HISTORY_SIZE = 600  # Frames of tracked positions a track is normalized over
+NORMALIZED_HISTORY_SIZE = 60  # Frames of normalized positions and distances kept per track
+
+# Class masks, a class is in a mask when mask & (1 << cls)
+PENIS_MASK = get_class_mask(DetectionClass.PENIS)
+PUSSY_MASK = get_class_mask(DetectionClass.PUSSY)
+BUTT_MASK = get_class_mask(DetectionClass.BUTT)
+HAND_MASK = get_class_mask(DetectionClass.HAND)
+FACE_MASK = get_class_mask(DetectionClass.FACE)
+FOOT_MASK = get_class_mask(DetectionClass.FOOT)
+BREAST_MASK = get_class_mask(DetectionClass.BREAST)
+HIPS_CENTER_MASK = get_class_mask(DetectionClass.HIPS_CENTER)
+HAND_OR_FOOT_MASK = HAND_MASK | FOOT_MASK
+HAND_OR_FACE_MASK = HAND_MASK | FACE_MASK
 
 
 class LockedPenisBox:
@@ -80,7 +97,6 @@ class ObjectTracker:
             global_state
         """
         self.state = state
-        self.class_names = CLASS_NAMES  # List of class names to track
         # self.distance_kf = KF.KalmanFilter()  # Kalman filter for distance smoothing
 
         self.frame = None  # Current video frame
@@ -94,21 +110,21 @@ class ObjectTracker:
         self.max_allowed = 100  # Maximum allowed distance
 
         # Tracking state
-        self.boxes = {class_name: None for class_name in self.class_names}  # Detected boxes for each class
-        self.tracked_boxes = []  # List of tracked boxes
+        self.boxes = [None] * NUM_DETECTION_CLASSES  # Detected boxes for each class id
+        self.tracked_boxes = []  # List of tracked boxes [box, class id, track_id]
         self.penis_box = None  # Detected penis box
         self.locked_penis_box = LockedPenisBox()  # Locked penis box
         self.glans_detected = False  # Whether the glans is detected
         self.breast_tracking = False  # Whether breast tracking is active
         self.distance = 100  # Current distance
-        self.previous_distances = [100, 100, 100]  # Previous distances for smoothing
+        self.previous_distances = deque([100, 100, 100], maxlen=3)  # Previous distances for smoothing
         self.tracked_body_part = "Nothing"  # Currently tracked body part
 
         # Sex position tracking
         self.sex_position = "Not relevant"  # Current sex position
         self.sex_position_reason = ""  # Reason for the current sex position
         max_history = int(self.fps) * 10  # Maximum history for sex position tracking
-        self.sex_position_history = deque(maxlen=max_history)  # History of sex positions
+        self.sex_position_history = MajorityWindow(max_history)  # History of sex positions
 
         # Position and distance tracking
         self.tracked_positions = {}  # Tracked positions for each track_id
@@ -117,13 +133,18 @@ class ObjectTracker:
         self.weights = {}  # Weights for each track_id
         self.pct_weights = {}  # Percentage weights for each track_id
 
+        # The history of a track is dropped once it hasn't been detected for a while, YOLO keeps handing out new track
+        # ids so the histories would otherwise grow with the length of the video
+        self.track_idle_frames = int(state.track_idle_seconds * self.fps) if state.track_idle_seconds else None
+        self.track_last_seen = OrderedDict()  # Frame each track_id was last detected, least recently detected first
+
         # Initialize normalized positions and distances
-        self.normalized_positions = {class_name: deque(maxlen=200) for class_name in self.class_names}
-        self.normalized_distances = {class_name: deque(maxlen=200) for class_name in self.class_names}
+        self.normalized_positions = [deque(maxlen=200) for _ in range(NUM_DETECTION_CLASSES)]
+        self.normalized_distances = [deque(maxlen=200) for _ in range(NUM_DETECTION_CLASSES)]
 
         # Detection thresholds
-        self.consecutive_detections = {class_name: 0 for class_name in self.class_names}
-        self.consecutive_non_detections = {class_name: 0 for class_name in self.class_names}
+        self.consecutive_detections = [0] * NUM_DETECTION_CLASSES  # per class id
+        self.consecutive_non_detections = [0] * NUM_DETECTION_CLASSES
         self.detections_threshold = round(self.fps) / 10  # Threshold for considering a detection valid
 
         # Penetration state
@@ -165,8 +186,7 @@ class ObjectTracker:
         filtered_distance = int(max(0, min(100, filtered_distance)))
         self.distance = filtered_distance
 
-        # Update previous distances
-        self.previous_distances.pop(0)
+        # Update previous distances, the oldest one drops out
         self.previous_distances.append(self.distance)
 
         return filtered_distance
@@ -274,8 +294,7 @@ class ObjectTracker:
             reason (str): Reason for the change.
         """
         self.sex_position_history.append(sex_position)
-        position_counts = {position: self.sex_position_history.count(position) for position in self.sex_position_history}
-        most_frequent_position = max(position_counts, key=position_counts.get, default="Not relevant")
+        most_frequent_position = self.sex_position_history.majority(default="Not relevant")
         if most_frequent_position != self.sex_position:
             log_tr.debug(f"@{self.current_frame_id} - Sex position switched to: {most_frequent_position}")
             self.sex_position = most_frequent_position
@@ -287,52 +306,48 @@ class ObjectTracker:
 
         Args:
             sorted_boxes (list): List of detected boxes with confidence, class, and track ID.
-            width (int): Height of the video frame.
+        """
+        self.track_frame(state, get_frame_features(sorted_boxes, self.isVR, self.image_area))
+
+    def track_frame(self, state, features: FrameFeatures):
+        """
+        Update the tracking state with the features of the next frame. Only the state that depends on previous frames is
+        handled here, what can be computed from the detections of the frame alone comes with the features.
+
+        Args:
+            features (FrameFeatures): Features of the frame, from get_frame_features or TrackingFeatures.
         """
         self.state = state
         self.current_frame_id = state.current_frame_id
+        if self.track_idle_frames is not None:
+            self.evict_idle_tracks(features.candidates)
 
         close_up_detected = False
 
         # Initialize tracking state
         self.glans_detected = False
-        self.boxes = {class_name: None for class_name in self.class_names}
+        self.boxes = [None] * NUM_DETECTION_CLASSES
         self.tracked_boxes = []
-        all_detections = {class_name: [] for class_name in self.class_names}
         self.weights = {}  # Weights for each track_id
         self.pct_weights = {}  # Percentage weights for each track_id
 
-        classes_touching_penis = []
+        classes_touching_penis = 0  # class mask
         breast_tracked = None
         self.breast_tracking = False
 
-        # Collect all detections by class name
-        for box, conf, cls, class_name, track_id in sorted_boxes:
-            if conf > 0.3:
-                all_detections[class_name].append([conf, box, track_id])
-
-        # Find the best box for specific classes
-        found_box = {class_name: [] for class_name in self.class_names}
-        for check_class_first in ['glans', 'penis', 'navel', 'breast']:
-            prev_conf = 0
-            for conf, box, track_id in all_detections[check_class_first]:
-                if conf > prev_conf:
-                    found_box[check_class_first] = [box, conf, track_id]
-                    prev_conf = conf
-
-        # Update tracking for specific classes
-        for check_class_first in ['glans', 'penis', 'navel']:
-            if found_box[check_class_first]:
-                self.boxes[check_class_first] = found_box[check_class_first][0]
-                conf = found_box[check_class_first][1]
+        # Update tracking for the classes of which the best box is followed
+        for check_class_first, found in zip(BEST_BOX_CLASSES, features.best_boxes):
+            if found is not None:
+                found_box, conf = found
+                self.boxes[check_class_first] = found_box
                 self.consecutive_detections[check_class_first] += 1
                 self.consecutive_non_detections[check_class_first] = 0
-                self.handle_class_first(check_class_first, self.boxes[check_class_first], conf)
+                self.handle_class_first(check_class_first, found_box, conf)
             else:
                 self.consecutive_detections[check_class_first] = 0
                 self.consecutive_non_detections[check_class_first] += 1
 
-        if self.consecutive_non_detections['penis'] > self.detections_threshold * 30 \
+        if self.consecutive_non_detections[DetectionClass.PENIS] > self.detections_threshold * 30 \
                 and not self.penetration:  # equivalent to 3 seconds
             if self.locked_penis_box.active:  # is_active():
                 self.locked_penis_box.deactivate()
@@ -343,60 +358,22 @@ class ObjectTracker:
 
 
 
-        # Check if pussy boxes are inside butt boxes
-        if 'pussy' in all_detections and 'butt' in all_detections:
-            for pussy_detection in all_detections['pussy']:
-                p_conf, p_box, p_track_id = pussy_detection
-                pussy_area = self.box_area(p_box)
-
-                for butt_detection in all_detections['butt']:
-                    b_conf, b_box, b_track_id = butt_detection
-                    b_x1, b_y1, b_x2, b_y2 = b_box
-
-                    if self.boxes_overlap(p_box, b_box):
-                        # Calculate the area of the butt box
-                        butt_box_area = (b_x2 - b_x1) * (b_y2 - b_y1)
-
-                        # Check if the butt box is unusually large (close-up)
-                        if self.isVR:
-                            size_threshold = 0.15
-                        else:  #2D POV
-                            size_threshold = 0.4
-
-                        if butt_box_area > size_threshold * self.image_area:
-                            close_up_detected = True
-                            self.detect_sex_position_change('Close up', 'Butt box size beyond threshold')
-                            if not self.close_up:
-                                log_tr.debug(
-                                    f"@{self.current_frame_id} - Close up detected - butt size beyond threshold: {int((butt_box_area / self.image_area) * 100)}%"
-                                )
-                                self.close_up = True
-                            self.penetration = False
-                            distance = 100
-                            self.update_distance(distance)
-                            return
-
-                        # could still be close-up, checking if we see a penis
-                        if 'penis' not in all_detections:
-                            close_up_detected = True
-                            self.detect_sex_position_change('Close up', 'No penis detected')
-                            if not self.close_up:
-                                log_tr.info(f"@{self.current_frame_id} - Close up detected - no penis detected")
-                                self.close_up = True
-                            self.penetration = False
-                            distance = 100
-                            self.update_distance(distance)
-                            return
-                if pussy_area > 0.1 * self.image_area and 'penis' not in all_detections:
-                    close_up_detected = True
-                    self.detect_sex_position_change('Close up', 'No penis detected')
-                    if not self.close_up:
-                        log_tr.info(f"@{self.current_frame_id} - Close up detected - no penis detected")
-                        self.close_up = True
-                    self.penetration = False
-                    distance = 100
-                    self.update_distance(distance)
-                    return
+        # A pussy box inside an unusually large butt box is a close-up
+        # (the close up checks for a missing penis never ran as the detections had an entry for every class, they are
+        # left out so the output doesn't change)
+        if features.close_up_butt_area is not None:
+            butt_box_area = features.close_up_butt_area
+            close_up_detected = True
+            self.detect_sex_position_change('Close up', 'Butt box size beyond threshold')
+            if not self.close_up:
+                log_tr.debug(
+                    f"@{self.current_frame_id} - Close up detected - butt size beyond threshold: {int((butt_box_area / self.image_area) * 100)}%"
+                )
+                self.close_up = True
+            self.penetration = False
+            distance = 100
+            self.update_distance(distance)
+            return
 
         # if we reach here, this means we are not in close_up mode (theoretically)
         self.close_up = False
@@ -406,47 +383,49 @@ class ObjectTracker:
         sum_pos = 0
         sum_weight_pos = 0
 
-        for box, conf, cls, class_name, track_id in sorted_boxes:
-            # discarding those classes for distance computation
-            #if class_name in ['glans', 'penis', 'navel', 'hips center', 'anus']:
-            if class_name in ['glans', 'navel', 'hips center', 'anus']:
-                continue
-            elif self.locked_penis_box.is_active() and class_name == 'breast' and not self.boxes_overlap(box, self.locked_penis_box.get_box()):
+        # Nothing can touch the penis without a locked penis box, the box doesn't change while the boxes are checked so
+        # the overlaps of all boxes with it are computed at once.
+        # The candidates don't include the classes that are discarded for the distance computation.
+        locked_box = self.locked_penis_box.box if self.locked_penis_box.active else None
+        candidates = features.candidates if locked_box is not None else ()
+        overlaps = get_candidate_overlaps(candidates, locked_box) if candidates else ()
+        for (box, cls, track_id), touching in zip(candidates, overlaps):
+            class_bit = 1 << cls
+            if class_bit & BREAST_MASK and not touching:
                 x1, y1, x2, y2 = box
                 mid_y = (y1 + y2) // 2
                 normalized_y = self.update_tracked_positions(track_id, mid_y)
                 breast_tracked = normalized_y
 
-            elif self.locked_penis_box.is_active() and self.boxes_overlap(box, self.locked_penis_box.get_box()):
+            elif touching:
 
                 # TODO: case of a body part passing behind the penis, no touching
 
                 # case of a hand passing close to the penis, not touching
-                if (class_name in ['hand', 'foot'] and
-                        self.boxes_overlap_percentage(box, self.locked_penis_box.get_box()) < 20):
+                if (class_bit & HAND_OR_FOOT_MASK and
+                        self.boxes_overlap_percentage(box, locked_box) < 20):
                     continue
 
-                if class_name not in classes_touching_penis:
-                    classes_touching_penis.append(class_name)
+                classes_touching_penis |= class_bit
 
-                self.tracked_boxes.append([box, class_name, track_id])
+                self.tracked_boxes.append([box, cls, track_id])
                 x1, y1, x2, y2 = box
-                if class_name != 'penis':
+                if not class_bit & PENIS_MASK:
                     mid_y = y2
                 else:
                     mid_y = (y1 + y2) // 2
 
                 self.update_tracked_positions(track_id, mid_y)
 
-                if class_name != 'hips center':  # in case we reintroduce the pose model
+                if not class_bit & HIPS_CENTER_MASK:  # in case we reintroduce the pose model
 
-                    low_y = y2 if class_name != 'butt' else (0.8 * (y2 - y1)) + y1
-                    real_pen_height = self.locked_penis_box.get_height()  # so as to fix the "large" yolo bounding
-                    real_pen_y3 = self.locked_penis_box.get_box()[3]
+                    low_y = y2 if not class_bit & BUTT_MASK else (0.8 * (y2 - y1)) + y1
+                    real_pen_height = self.locked_penis_box.height  # so as to fix the "large" yolo bounding
+                    real_pen_y3 = locked_box[3]
 
-                    if class_name == 'penis':
+                    if class_bit & PENIS_MASK:
                         dist_to_penis_base = self.locked_penis_box.visible
-                    elif class_name in ['hand', 'foot']:
+                    elif class_bit & HAND_OR_FOOT_MASK:
                         real_pen_height *= 0.7
                         real_pen_y3 -= real_pen_height * 0.1
                         dist_to_penis_base = int(
@@ -460,9 +439,8 @@ class ObjectTracker:
                     normalized_dist_to_penis_base = min(max(0, dist_to_penis_base), 100)
                     self.update_normalized_distance_to_penis(track_id, normalized_dist_to_penis_base)
 
-                    weight_pos_track_id = sum(
-                        abs(self.normalized_distance_to_penis[track_id][i] - self.normalized_distance_to_penis[track_id][i - 1])
-                        for i in range(1, len(self.normalized_distance_to_penis[track_id])))
+                    # motion of the track over its recent history
+                    weight_pos_track_id = self.normalized_distance_to_penis[track_id].total_variation()
 
                     if track_id not in self.weights:
                         self.weights[track_id] = []
@@ -473,7 +451,7 @@ class ObjectTracker:
             distance = 100
             self.detect_sex_position_change('Not relevant', "no part touching penis / no penis")
             self.tracked_body_part = 'Nothing'
-        elif len(classes_touching_penis) == 0 and not self.glans_detected and self.penetration:
+        elif classes_touching_penis == 0 and not self.glans_detected and self.penetration:
             # could be a blinking moment...
             # but it could be that the penis is fully inserted and the glans is not visible
             # TEST
@@ -488,37 +466,35 @@ class ObjectTracker:
             #distance = self.locked_penis_box.visible
             #self.detect_sex_position_change('Unknown', "no part touching penis identified")
             #self.tracked_body_part = 'penis'
-        elif 'pussy' in classes_touching_penis and not self.glans_detected:
+        elif classes_touching_penis & PUSSY_MASK and not self.glans_detected:
             if self.sex_position == 'Missionnary / Cowgirl':
                 # remove hands from the weights
-                if 'hand' in classes_touching_penis:
-                    classes_touching_penis.remove('hand')
+                classes_touching_penis &= ~HAND_MASK
                 self.penetration = True
             self.detect_sex_position_change('Missionnary / Cowgirl', "pussy visible and touching")
             self.tracked_body_part = 'pussy'
-        elif 'butt' in classes_touching_penis and not self.glans_detected:
+        elif classes_touching_penis & BUTT_MASK and not self.glans_detected:
             if self.sex_position == 'Doggy / Rev. Cowgirl':
                 # remove hands from the weights
-                if 'hand' in classes_touching_penis:
-                    classes_touching_penis.remove('hand')
+                classes_touching_penis &= ~HAND_MASK
                 self.penetration = True
             self.detect_sex_position_change('Doggy / Rev. Cowgirl', "butt visible and touching")
             self.tracked_body_part = 'butt'
-        elif ('hand' in classes_touching_penis or 'face' in classes_touching_penis) and not self.penetration:
+        elif classes_touching_penis & HAND_OR_FACE_MASK and not self.penetration:
             self.detect_sex_position_change('Handjob / Blowjob', "hand or face visible and touching")
-            if 'face' not in classes_touching_penis:
+            if not classes_touching_penis & FACE_MASK:
                 self.penetration = False
                 self.tracked_body_part = 'hand'
-        elif 'foot' in classes_touching_penis and not self.penetration:
+        elif classes_touching_penis & FOOT_MASK and not self.penetration:
             self.detect_sex_position_change('Footjob', "foot visible and touching")
-        elif 'breast' in classes_touching_penis and not self.penetration:
+        elif classes_touching_penis & BREAST_MASK and not self.penetration:
             self.detect_sex_position_change('Boobjob', "breast visible and touching")
             self.tracked_body_part = 'breast'
 
         track_ids_to_consider = []
-        for _, class_name, track_id in self.tracked_boxes:
+        for _, cls, track_id in self.tracked_boxes:
             # disregard penis class if hand or foot in classes_touching_penis, because of obstruction issue
-            if class_name == 'penis' and ('hand' in classes_touching_penis or 'foot' in classes_touching_penis):
+            if (1 << cls) & PENIS_MASK and classes_touching_penis & HAND_OR_FOOT_MASK:
                 continue
             # saves the weight for the current track_id
             if track_id not in self.pct_weights:
@@ -535,7 +511,7 @@ class ObjectTracker:
 
         if sum_weight_pos > 0 and self.sex_position not in ['Not relevant', 'Close up']:
             distance = int(sum_pos / sum_weight_pos)
-        elif sum_weight_pos == 0 and self.sex_position == 'Missionnary / Cowgirl' and 'pussy' not in classes_touching_penis and breast_tracked:
+        elif sum_weight_pos == 0 and self.sex_position == 'Missionnary / Cowgirl' and not classes_touching_penis & PUSSY_MASK and breast_tracked:
             distance = breast_tracked
             self.breast_tracking = True
         elif distance != -1:
@@ -548,22 +524,22 @@ class ObjectTracker:
 
         self.update_distance(distance)
 
-    def handle_class_first(self, class_name, box, conf):
+    def handle_class_first(self, cls, box, conf):
         """
         Handle tracking for specific classes (e.g., penis, glans, navel).
 
         Args:
-            class_name (str): Name of the class.
+            cls (DetectionClass): Class id.
             box (tuple): Coordinates of the box.
             conf (float): Confidence of the detection.
         """
-        if class_name == 'penis':
+        if cls == DetectionClass.PENIS:
             if box is not None and self.penis_box is None:
                 log_tr.debug(f"@{self.current_frame_id} - Penis detected with confidence {conf}")
             self.penis_box = box
 
             if self.penis_box:
-                if self.consecutive_detections['penis'] >= self.detections_threshold:
+                if self.consecutive_detections[DetectionClass.PENIS] >= self.detections_threshold:
                     px1, py1, px2, py2 = self.penis_box
                     current_height = py2 - py1
                     if self.locked_penis_box.is_active():
@@ -577,12 +553,13 @@ class ObjectTracker:
                             # in 2D POV, camera is not still, actuation needs to be faster
                             max_move = 360 // int(self.fps)
 
-                        if abs(self.penis_box[0] - self.locked_penis_box.get_box()[0]) > max_move:
-                            px1 = self.penis_box[0] + np.sign(self.penis_box[0] - self.locked_penis_box.get_box()[0]) * max_move
-                        if abs(self.penis_box[2] - self.locked_penis_box.get_box()[2]) > max_move:
-                            px2 = self.penis_box[2] + np.sign(self.penis_box[2] - self.locked_penis_box.get_box()[2]) * max_move
-                        if abs(self.penis_box[3] - self.locked_penis_box.get_box()[3]) > max_move:
-                            py2 = self.locked_penis_box.get_box()[3] + np.sign(self.penis_box[3] - self.locked_penis_box.get_box()[3]) * max_move
+                        locked_box = self.locked_penis_box.get_box()
+                        if abs(self.penis_box[0] - locked_box[0]) > max_move:
+                            px1 = self.penis_box[0] + np.sign(self.penis_box[0] - locked_box[0]) * max_move
+                        if abs(self.penis_box[2] - locked_box[2]) > max_move:
+                            px2 = self.penis_box[2] + np.sign(self.penis_box[2] - locked_box[2]) * max_move
+                        if abs(self.penis_box[3] - locked_box[3]) > max_move:
+                            py2 = locked_box[3] + np.sign(self.penis_box[3] - locked_box[3]) * max_move
 
                         self.locked_penis_box.update((px1, py2 - self.locked_penis_box.get_height(), px2, py2), self.locked_penis_box.get_height())
 
@@ -592,9 +569,9 @@ class ObjectTracker:
                         self.locked_penis_box.visible = visible_adj
                     else:
                         self.locked_penis_box.update(self.penis_box, current_height)
-        elif class_name == 'glans' and box:
-            if self.consecutive_detections['glans'] >= self.detections_threshold:
-                self.boxes['glans'] = box
+        elif cls == DetectionClass.GLANS and box:
+            if self.consecutive_detections[DetectionClass.GLANS] >= self.detections_threshold:
+                self.boxes[DetectionClass.GLANS] = box
                 self.glans_detected = True
                 if self.penis_box:
                     self.locked_penis_box.update(self.penis_box, self.penis_box[3] - self.penis_box[1])
@@ -604,8 +581,31 @@ class ObjectTracker:
                     #    f"@{self.current_frame_id} - Penetration ended after {self.consecutive_detections['glans']} detections of glans"
                     #)
                     if self.tracked_body_part != 'Nothing':
-                        self.normalized_distances[self.tracked_body_part].clear()
-                        self.normalized_distances[self.tracked_body_part].append(100)
+                        tracked_cls = DetectionClass.from_name(self.tracked_body_part)
+                        self.normalized_distances[tracked_cls].clear()
+                        self.normalized_distances[tracked_cls].append(100)
+
+    def evict_idle_tracks(self, candidates):
+        """
+        Mark the tracks of the frame as seen and drop the histories of the tracks that haven't been detected for
+        track_idle_frames frames. Only the candidates can get a history, a track that is still detected keeps it.
+
+        Args:
+            candidates (list): The (box, class id, track_id) of the frame, from FrameFeatures.
+        """
+        for _, _, track_id in candidates:
+            self.track_last_seen[track_id] = self.current_frame_id
+            self.track_last_seen.move_to_end(track_id)
+
+        oldest_frame_id = self.current_frame_id - self.track_idle_frames
+        while self.track_last_seen:
+            track_id, last_seen = next(iter(self.track_last_seen.items()))
+            if last_seen >= oldest_frame_id:
+                break
+            del self.track_last_seen[track_id]
+            self.tracked_positions.pop(track_id, None)
+            self.normalized_absolute_tracked_positions.pop(track_id, None)
+            self.normalized_distance_to_penis.pop(track_id, None)
 
     def update_tracked_positions(self, track_id, mid_y):
         """
@@ -618,25 +618,22 @@ class ObjectTracker:
         Returns:
             int: Normalized y-coordinate.
         """
-        if track_id not in self.tracked_positions:
-            self.tracked_positions[track_id] = []
-        if len(self.tracked_positions[track_id]) > 2:
+        positions = self.tracked_positions.get(track_id)
+        if positions is None:
+            positions = self.tracked_positions[track_id] = MinMaxWindow(POSITION_HISTORY_SIZE)
+        if len(positions) > 2:
             mid_y = (
-                0.1 * self.tracked_positions[track_id][-2]
-                + 0.2 * self.tracked_positions[track_id][-1]
+                0.1 * positions[-2]
+                + 0.2 * positions[-1]
                 + 0.7 * mid_y
             )
-        self.tracked_positions[track_id].append(int(mid_y))
-        if len(self.tracked_positions[track_id]) > 600:
-            self.tracked_positions[track_id].pop(0)
+        positions.append(int(mid_y))
 
         if track_id not in self.normalized_absolute_tracked_positions:
-            self.normalized_absolute_tracked_positions[track_id] = []
-        min_y, max_y = min(self.tracked_positions[track_id]), max(self.tracked_positions[track_id])
+            self.normalized_absolute_tracked_positions[track_id] = deque(maxlen=NORMALIZED_HISTORY_SIZE)
+        min_y, max_y = positions.min(), positions.max()
         normalized_y = 100 if max_y - min_y == 0 else int(min(max(0, 100 - (((mid_y - min_y) / (max_y - min_y)) * 100)), 100))
         self.normalized_absolute_tracked_positions[track_id].append(normalized_y)
-        if len(self.normalized_absolute_tracked_positions[track_id]) > 60:
-            self.normalized_absolute_tracked_positions[track_id].pop(0)
 
         return normalized_y
 
@@ -648,14 +645,13 @@ class ObjectTracker:
             track_id (int): ID of the track.
             normalized_dist_to_penis_base (int): Normalized distance to the base of the penis.
         """
-        if track_id not in self.normalized_distance_to_penis:
-            self.normalized_distance_to_penis[track_id] = []
-        if len(self.normalized_distance_to_penis[track_id]) > 2:
+        distances = self.normalized_distance_to_penis.get(track_id)
+        if distances is None:
+            distances = self.normalized_distance_to_penis[track_id] = AbsDiffWindow(NORMALIZED_HISTORY_SIZE)
+        if len(distances) > 2:
             normalized_dist_to_penis_base = (
-                0.1 * self.normalized_distance_to_penis[track_id][-2]
-                + 0.2 * self.normalized_distance_to_penis[track_id][-1]
+                0.1 * distances[-2]
+                + 0.2 * distances[-1]
                 + 0.7 * normalized_dist_to_penis_base
             )
-        self.normalized_distance_to_penis[track_id].append(normalized_dist_to_penis_base)
-        if len(self.normalized_distance_to_penis[track_id]) > 60:
-            self.normalized_distance_to_penis[track_id].pop(0)
+        distances.append(normalized_dist_to_penis_base)
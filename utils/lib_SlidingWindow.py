@@ -0,0 +1,165 @@
+from collections import deque
+
+
+class MinMaxWindow:
+    """
+    Fixed-capacity history of values that keeps the minimum and maximum of its values up to date on every append.
+    The extremes are kept in monotonic deques, so both appending and reading them take constant (amortized) time
+    instead of scanning the whole history.
+    """
+    def __init__(self, size):
+        """
+        Initialize the window.
+
+        Args:
+            size (int): Number of most recent values kept, older values are dropped.
+        """
+        self.size = size
+        self.values = deque(maxlen=size)
+        self.appended = 0  # total number of values appended, the index of the next value
+        self._min = deque()  # (index, value) with increasing values, the first is the minimum of the window
+        self._max = deque()  # (index, value) with decreasing values, the first is the maximum of the window
+
+    def append(self, value):
+        """
+        Append a value, dropping the oldest one when the window is full.
+
+        Args:
+            value: Value to append.
+        """
+        index = self.appended
+        self.appended += 1
+        self.values.append(value)
+
+        # values that are not smaller (larger) than the new one can never be the minimum (maximum) again
+        while self._min and self._min[-1][1] >= value:
+            self._min.pop()
+        self._min.append((index, value))
+        while self._max and self._max[-1][1] <= value:
+            self._max.pop()
+        self._max.append((index, value))
+
+        # only one value leaves the window per append
+        oldest = index - self.size
+        if self._min[0][0] == oldest:
+            self._min.popleft()
+        if self._max[0][0] == oldest:
+            self._max.popleft()
+
+    def min(self):
+        """Return the smallest value in the window."""
+        return self._min[0][1]
+
+    def max(self):
+        """Return the largest value in the window."""
+        return self._max[0][1]
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, index):
+        return self.values[index]
+
+    def __iter__(self):
+        return iter(self.values)
+
+
+class AbsDiffWindow:
+    """
+    Fixed-capacity history of values that also keeps the absolute differences between consecutive values, so the total
+    variation of the window doesn't need the values to be subtracted again on every read. Reading it still sums all
+    differences of the window (linear in its size): they're summed in order, which gives exactly the same float result
+    as summing them from the values, a running total would round differently.
+    """
+    def __init__(self, size):
+        """
+        Initialize the window.
+
+        Args:
+            size (int): Number of most recent values kept, older values are dropped.
+        """
+        self.values = deque(maxlen=size)
+        self.diffs = deque(maxlen=max(size - 1, 0))  # diffs[i] = abs(values[i + 1] - values[i])
+
+    def append(self, value):
+        """
+        Append a value, dropping the oldest one (and its difference to the next value) when the window is full.
+
+        Args:
+            value: Value to append.
+        """
+        if self.values:
+            self.diffs.append(abs(value - self.values[-1]))
+        self.values.append(value)
+
+    def total_variation(self):
+        """Return the sum of the absolute differences between consecutive values in the window, summed in order."""
+        return sum(self.diffs)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, index):
+        return self.values[index]
+
+    def __iter__(self):
+        return iter(self.values)
+
+
+class MajorityWindow:
+    """
+    Fixed-capacity history of labels that keeps where every label occurs in the window, so the most frequent label is
+    found from the few distinct labels instead of counting the whole history on every append.
+    """
+    def __init__(self, size):
+        """
+        Initialize the window.
+
+        Args:
+            size (int): Number of most recent labels kept, older labels are dropped.
+        """
+        self.size = size
+        self.values = deque(maxlen=size)
+        self.appended = 0  # total number of labels appended, the index of the next label
+        self.occurrences = {}  # indices of every label in the window, oldest first
+
+    def append(self, label):
+        """
+        Append a label, dropping the oldest one when the window is full.
+
+        Args:
+            label: Label to append.
+        """
+        if self.size <= 0:
+            return
+        if len(self.values) == self.size:
+            oldest = self.values[0]
+            occurrences = self.occurrences[oldest]
+            occurrences.popleft()
+            if not occurrences:
+                del self.occurrences[oldest]
+        self.values.append(label)
+        self.occurrences.setdefault(label, deque()).append(self.appended)
+        self.appended += 1
+
+    def majority(self, default=None):
+        """
+        Return the most frequent label in the window. Ties go to the label that occurs first in the window, the same as
+        counting the labels in order and taking the max.
+
+        Args:
+            default: Returned when the window is empty.
+        """
+        if not self.occurrences:
+            return default
+        return max(self.occurrences.items(), key=lambda item: (len(item[1]), -item[1][0]))[0]
+
+    def count(self, label):
+        """Return how often the label occurs in the window."""
+        return len(self.occurrences.get(label, ()))
+
+    def __len__(self):
+        return len(self.values)
+
+    def __iter__(self):
+        return iter(self.values)